@@ -1,29 +1,104 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-import os
-import plotly
-import plotly.express as px
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+import hmac
 import json
+import os
+import tempfile
+import threading
+import time
 try:
-    from chatbot import chatbot
+    from chatbot import get_chatbot
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-    from chatbot import chatbot
+    from chatbot import get_chatbot
 
-from ml_model import get_assets, predict_from_payload
+from dashboard import (
+    LOD_BINS,
+    LOD_MODE,
+    LOD_SAMPLE_SIZE,
+    LOD_THRESHOLD,
+    client_filtering_enabled,
+    get_cube,
+    get_dashboard_payload,
+    get_dataset_blob,
+    payload_cache,
+)
+from dataset import dataset_cache, load_dataset
+from ingest import ingest_csv, ingest_sessions
+from ml_model import (
+    FEATURE_SPECS,
+    dispatch_prediction,
+    explain_inputs,
+    explain_prediction,
+    get_inference_assets,
+    iter_csv_predictions,
+    micro_batcher,
+    predict_batch,
+    predict_from_payload,
+    prediction_cache,
+    what_if_sweep,
+)
+import timing
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 app = Flask(__name__, 
             template_folder=os.path.join(BASE_DIR, 'templates'),
             static_folder=os.path.join(BASE_DIR, 'static'))
 
-try:
-    get_assets()
-    print("Model and encoders loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
+def warm_up():
+    """Load the model and dataset, run a dummy prediction and build the default
+    dashboard payload, so the first real requests do not pay for it.
+
+    Returns the time taken in ms.
+    """
+    started = time.perf_counter()
+    get_inference_assets()
+    df = load_dataset()
+    get_cube()
+    get_dashboard_payload()
+    row = df.iloc[0]
+    predict_from_payload({key: row[column] for key, column, _ in FEATURE_SPECS})
+    get_chatbot()
+    return (time.perf_counter() - started) * 1000
+
+def start_warm_up(background=True):
+    """Run warm_up, by default in a daemon thread so startup is not delayed"""
+    def run():
+        try:
+            elapsed = warm_up()
+            print(f"Model and encoders loaded successfully! (warm-up {elapsed:.0f} ms)")
+        except Exception as e:
+            print(f"Error loading model: {e}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name='evbot-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+# Nothing heavy is loaded at import; EVBOT_WARMUP=background|sync opts in
+# (``python app/app.py`` warms up in the background unless it is "off").
+if os.getenv('EVBOT_WARMUP') in ('background', 'sync'):
+    start_warm_up(background=os.getenv('EVBOT_WARMUP') == 'background')
+
+@app.before_request
+def start_request_timing():
+    g.timing_started = timing.begin_request()
+
+@app.after_request
+def add_server_timing(response):
+    # Stage breakdown for the browser devtools (per-stage histograms go to /metrics)
+    header = timing.end_request(g.pop('timing_started', None), request.endpoint or 'unmatched', request.method)
+    if header:
+        response.headers['Server-Timing'] = header
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage and per-endpoint latency histograms in the Prometheus text format"""
+    return Response(timing.render_metrics(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -42,150 +117,217 @@ def predict():
             'battery_type', 'cycles', 'ev_model'
         )}
 
-        result = predict_from_payload(payload)
+        result = dispatch_prediction(payload)
+        try:
+            factors = explain_inputs(result['inputs'], result['class_id'])['contributions']
+        except ValueError:
+            # Only forests can be explained; the prediction stands on its own
+            factors = None
         return render_template(
             'predict.html',
             result=result['message'],
-            result_type=result['result_type']
+            result_type=result['result_type'],
+            factors=factors
         )
 
     except Exception as e:
         return render_template('predict.html', result=f"Error: {str(e)}")
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch_api():
+    """Score a JSON array of payloads or a CSV upload in one vectorised pass"""
+    explain = request.args.get('explain') == '1'
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        if upload is not None:
+            # Uploaded files are closed when the view returns, so stream from
+            # a temporary copy that lives as long as the response
+            source = tempfile.TemporaryFile()
+            upload.save(source)
+            source.seek(0)
+        else:
+            source = request.stream
+        predictions = iter_csv_predictions(source, explain=explain)
+
+        def generate():
+            # Newline-delimited JSON, one result per row, chunk by chunk
+            try:
+                for result in predictions:
+                    yield json.dumps(result) + '\n'
+            finally:
+                if upload is not None:
+                    source.close()
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        data = request.get_json(force=True)
+        rows = data.get('rows') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of prediction payloads.")
+
+        results = predict_batch(rows, explain=explain)
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'errors': sum(1 for result in results if 'error' in result),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/predict/explain', methods=['POST'])
+def predict_explain_api():
+    """Predict one payload with the features that drove the prediction"""
+    try:
+        data = request.get_json(force=True)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object with the prediction fields.")
+        top = request.args.get('top')
+        return jsonify(explain_prediction(data, top=int(top) if top else None))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/predict/sweep', methods=['POST'])
+def predict_sweep_api():
+    """Score a grid of what-if variations of one payload"""
+    try:
+        data = request.get_json(force=True)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object with a payload and ranges.")
+        return jsonify(what_if_sweep(
+            data.get('payload') or {},
+            data.get('ranges'),
+            target=data.get('target'),
+            top=int(data.get('top', 5)),
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/predict/cache', methods=['GET'])
+def get_prediction_cache():
+    """Expose prediction cache counters and micro-batch metrics"""
+    info = prediction_cache.info()
+    info["micro_batcher"] = micro_batcher.info()
+    return jsonify(info)
+
+def script_safe_json(body):
+    """JSON bytes made safe to embed in an inline <script>.
+
+    ``<``, ``>`` and ``&`` only occur inside JSON strings, where the escaped
+    forms decode to the same text, so values such as ``</script>`` cannot
+    close the script element.
+    """
+    text = body.decode('utf-8')
+    return text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+
 @app.route('/dashboard')
 def dashboard():
-    # Load dataset
-    DATA_PATH = os.path.join(BASE_DIR, 'data', 'ev_battery_charging_data.csv')
-    df = pd.read_csv(DATA_PATH)
+    # Load dataset (shared, cached copy)
+    df = load_dataset()
     
-    # Calculate dynamic statistics
-    total_samples = len(df)
-    avg_efficiency = df['Efficiency (%)'].mean()
-    avg_degradation = df['Degradation Rate (%)'].mean()
-    class_distribution = df['Optimal Charging Duration Class'].value_counts().to_dict()
+    # Dynamic statistics come from the precomputed aggregate cube
+    overall = get_cube().stats()
     
     # Get unique values for filters
-    ev_models = sorted(df['EV Model'].unique().tolist())
-    battery_types = sorted(df['Battery Type'].unique().tolist())
-    charging_modes = sorted(df['Charging Mode'].unique().tolist())
-    
-    # Chart 1: SOC vs Voltage
-    fig1 = px.scatter(df, x='SOC (%)', y='Voltage (V)', 
-                      color='Optimal Charging Duration Class',
-                      title='State of Charge vs Voltage',
-                      labels={'Optimal Charging Duration Class': 'Charging Class'},
-                      hover_data=['EV Model', 'Battery Type', 'Charging Mode'])
+    ev_models = sorted(df['EV Model'].cat.categories.tolist())
+    battery_types = sorted(df['Battery Type'].cat.categories.tolist())
+    charging_modes = sorted(df['Charging Mode'].cat.categories.tolist())
     
-    # Chart 2: Efficiency per EV Model (aggregated)
-    efficiency_df = df.groupby(['EV Model', 'Battery Type'])['Efficiency (%)'].mean().reset_index()
-    fig2 = px.bar(efficiency_df, x='EV Model', y='Efficiency (%)', 
-                  color='Battery Type',
-                  title='Average Efficiency per EV Model',
-                  barmode='group')
-    
-    # Chart 3: Distribution of Charging Duration Classes
-    fig3 = px.pie(df, names='Optimal Charging Duration Class',
-                  title='Optimal Charging Duration Class Distribution',
-                  labels={'Optimal Charging Duration Class': 'Class'})
-    
-    # Chart 4: Degradation vs Cycles
-    fig4 = px.scatter(df, x='Charging Cycles', y='Degradation Rate (%)',
-                      color='Optimal Charging Duration Class',
-                      size='Efficiency (%)',
-                      title='Battery Degradation vs Charging Cycles',
-                      hover_data=['EV Model', 'SOC (%)'])
-    
-    # Convert to JSON for HTML rendering
-    graphs = {
-        "fig1": json.dumps(fig1, cls=plotly.utils.PlotlyJSONEncoder),
-        "fig2": json.dumps(fig2, cls=plotly.utils.PlotlyJSONEncoder),
-        "fig3": json.dumps(fig3, cls=plotly.utils.PlotlyJSONEncoder),
-        "fig4": json.dumps(fig4, cls=plotly.utils.PlotlyJSONEncoder)
-    }
+    # Unfiltered chart payload, shared with /api/dashboard/data; the figures
+    # are already embedded as JSON objects
+    body, _ = get_dashboard_payload()
     
     stats = {
-        "total_samples": total_samples,
-        "avg_efficiency": round(avg_efficiency, 2),
-        "avg_degradation": round(avg_degradation, 2),
-        "class_0": class_distribution.get(0, 0),
-        "class_1": class_distribution.get(1, 0),
-        "class_2": class_distribution.get(2, 0)
+        "total_samples": overall["total_samples"],
+        "avg_efficiency": overall["avg_efficiency"],
+        "avg_degradation": overall["avg_degradation"],
+        "class_0": overall["class_0"],
+        "class_1": overall["class_1"],
+        "class_2": overall["class_2"]
     }
     
     return render_template('dashboard.html', 
-                         graphs=graphs, 
+                         graphs=script_safe_json(body),
                          stats=stats,
                          has_data=stats["total_samples"] > 0,
                          ev_models=ev_models,
                          battery_types=battery_types,
-                         charging_modes=charging_modes)
+                         charging_modes=charging_modes,
+                         client_filtering=client_filtering_enabled(),
+                         lod={'threshold': LOD_THRESHOLD, 'mode': LOD_MODE,
+                              'bins': LOD_BINS, 'sample_size': LOD_SAMPLE_SIZE})
 
 @app.route('/api/dashboard/data', methods=['GET'])
 def get_dashboard_data():
     """API endpoint for dynamic data filtering"""
-    DATA_PATH = os.path.join(BASE_DIR, 'data', 'ev_battery_charging_data.csv')
-    df = pd.read_csv(DATA_PATH)
-    
     # Get filter parameters
     ev_model = request.args.get('ev_model', 'all')
     battery_type = request.args.get('battery_type', 'all')
     charging_mode = request.args.get('charging_mode', 'all')
+    lod = request.args.get('lod')
     
-    # Apply filters
-    filtered_df = df.copy()
-    if ev_model != 'all':
-        filtered_df = filtered_df[filtered_df['EV Model'] == ev_model]
-    if battery_type != 'all':
-        filtered_df = filtered_df[filtered_df['Battery Type'] == battery_type]
-    if charging_mode != 'all':
-        filtered_df = filtered_df[filtered_df['Charging Mode'] == charging_mode]
-    
-    # Calculate statistics
-    stats = {
-        "total_samples": len(filtered_df),
-        "avg_efficiency": round(filtered_df['Efficiency (%)'].mean(), 2) if len(filtered_df) > 0 else 0,
-        "avg_degradation": round(filtered_df['Degradation Rate (%)'].mean(), 2) if len(filtered_df) > 0 else 0,
-        "avg_soc": round(filtered_df['SOC (%)'].mean(), 2) if len(filtered_df) > 0 else 0,
-        "avg_voltage": round(filtered_df['Voltage (V)'].mean(), 2) if len(filtered_df) > 0 else 0,
-        "class_0": len(filtered_df[filtered_df['Optimal Charging Duration Class'] == 0]),
-        "class_1": len(filtered_df[filtered_df['Optimal Charging Duration Class'] == 1]),
-        "class_2": len(filtered_df[filtered_df['Optimal Charging Duration Class'] == 2])
-    }
+    # Encoded once per (filters, dataset version) and served from the LRU
+    body, etag = get_dashboard_payload(ev_model, battery_type, charging_mode, lod)
     
-    # Create charts with filtered data
-    fig1 = px.scatter(filtered_df, x='SOC (%)', y='Voltage (V)', 
-                      color='Optimal Charging Duration Class',
-                      title='State of Charge vs Voltage',
-                      labels={'Optimal Charging Duration Class': 'Charging Class'},
-                      hover_data=['EV Model', 'Battery Type', 'Charging Mode'])
-    
-    if len(filtered_df) > 0:
-        efficiency_df = filtered_df.groupby(['EV Model', 'Battery Type'])['Efficiency (%)'].mean().reset_index()
-        fig2 = px.bar(efficiency_df, x='EV Model', y='Efficiency (%)', 
-                      color='Battery Type',
-                      title='Average Efficiency per EV Model',
-                      barmode='group')
-    else:
-        fig2 = px.bar(title='Average Efficiency per EV Model')
-    
-    fig3 = px.pie(filtered_df, names='Optimal Charging Duration Class',
-                  title='Optimal Charging Duration Class Distribution',
-                  labels={'Optimal Charging Duration Class': 'Class'})
-    
-    fig4 = px.scatter(filtered_df, x='Charging Cycles', y='Degradation Rate (%)',
-                      color='Optimal Charging Duration Class',
-                      size='Efficiency (%)',
-                      title='Battery Degradation vs Charging Cycles',
-                      hover_data=['EV Model', 'SOC (%)'])
-    
-    return jsonify({
-        "stats": stats,
-        "fig1": json.dumps(fig1, cls=plotly.utils.PlotlyJSONEncoder),
-        "fig2": json.dumps(fig2, cls=plotly.utils.PlotlyJSONEncoder),
-        "fig3": json.dumps(fig3, cls=plotly.utils.PlotlyJSONEncoder),
-        "fig4": json.dumps(fig4, cls=plotly.utils.PlotlyJSONEncoder),
-        "has_data": len(filtered_df) > 0
-    })
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/dashboard/dataset', methods=['GET'])
+def get_dashboard_dataset():
+    """Chart columns as a compact binary blob for client-side filtering"""
+    raw, compressed, etag = get_dataset_blob()
+    gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = Response(compressed if gzipped else raw, mimetype='application/octet-stream')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Revalidated with the ETag (one per encoding), so unchanged data costs a 304
+    response.set_etag(f'{etag}-gz' if gzipped else etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/dashboard/cache', methods=['GET'])
+def get_dashboard_cache():
+    """Expose dataset and chart payload cache statistics"""
+    info = dataset_cache.info()
+    info["payload_cache"] = payload_cache.info()
+    return jsonify(info)
+
+@app.route('/api/sessions', methods=['POST'])
+def ingest_sessions_api():
+    """Append charging sessions (one JSON object, a JSON array or a CSV upload)
+    to the dataset; the dashboard statistics are updated incrementally"""
+    # Closed unless a token is configured or authentication is explicitly off
+    token = os.getenv('EVBOT_INGEST_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Unauthorized'}), 401
+    elif os.getenv('EVBOT_INGEST_AUTH') != 'off':
+        return jsonify({'error': 'Ingestion is disabled: set EVBOT_INGEST_TOKEN '
+                                 '(or EVBOT_INGEST_AUTH=off to accept unauthenticated sessions).'}), 403
+
+    # Categories the model has not seen only through an authenticated request
+    new_categories = request.args.get('new_categories') == '1'
+    if new_categories and not token:
+        return jsonify({'error': 'New categories can only be ingested with EVBOT_INGEST_TOKEN set.'}), 403
+
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            result = ingest_csv(upload.stream, new_categories=new_categories)
+        elif request.mimetype == 'text/csv':
+            result = ingest_csv(request.stream, new_categories=new_categories)
+        else:
+            data = request.get_json(force=True)
+            rows = data.get('rows', [data]) if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                raise ValueError("Expected a charging session or a JSON array of sessions.")
+            result = ingest_sessions(rows, new_categories=new_categories)
+        return jsonify(result), 201 if result['accepted'] else 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/chatbot')
 def chatbot_page():
@@ -199,12 +341,65 @@ def chat():
         user_message = data.get('message', '')
         payload = data.get('payload')
 
-        response = chatbot.get_response(user_message, payload=payload)
+        response = get_chatbot().get_response(user_message, payload=payload,
+                                        session_id=data.get('session_id'))
 
         return jsonify({'response': response})
     except Exception as e:
         return jsonify({'response': f'Sorry, I encountered an error: {str(e)}'}), 500
 
+def _sse(data, event=None):
+    prefix = f'event: {event}\n' if event else ''
+    return f'{prefix}data: {json.dumps(data)}\n\n'
+
+@app.route('/api/chatbot/stream', methods=['POST'])
+def chat_stream():
+    """Stream the chatbot answer as Server-Sent Events
+
+    Each ``data:`` event carries ``{"delta": "..."}``; the stream ends with a
+    ``done`` event, or an ``error`` event if the provider fails midway.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    user_message = data.get('message', '')
+    payload = data.get('payload')
+    session_id = data.get('session_id')
+    chatbot = get_chatbot()
+
+    def generate():
+        try:
+            for chunk in chatbot.stream_response(user_message, payload=payload, session_id=session_id):
+                yield _sse({'delta': chunk})
+            yield _sse({}, event='done')
+        except Exception as e:
+            yield _sse({'error': f'Sorry, I encountered an error: {str(e)}'}, event='error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/chatbot/metrics', methods=['GET'])
+def get_chatbot_metrics():
+    """Expose streaming latency and response cache statistics"""
+    chatbot = get_chatbot()
+    return jsonify({
+        'streaming': chatbot.stream_stats.info(),
+        'response_cache': chatbot.response_cache.info(),
+        'conversations': chatbot.conversations.info(),
+        'local_answers': chatbot.local_info(),
+        'providers': dict(
+            chatbot.provider_stats.info(),
+            timeouts=chatbot.timeouts,
+            retry=chatbot.retry_policy.info(),
+            hedge_after=chatbot.hedge_after,
+        ),
+    })
+
+@app.route('/api/chatbot/session/<session_id>', methods=['DELETE'])
+def clear_chatbot_session(session_id):
+    """Forget the conversation history of one chat session"""
+    return jsonify({'cleared': get_chatbot().conversations.clear(session_id)})
+
 if __name__ == '__main__':
+    if 'EVBOT_WARMUP' not in os.environ:
+        start_warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -4,24 +4,37 @@ EVBot Chatbot - Intelligent EV Battery Advisor powered by hosted LLM APIs.
 
 from __future__ import annotations
 
+import hashlib
+import importlib.util
+import json
 import os
-from typing import Any, Dict, Optional
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
 
 from dotenv import load_dotenv
 
+# Before the local modules, which read their settings at import
 load_dotenv()
 
-try:
-    from openai import OpenAI
-except ImportError:  # pragma: no cover - handled at runtime
-    OpenAI = None  # type: ignore[assignment]
+from conversation import conversation_store  # noqa: E402
+from knowledge import KnowledgeBase  # noqa: E402
+from ml_model import KEY_TO_SPEC, dispatch_prediction, explain_inputs, what_if_sweep  # noqa: E402
+from timing import record, stage  # noqa: E402
 
-try:
-    from huggingface_hub import InferenceClient
-except ImportError:  # pragma: no cover - handled at runtime
-    InferenceClient = None  # type: ignore[assignment]
 
-from ml_model import predict_from_payload
+def _library_available(module: str) -> bool:
+    """Check that a client library is installed without importing it.
+
+    The OpenAI and Hugging Face SDKs take hundreds of milliseconds to
+    import, so they are only imported when a provider client is first used.
+    """
+    return importlib.util.find_spec(module) is not None
 
 
 SYSTEM_PROMPT = """You are EVBot, a virtual assistant that provides electric vehicle battery advice.
@@ -29,9 +42,281 @@ Focus on EV charging strategies, battery health, efficiency, thermal management,
 Give concise, actionable answers tailored to everyday EV owners.
 If you are uncertain or the user asks for something outside EV battery guidance, acknowledge the limitation clearly."""
 
+# Settings the owner can actually change, swept for the what-if hints in the
+# model summary (about 700 grid points)
+WHAT_IF_RANGES = {
+    "mode": "all",
+    "duration": {"min": 20, "max": 120, "step": 5},
+    "current": {"min": 10, "max": 100, "steps": 10},
+}
+WHAT_IF_TOP = 3
+
+EMPTY_RESPONSE_MESSAGE = (
+    "I’m sorry, I couldn’t generate a response right now. "
+    "Please try asking your EV question again."
+)
+
+
+class StreamStats:
+    """Time-to-first-token and total stream time over recent streamed answers."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._first_token: Deque[float] = deque(maxlen=window)
+        self._total: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.errors = 0
+
+    def record_first_token(self, seconds: float) -> None:
+        with self._lock:
+            self.streams += 1
+            self._first_token.append(seconds)
+
+    def record_total(self, seconds: float) -> None:
+        with self._lock:
+            self._total.append(seconds)
+
+    @staticmethod
+    def _summary(samples: List[float]) -> Dict[str, float]:
+        if not samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+        return {
+            "p50_ms": round(pick(0.5) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            first_token, total = list(self._first_token), list(self._total)
+        return {
+            "streams": self.streams,
+            "errors": self.errors,
+            "time_to_first_token": self._summary(first_token),
+            "total_time": self._summary(total),
+        }
+
+
+def normalize_question(text: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", text).strip().casefold().rstrip("?!. ")
+
+
+class ResponseCache:
+    """Bounded LRU + TTL cache of chatbot answers.
+
+    Keys hash the provider, model name and every message sent to it (the
+    system prompt, the model-summary context and the normalised question),
+    so changing any of them misses. With ``path`` set, entries live in a
+    SQLite file instead of memory, which survives restarts and is shared by
+    every worker process pointing at it.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 86400.0, path: Optional[str] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path or None
+        self._entries: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def key(provider: Optional[str], model: str, messages: List[Dict[str, str]]) -> str:
+        *context, question = messages
+        parts = [provider, model, [m["content"] for m in context], normalize_question(question["content"])]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per process: connections must not cross a fork.
+        if self._connection is None or self._connection_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires REAL NOT NULL, "
+                "accessed REAL NOT NULL, latency REAL NOT NULL)"
+            )
+            self._connection, self._connection_pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            if self.path:
+                db = self._db()
+                row = db.execute("SELECT response, expires, latency FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] < now:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.evictions += 1
+                    row = None
+                if row is not None:
+                    db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            else:
+                row = self._entries.get(key)
+                if row is not None and row[0] < now:
+                    del self._entries[key]
+                    self.evictions += 1
+                    row = None
+                if row is not None:
+                    self._entries.move_to_end(key)
+                    row = (row[1], row[0], row[2])
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[2]
+            return row[0]
+
+    def put(self, key: str, response: str, latency: float) -> None:
+        if self.maxsize <= 0 or not response:
+            return
+        now = time.time()
+        with self._lock:
+            if self.path:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, response, now + self.ttl, now, latency),
+                )
+                removed = db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                ).rowcount
+                self.evictions += max(removed, 0)
+                return
+            self._entries[key] = (now + self.ttl, response, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.path:
+                self._db().execute("DELETE FROM responses")
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self.path:
+                return self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return len(self._entries)
+
+    def info(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite" if self.path else "memory",
+            "path": self.path,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "latency_saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("CHATBOT_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("CHATBOT_CACHE_TTL", "86400")),
+    path=os.getenv("CHATBOT_CACHE_PATH") or None,
+)
+
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a provider error is transient: timeouts, dropped connections,
+    rate limiting and 5xx responses."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class RetryPolicy:
+    """Retry transient errors with capped exponential backoff and full jitter."""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0) -> None:
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable[[], T], on_retry: Optional[Callable[[BaseException], None]] = None) -> T:
+        for attempt in range(self.attempts):
+            try:
+                return fn()
+            except Exception as exc:
+                if attempt + 1 >= self.attempts or not is_retryable(exc):
+                    raise
+                if on_retry is not None:
+                    on_retry(exc)
+                time.sleep(self.delay(attempt))
+        raise AssertionError("unreachable")
+
+    def info(self) -> Dict[str, Any]:
+        return {"attempts": self.attempts, "base_delay": self.base_delay, "max_delay": self.max_delay}
+
+
+class ProviderStats:
+    """Per-provider call, retry, failure and win counters plus hedge/failover totals."""
+
+    FIELDS = ("calls", "retries", "failures", "wins")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self.hedges = 0
+        self.failovers = 0
+
+    def record(self, provider: str, field: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(provider, dict.fromkeys(self.FIELDS, 0))
+            counts[field] += 1
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {name: dict(counts) for name, counts in self._counts.items()}
+        return {"providers": providers, "hedges": self.hedges, "failovers": self.failovers}
+
+
+def _env_seconds(name: str, default_ms: float) -> float:
+    return float(os.getenv(name, str(default_ms))) / 1000
+
 
 class EVBotChatbot:
-    """Chatbot that delegates responses to OpenAI or Hugging Face models using API keys."""
+    """Chatbot that delegates responses to OpenAI or Hugging Face models using API keys.
+
+    When both keys are configured the second provider backs up the first:
+    a request that still fails after ``retry_policy`` moves on to it, and
+    with ``hedge_after`` set the same prompt is also sent to it once the
+    first provider has been silent for that long; whichever answers first
+    wins.
+    """
 
     def __init__(
         self,
@@ -41,7 +326,39 @@ class EVBotChatbot:
         hf_model: Optional[str] = None,
     ) -> None:
         self._provider: Optional[str] = None
-        self._client: Optional[object] = None
+        # Provider name -> client, or None until the client is first used
+        self._clients: Dict[str, Any] = {}
+        self._client_lock = threading.Lock()
+        self.stream_stats = StreamStats()
+        self.response_cache = response_cache
+        self.conversations = conversation_store
+        self.provider_stats = ProviderStats()
+
+        self.timeouts = {
+            "openai": _env_seconds("OPENAI_TIMEOUT_MS", 30000),
+            "huggingface": _env_seconds("HF_TIMEOUT_MS", 30000),
+        }
+        self.retry_policy = RetryPolicy(
+            attempts=int(os.getenv("CHATBOT_RETRY_ATTEMPTS", "3")),
+            base_delay=_env_seconds("CHATBOT_RETRY_BASE_MS", 250),
+            max_delay=_env_seconds("CHATBOT_RETRY_MAX_MS", 4000),
+        )
+        self.hedge_after: Optional[float] = _env_seconds("CHATBOT_HEDGE_AFTER_MS", 0) or None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+        # Offline answer tier: confident knowledge-base matches are answered
+        # locally; the lower offline threshold applies when no provider is set.
+        self.knowledge: Optional[KnowledgeBase] = None
+        if os.getenv("CHATBOT_LOCAL_ANSWERS", "1") == "1":
+            try:
+                self.knowledge = KnowledgeBase.load()
+            except (OSError, ValueError) as exc:
+                print(f"EVBotChatbot: Knowledge base unavailable: {exc}")
+        self.local_threshold = float(os.getenv("CHATBOT_LOCAL_THRESHOLD", "0.6"))
+        self.offline_threshold = float(os.getenv("CHATBOT_OFFLINE_THRESHOLD", "0.35"))
+        self.local_stats = {"answered": 0, "escalated": 0, "seconds": 0.0}
+        self.what_if = os.getenv("CHATBOT_WHAT_IF", "1") == "1"
 
         self._openai_model = openai_model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self._hf_model = hf_model or os.getenv("HF_MODEL", "HuggingFaceH4/zephyr-7b-beta")
@@ -49,59 +366,165 @@ class EVBotChatbot:
         openai_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         hf_key = hf_api_key or os.getenv("HF_API_KEY")
 
-        # Prefer OpenAI if both keys are supplied.
+        # Prefer OpenAI if both keys are supplied; Hugging Face stays
+        # configured as the backup provider.
+        if hf_key:
+            self.set_hf_key(hf_key)
         if openai_key:
             self.set_openai_key(openai_key)
-        elif hf_key:
-            self.set_hf_key(hf_key)
-        else:
+        if not (openai_key or hf_key):
             print("EVBotChatbot: No API key detected for OpenAI or Hugging Face.")
 
     # --------------------------------------------------------------------- #
     # Provider configuration helpers
     # --------------------------------------------------------------------- #
     def set_openai_key(self, api_key: Optional[str]) -> None:
-        """Configure the OpenAI client."""
-        if api_key and OpenAI is not None:
-            self._client = OpenAI(api_key=api_key)
+        """Configure the OpenAI client (built on first use)."""
+        if api_key and _library_available("openai"):
+            self._clients["openai"] = None
             self._provider = "openai"
             self._openai_key = api_key
         else:
             self._openai_key = None
+            self._clients.pop("openai", None)
             if self._provider == "openai":
                 self._provider = None
-            if OpenAI is None and api_key:
-                # Library missing; keep provider unset so we can surface message later.
-                self._client = None
 
         # If we lost OpenAI configuration but have HF available, fall back.
         if self._provider is None and os.getenv("HF_API_KEY"):
             self.set_hf_key(os.getenv("HF_API_KEY"))
 
     def set_hf_key(self, api_key: Optional[str]) -> None:
-        """Configure the Hugging Face Inference client."""
+        """Configure the Hugging Face Inference client (built on first use)."""
         if api_key:
             os.environ["HF_API_KEY"] = api_key
-        if api_key and InferenceClient is not None:
-            self._client = InferenceClient(model=self._hf_model, token=api_key)
+        if api_key and _library_available("huggingface_hub"):
+            self._clients["huggingface"] = None
             self._provider = "huggingface"
             self._hf_key = api_key
         else:
             self._hf_key = None
+            self._clients.pop("huggingface", None)
             if self._provider == "huggingface":
                 self._provider = None
-            if InferenceClient is None and api_key:
-                self._client = None
 
         # If we lost HF configuration but have OpenAI available, fall back.
         if self._provider is None and os.getenv("OPENAI_API_KEY"):
             self.set_openai_key(os.getenv("OPENAI_API_KEY"))
 
+    def _client(self, provider: str) -> Any:
+        """The provider's client, importing its SDK and building it on first use.
+
+        One client per provider keeps its HTTP connection pool warm; retries
+        are handled by retry_policy, not the SDK.
+        """
+        client = self._clients.get(provider)
+        if client is None:
+            with self._client_lock:
+                client = self._clients.get(provider)
+                if client is None:
+                    if provider == "openai":
+                        from openai import OpenAI
+
+                        client = OpenAI(
+                            api_key=self._openai_key,
+                            base_url=os.getenv("OPENAI_BASE_URL") or None,
+                            timeout=self.timeouts["openai"],
+                            max_retries=0,
+                        )
+                    else:
+                        from huggingface_hub import InferenceClient
+
+                        base_url = os.getenv("HF_BASE_URL")
+                        client = InferenceClient(
+                            model=None if base_url else self._hf_model,
+                            base_url=base_url or None,
+                            token=self._hf_key,
+                            timeout=self.timeouts["huggingface"],
+                        )
+                    self._clients[provider] = client
+        return client
+
+    def _providers(self) -> List[str]:
+        """Configured providers, active one first."""
+        others = [name for name in self._clients if name != self._provider]
+        return ([self._provider] if self._provider in self._clients else []) + others
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork, so pre-forked workers build their own.
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("CHATBOT_HEDGE_THREADS", "8")),
+                thread_name_prefix="evbot-hedge",
+            )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _attempt(self, provider: str, request: Callable[[str], T]) -> T:
+        stats = self.provider_stats
+        stats.record(provider, "calls")
+        try:
+            result = self.retry_policy.call(
+                lambda: request(provider),
+                on_retry=lambda exc: stats.record(provider, "retries"),
+            )
+        except Exception:
+            stats.record(provider, "failures")
+            raise
+        stats.record(provider, "wins")
+        return result
+
+    def _dispatch(self, request: Callable[[str], T]) -> Tuple[str, T]:
+        """Run ``request(provider)`` with retries, failover and optional hedging.
+
+        Returns the provider that answered along with its result.
+        """
+        providers = self._providers()
+        if self.hedge_after and len(providers) > 1:
+            return self._hedged(request, providers[0], providers[1])
+
+        error: Optional[BaseException] = None
+        for index, provider in enumerate(providers):
+            if index:
+                self.provider_stats.failovers += 1
+            try:
+                return provider, self._attempt(provider, request)
+            except Exception as exc:
+                error = exc
+        raise error or RuntimeError("No chatbot provider is configured.")
+
+    def _hedged(self, request: Callable[[str], T], primary: str, backup: str) -> Tuple[str, T]:
+        pool = self._pool()
+        futures: Dict[Future, str] = {pool.submit(self._attempt, primary, request): primary}
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            self.provider_stats.hedges += 1
+            futures[pool.submit(self._attempt, backup, request)] = backup
+
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower call cannot be interrupted; close whatever it
+                    # returns (an open stream) once it finishes.
+                    for loser in pending:
+                        loser.add_done_callback(_discard_result)
+                    return futures[future], future.result()
+                error = future.exception()
+            if backup not in futures.values():
+                self.provider_stats.failovers += 1
+                future = pool.submit(self._attempt, backup, request)
+                futures[future] = backup
+                pending.add(future)
+        raise error or RuntimeError("No chatbot provider is configured.")
+
     # --------------------------------------------------------------------- #
     # Response generation
     # --------------------------------------------------------------------- #
     def _format_model_summary(self, payload: Dict[str, Any]) -> str:
-        prediction = predict_from_payload(payload)
+        prediction = dispatch_prediction(payload)
         inputs = prediction["inputs"]
 
         key_metrics = (
@@ -110,25 +533,92 @@ class EVBotChatbot:
             f"Efficiency {inputs['Efficiency (%)']}%"
         )
 
-        return (
+        summary = (
             "EV model prediction:\n"
             f"- Outcome: {prediction['message']}\n"
             f"- Result type: {prediction['result_type']}\n"
             f"- Key metrics: {key_metrics}\n"
             f"- Battery: {inputs['Battery Type']} / {inputs['EV Model']} / Mode {inputs['Charging Mode']}"
         )
-
-    def get_response(
-        self,
-        user_input: str,
-        payload: Optional[Dict[str, Any]] = None,
-    ) -> str:
-        """Process user input and return a response from the configured provider."""
-        if not user_input:
-            return "Please ask me a question about EV battery maintenance or charging!"
-
+        factors = self._factors_line(prediction)
+        if factors:
+            summary += f"\n{factors}"
+        if self.what_if and prediction["class_id"] > 0:
+            summary += "".join(f"\n{line}" for line in self._what_if_lines(payload))
+        return summary
+
+    @staticmethod
+    def _factors_line(prediction: Dict[str, Any]) -> Optional[str]:
+        """The inputs that pushed the model towards its prediction, largest first."""
+        try:
+            explanation = explain_inputs(prediction["inputs"], prediction["class_id"])
+        except ValueError:
+            return None
+        factors = ", ".join(
+            f"{factor['column']} {round(factor['value'], 1) if isinstance(factor['value'], float) else factor['value']} "
+            f"({factor['contribution']:+.0%} towards {prediction['result_type']})"
+            for factor in explanation["contributions"]
+        )
+        return f"- Main factors: {factors}" if factors else None
+
+    @staticmethod
+    def _what_if_lines(payload: Dict[str, Any]) -> List[str]:
+        """The nearest changes to the owner's settings that give a shorter charge."""
+        try:
+            sweep = what_if_sweep(payload, WHAT_IF_RANGES, target="shorter", top=WHAT_IF_TOP)
+        except ValueError:
+            return []
+        lines = []
+        for recommendation in sweep["recommendations"]:
+            changes = ", ".join(
+                f"{KEY_TO_SPEC[key][1]} {round(value, 1) if isinstance(value, float) else value}"
+                for key, value in recommendation["changes"].items()
+            )
+            lines.append(
+                f"- What-if: {changes} -> {recommendation['result_type']} "
+                f"(confidence {recommendation['probability']:.0%})"
+            )
+        return lines
+
+    def _local_answer(self, user_input: str, payload: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Answer from the knowledge base if the best match is confident enough."""
+        if self.knowledge is None:
+            return None
+        started = time.perf_counter()
+        match = self.knowledge.match(user_input)
+        threshold = self.local_threshold if self._provider else min(self.local_threshold, self.offline_threshold)
+        if match is None or match.confidence < threshold:
+            self.local_stats["escalated"] += 1
+            return None
+
+        answer = match.answer
+        if payload:
+            try:
+                answer = f"{self._format_model_summary(payload)}\n\n{answer}"
+            except Exception as exc:  # pragma: no cover - validation errors
+                answer = f"{answer}\n\nEV model assistance is unavailable for this request: {exc}"
+        self.local_stats["answered"] += 1
+        self.local_stats["seconds"] += time.perf_counter() - started
+        return answer
+
+    def local_info(self) -> Dict[str, Any]:
+        answered = self.local_stats["answered"]
+        total = answered + self.local_stats["escalated"]
+        return {
+            "enabled": self.knowledge is not None,
+            "entries": len(self.knowledge) if self.knowledge is not None else 0,
+            "threshold": self.local_threshold,
+            "offline_threshold": self.offline_threshold,
+            "answered": answered,
+            "escalated": self.local_stats["escalated"],
+            "local_rate": round(answered / total, 4) if total else 0.0,
+            "mean_ms": round(self.local_stats["seconds"] / answered * 1000, 3) if answered else 0.0,
+        }
+
+    def _configuration_error(self) -> Optional[str]:
+        """Explain why the active provider cannot answer, or None if it can."""
         if self._provider == "openai":
-            if OpenAI is None:
+            if not _library_available("openai"):
                 return (
                     "The chatbot service is unavailable because the OpenAI client library "
                     "is not installed. Please install the 'openai' package."
@@ -138,41 +628,10 @@ class EVBotChatbot:
                     "The chatbot is not configured yet. Please set the OPENAI_API_KEY "
                     "environment variable and restart the application."
                 )
-
-            supplemental_context = []
-            if payload:
-                try:
-                    supplemental_context.append(self._format_model_summary(payload))
-                except Exception as exc:  # pragma: no cover - validation errors
-                    supplemental_context.append(
-                        "EV model assistance is unavailable for this request."
-                    )
-                    supplemental_context.append(f"Model error: {exc}")
-
-            try:
-                response = self._client.responses.create(
-                    model=self._openai_model,
-                    input=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        *({"role": "system", "content": ctx} for ctx in supplemental_context),
-                        {"role": "user", "content": user_input.strip()},
-                    ],
-                    max_output_tokens=400,
-                )
-            except Exception as exc:  # pragma: no cover - network/runtime errors
-                return f"Sorry, I couldn't reach the EV assistant service: {exc}"
-
-            output_text = getattr(response, "output_text", "").strip()
-            if not output_text:
-                return (
-                    "I’m sorry, I couldn’t generate a response right now. "
-                    "Please try asking your EV question again."
-                )
-
-            return output_text
+            return None
 
         if self._provider == "huggingface":
-            if InferenceClient is None:
+            if not _library_available("huggingface_hub"):
                 return (
                     "The chatbot service is unavailable because the Hugging Face client "
                     "library is not installed. Please install 'huggingface_hub'."
@@ -182,68 +641,264 @@ class EVBotChatbot:
                     "The chatbot is not configured yet. Please set the HF_API_KEY "
                     "environment variable and restart the application."
                 )
+            return None
 
-            supplemental_context = []
-            if payload:
-                try:
-                    supplemental_context.append(
-                        self._format_model_summary(payload)
-                    )
-                except Exception as exc:  # pragma: no cover - validation errors
-                    supplemental_context.append(
-                        "EV model assistance is unavailable for this request."
-                    )
-                    supplemental_context.append(f"Model error: {exc}")
+        # If no provider is configured, instruct user.
+        return (
+            "The chatbot is not configured yet. Please set either OPENAI_API_KEY or "
+            "HF_API_KEY as an environment variable and restart the application."
+        )
 
+    def _build_messages(
+        self,
+        user_input: str,
+        payload: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        supplemental_context = []
+        if payload:
             try:
-                response = self._client.chat.completions.create(
-                    model=self._hf_model,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        *({"role": "system", "content": ctx} for ctx in supplemental_context),
-                        {"role": "user", "content": user_input.strip()},
-                    ],
-                    max_tokens=400,
-                    temperature=0.4,
+                supplemental_context.append(self._format_model_summary(payload))
+            except Exception as exc:  # pragma: no cover - validation errors
+                supplemental_context.append(
+                    "EV model assistance is unavailable for this request."
                 )
-            except Exception as exc:  # pragma: no cover - network/runtime errors
-                return f"Sorry, I couldn't reach the EV assistant service: {exc}"
+                supplemental_context.append(f"Model error: {exc}")
+
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *({"role": "system", "content": ctx} for ctx in supplemental_context),
+            *self.conversations.history(session_id),
+            {"role": "user", "content": user_input.strip()},
+        ]
+
+    def _openai_response(self, client: Any, messages: List[Dict[str, str]]) -> str:
+        response = client.responses.create(
+            model=self._openai_model,
+            input=messages,
+            max_output_tokens=400,
+        )
+        return (getattr(response, "output_text", "") or "").strip()
+
+    def _hf_response(self, client: Any, messages: List[Dict[str, str]]) -> str:
+        response = client.chat.completions.create(
+            model=self._hf_model,
+            messages=messages,
+            max_tokens=400,
+            temperature=0.4,
+        )
 
-            choices = getattr(response, "choices", None)
-            if not choices:
-                return (
-                    "I’m sorry, I couldn’t generate a response right now. "
-                    "Please try asking your EV question again."
-                )
+        choices = getattr(response, "choices", None)
+        if not choices:
+            return ""
 
-            message = choices[0].message
-            # message may be dict or object depending on library version
-            content = getattr(message, "content", None) or message.get("content")  # type: ignore[index]
-            if isinstance(content, list):
-                content = " ".join(part.get("text", "") for part in content)
+        message = choices[0].message
+        # message may be dict or object depending on library version
+        content = getattr(message, "content", None) or message.get("content")  # type: ignore[index]
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content)
 
-            content = (content or "").strip()
-            if not content:
-                return (
-                    "I’m sorry, I couldn’t generate a response right now. "
-                    "Please try asking your EV question again."
-                )
+        return (content or "").strip()
 
-            return content
+    def _complete(self, provider: str, messages: List[Dict[str, str]]) -> str:
+        client = self._client(provider)
+        if provider == "openai":
+            return self._openai_response(client, messages)
+        return self._hf_response(client, messages)
 
-        # If no provider is configured, instruct user.
-        return (
-            "The chatbot is not configured yet. Please set either OPENAI_API_KEY or "
-            "HF_API_KEY as an environment variable and restart the application."
+    def _model_name(self, provider: Optional[str] = None) -> str:
+        provider = provider or self._provider
+        return self._openai_model if provider == "openai" else self._hf_model
+
+    def _cache_key(self, provider: Optional[str], messages: List[Dict[str, str]]) -> str:
+        return self.response_cache.key(provider, self._model_name(provider), messages)
+
+    def get_response(
+        self,
+        user_input: str,
+        payload: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> str:
+        """Process user input and return a response from the configured provider."""
+        if not user_input:
+            return "Please ask me a question about EV battery maintenance or charging!"
+
+        local = self._local_answer(user_input, payload)
+        if local is not None:
+            self.conversations.record(session_id, user_input.strip(), local)
+            return local
+
+        error = self._configuration_error()
+        if error:
+            return error
+
+        messages = self._build_messages(user_input, payload, session_id)
+        cached = self.response_cache.get(self._cache_key(self._provider, messages))
+        if cached is not None:
+            self.conversations.record(session_id, user_input.strip(), cached)
+            return cached
+
+        started = time.perf_counter()
+        try:
+            with stage("llm"):
+                answered_by, content = self._dispatch(lambda provider: self._complete(provider, messages))
+        except Exception as exc:  # pragma: no cover - network/runtime errors
+            return f"Sorry, I couldn't reach the EV assistant service: {exc}"
+
+        if not content:
+            return EMPTY_RESPONSE_MESSAGE
+
+        # A failover or hedged answer is stored under the provider that gave it
+        self.response_cache.put(self._cache_key(answered_by, messages), content, time.perf_counter() - started)
+        self.conversations.record(session_id, user_input.strip(), content)
+        return content
+
+    # --------------------------------------------------------------------- #
+    # Streaming
+    # --------------------------------------------------------------------- #
+    def _openai_stream(self, client: Any, messages: List[Dict[str, str]]) -> Iterator[str]:
+        stream = client.responses.create(
+            model=self._openai_model,
+            input=messages,
+            max_output_tokens=400,
+            stream=True,
+        )
+        for event in stream:
+            if getattr(event, "type", "") == "response.output_text.delta":
+                yield getattr(event, "delta", "") or ""
+
+    def _hf_stream(self, client: Any, messages: List[Dict[str, str]]) -> Iterator[str]:
+        stream = client.chat.completions.create(
+            model=self._hf_model,
+            messages=messages,
+            max_tokens=400,
+            temperature=0.4,
+            stream=True,
         )
+        for chunk in stream:
+            choices = getattr(chunk, "choices", None)
+            if not choices:
+                continue
+            delta = choices[0].delta
+            # delta may be dict or object depending on library version
+            content = getattr(delta, "content", None)
+            if content is None and isinstance(delta, dict):
+                content = delta.get("content")
+            yield content or ""
+
+    def _open_stream(self, provider: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Start a stream and wait for its first text, so that failures before
+        any output can still be retried, hedged or failed over."""
+        client = self._client(provider)
+        if provider == "openai":
+            chunks = self._openai_stream(client, messages)
+        else:
+            chunks = self._hf_stream(client, messages)
+        for chunk in chunks:
+            if chunk:
+                return _resume(chunk, chunks)
+        return iter(())
+
+    def stream_response(
+        self,
+        user_input: str,
+        payload: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Yield the provider's answer in chunks as they arrive.
+
+        Configuration problems and failures before the first token are
+        yielded as a single message, mirroring ``get_response``.
+        """
+        if not user_input:
+            yield "Please ask me a question about EV battery maintenance or charging!"
+            return
+
+        local = self._local_answer(user_input, payload)
+        if local is not None:
+            self.conversations.record(session_id, user_input.strip(), local)
+            yield local
+            return
+
+        error = self._configuration_error()
+        if error:
+            yield error
+            return
+
+        messages = self._build_messages(user_input, payload, session_id)
+        cached = self.response_cache.get(self._cache_key(self._provider, messages))
+        if cached is not None:
+            self.conversations.record(session_id, user_input.strip(), cached)
+            yield cached
+            return
+
+        started = time.perf_counter()
+        first_token: Optional[float] = None
+        parts: List[str] = []
+        try:
+            answered_by, chunks = self._dispatch(lambda provider: self._open_stream(provider, messages))
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                    self.stream_stats.record_first_token(first_token)
+                    record("llm_first_token", first_token)
+                parts.append(chunk)
+                yield chunk
+        except Exception as exc:  # pragma: no cover - network/runtime errors
+            self.stream_stats.errors += 1
+            if first_token is None:
+                yield f"Sorry, I couldn't reach the EV assistant service: {exc}"
+            return
+
+        if first_token is None:
+            yield EMPTY_RESPONSE_MESSAGE
+            return
+        elapsed = time.perf_counter() - started
+        self.stream_stats.record_total(elapsed)
+        record("llm_stream", elapsed)
+        answer = "".join(parts).strip()
+        self.response_cache.put(self._cache_key(answered_by, messages), answer, elapsed)
+        self.conversations.record(session_id, user_input.strip(), answer)
 
     def provider(self) -> Optional[str]:
         """Return the active provider."""
         return self._provider
 
 
-# Global chatbot instance
-chatbot = EVBotChatbot()
-if chatbot.provider():
-    print(f"EVBotChatbot: Using provider '{chatbot.provider()}' with model "
-          f"{'OPENAI_MODEL' if chatbot.provider() == 'openai' else 'HF_MODEL'}.")
+def _resume(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def _discard_result(future: Future) -> None:
+    if future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if close is not None:
+            close()
+
+
+_chatbot: Optional[EVBotChatbot] = None
+_chatbot_lock = threading.Lock()
+
+
+def get_chatbot() -> EVBotChatbot:
+    """The shared chatbot, constructed on first use."""
+    global _chatbot
+    if _chatbot is None:
+        with _chatbot_lock:
+            if _chatbot is None:
+                bot = EVBotChatbot()
+                if bot.provider():
+                    print(f"EVBotChatbot: Using provider '{bot.provider()}' with model "
+                          f"{'OPENAI_MODEL' if bot.provider() == 'openai' else 'HF_MODEL'}.")
+                _chatbot = bot
+    return _chatbot
+
+
+def __getattr__(name: str) -> Any:
+    # ``from chatbot import chatbot`` still works, without building the bot at import.
+    if name == "chatbot":
+        return get_chatbot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
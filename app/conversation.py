@@ -0,0 +1,164 @@
+"""
+Server-side conversation memory for the EVBot chatbot.
+
+Each session keeps its recent turns verbatim plus a running summary of
+older ones. Whenever the history outgrows its token budget the oldest turns
+are folded into the summary, so the context sent upstream stays the same
+size however long a conversation runs. Idle sessions are evicted LRU-first.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Rough per-message framing cost of chat APIs, in tokens.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token for English)."""
+    return math.ceil(len(text) / 4) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[: limit - 1].rstrip() + "…"
+
+
+def summarize_turn(question: str, answer: str) -> str:
+    """One-line extractive digest of a turn: the question and the gist of the answer."""
+    return f"User asked: {_first_sentence(question, 160)} EVBot: {_first_sentence(answer, 200)}"
+
+
+class Session:
+    """Recent turns plus a bounded running summary of earlier ones."""
+
+    def __init__(self) -> None:
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.summary: Deque[str] = deque()
+        self.turn_tokens = 0
+        self.summary_tokens = 0
+        self.folded = 0
+        self.last_used = time.monotonic()
+
+    def messages(self) -> List[Dict[str, str]]:
+        messages = []
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": "Earlier in this conversation:\n" + "\n".join(self.summary),
+            })
+        for question, answer in self.turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def tokens(self) -> int:
+        return self.turn_tokens + self.summary_tokens
+
+
+class ConversationStore:
+    """Bounded LRU store of sessions with a per-request history token budget.
+
+    ``token_budget`` caps the summary plus verbatim turns sent with each
+    request; ``summary_budget`` caps the summary alone, dropping its oldest
+    lines first. Sessions idle for ``idle_ttl`` seconds, or beyond
+    ``max_sessions``, are evicted.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_ttl: float = 1800.0,
+        token_budget: int = 1200,
+        summary_budget: int = 300,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.summary_budget = min(summary_budget, token_budget // 2)
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.folded_turns = 0
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.idle_ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def history(self, session_id: Optional[str]) -> List[Dict[str, str]]:
+        """Messages to send ahead of the new question (empty without a session)."""
+        if not session_id or self.max_sessions <= 0:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session.messages()
+
+    def record(self, session_id: Optional[str], question: str, answer: str) -> None:
+        """Append a completed turn, folding old turns into the summary if needed."""
+        if not session_id or self.max_sessions <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session()
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+
+            session.turns.append((question, answer))
+            session.turn_tokens += estimate_tokens(question) + estimate_tokens(answer)
+            while session.turns and session.tokens() > self.token_budget:
+                old_question, old_answer = session.turns.popleft()
+                session.turn_tokens -= estimate_tokens(old_question) + estimate_tokens(old_answer)
+                line = summarize_turn(old_question, old_answer)
+                session.summary.append(line)
+                session.summary_tokens += estimate_tokens(line)
+                session.folded += 1
+                self.folded_turns += 1
+                while session.summary_tokens > self.summary_budget:
+                    session.summary_tokens -= estimate_tokens(session.summary.popleft())
+            self._expire(now)
+
+    def clear(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = [session.tokens() for session in self._sessions.values()]
+        return {
+            "sessions": len(sizes),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "token_budget": self.token_budget,
+            "summary_budget": self.summary_budget,
+            "max_history_tokens": max(sizes, default=0),
+            "folded_turns": self.folded_turns,
+            "evictions": self.evictions,
+        }
+
+
+conversation_store = ConversationStore(
+    max_sessions=int(os.getenv("CHATBOT_MAX_SESSIONS", "1000")),
+    idle_ttl=float(os.getenv("CHATBOT_SESSION_TTL", "1800")),
+    token_budget=int(os.getenv("CHATBOT_HISTORY_TOKENS", "1200")),
+    summary_budget=int(os.getenv("CHATBOT_SUMMARY_TOKENS", "300")),
+)
@@ -0,0 +1,489 @@
+"""
+Dashboard aggregation helpers for EVBot.
+
+Precomputes an aggregate "cube" over every (EV model, battery type,
+charging mode) filter combination so the dashboard statistics become a
+dictionary lookup instead of repeated passes over the dataset (sessions
+appended to the dataset are folded into it incrementally), and keeps
+an LRU cache of the fully encoded chart payloads. Above a configurable
+row count the point-cloud charts switch to a level-of-detail rendering so
+the payload size stays bounded.
+
+In client-side filtering mode the browser instead downloads the chart
+columns once as a compact binary blob (``get_dataset_blob``) and filters,
+aggregates and re-renders locally.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+from dataset import TARGET_COLUMN, dataset_cache
+from timing import stage
+
+ALL = "all"
+
+# Filter dimensions, in the order used for cube keys
+FILTER_COLUMNS: Tuple[str, str, str] = ("EV Model", "Battery Type", "Charging Mode")
+
+# (stats_key, dataframe_column_name)
+SUM_COLUMNS = [
+    ("efficiency", "Efficiency (%)"),
+    ("degradation", "Degradation Rate (%)"),
+    ("soc", "SOC (%)"),
+    ("voltage", "Voltage (V)"),
+]
+
+CLASS_IDS = (0, 1, 2)
+
+CubeKey = Tuple[str, str, str]
+Cell = Dict[str, float]
+
+
+def _empty_cell() -> Cell:
+    cell: Cell = {"count": 0}
+    for key, _ in SUM_COLUMNS:
+        cell[f"sum_{key}"] = 0.0
+    for class_id in CLASS_IDS:
+        cell[f"class_{class_id}"] = 0
+    return cell
+
+
+class AggregateCube:
+    """Count, sums and class counts for every filter combination, with rollups."""
+
+    def __init__(self, cells: Dict[CubeKey, Cell]) -> None:
+        self._cells = cells
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AggregateCube":
+        base = pd.DataFrame({column: df[column].astype(str) for column in FILTER_COLUMNS})
+        base["count"] = 1
+        for key, column in SUM_COLUMNS:
+            base[f"sum_{key}"] = df[column].astype("float64")
+        for class_id in CLASS_IDS:
+            base[f"class_{class_id}"] = (df[TARGET_COLUMN] == class_id).astype("int64")
+
+        # One pass over the rows for the finest cells, then roll the (small)
+        # cell table up for every subset of dimensions set to "all".
+        finest = base.groupby(list(FILTER_COLUMNS), sort=False).sum()
+        cells: Dict[CubeKey, Cell] = {(ALL, ALL, ALL): _empty_cell()}
+        for kept in itertools.product((True, False), repeat=len(FILTER_COLUMNS)):
+            levels = [column for column, keep in zip(FILTER_COLUMNS, kept) if keep]
+            if levels:
+                rolled = finest.groupby(level=levels, sort=False).sum()
+            else:
+                rolled = finest.sum().to_frame().T
+                rolled.index = [()]
+            for index, row in zip(rolled.index, rolled.to_dict("records")):
+                values = iter(index if isinstance(index, tuple) else (index,))
+                key = tuple(next(values) if keep else ALL for keep in kept)
+                cells[key] = {
+                    name: (int(value) if name == "count" or name.startswith("class_") else float(value))
+                    for name, value in row.items()
+                }
+        return cls(cells)
+
+    def merged(self, other: "AggregateCube") -> "AggregateCube":
+        """A new cube holding the totals of both; ``self`` is left untouched.
+
+        Costs one step per cell of ``other``, so appended rows are added by
+        building a cube over just those rows and merging it in.
+        """
+        cells = dict(self._cells)
+        for key, cell in other._cells.items():
+            base = cells.get(key)
+            cells[key] = dict(cell) if base is None else {name: base[name] + value for name, value in cell.items()}
+        return AggregateCube(cells)
+
+    def lookup(self, ev_model: str = ALL, battery_type: str = ALL, charging_mode: str = ALL) -> Cell:
+        return self._cells.get((ev_model, battery_type, charging_mode)) or _empty_cell()
+
+    def stats(self, ev_model: str = ALL, battery_type: str = ALL, charging_mode: str = ALL) -> Dict[str, float]:
+        """Dashboard statistics for a filter combination."""
+        cell = self.lookup(ev_model, battery_type, charging_mode)
+        count = cell["count"]
+        stats: Dict[str, float] = {"total_samples": count}
+        for key, _ in SUM_COLUMNS:
+            stats[f"avg_{key}"] = round(cell[f"sum_{key}"] / count, 2) if count > 0 else 0
+        for class_id in CLASS_IDS:
+            stats[f"class_{class_id}"] = cell[f"class_{class_id}"]
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+
+_cube_lock = threading.Lock()
+_cube: Optional[Tuple[int, AggregateCube]] = None
+
+
+def get_cube() -> AggregateCube:
+    """Return the cube for the current dataset version.
+
+    Rows appended since the cube was built are merged in; it is only rebuilt
+    from the whole dataset when the file was otherwise changed.
+    """
+    global _cube
+    version = dataset_cache.sync()
+    cached = _cube
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _cube_lock:
+        cached = _cube
+        if cached is None or cached[0] != version:
+            changes = None if cached is None else dataset_cache.changes_since(cached[0])
+            if changes is not None:
+                frames, latest = changes
+                _cube = (latest, cached[1].merged(AggregateCube.from_frame(pd.concat(frames))))
+            else:
+                df, latest = dataset_cache.snapshot()
+                _cube = (latest, AggregateCube.from_frame(df))
+        return _cube[1]
+
+
+# --------------------------------------------------------------------------- #
+# Chart payloads
+# --------------------------------------------------------------------------- #
+PAYLOAD_CACHE_SIZE = int(os.getenv("DASHBOARD_PAYLOAD_CACHE_SIZE", "64"))
+
+# Level-of-detail settings for the SOC/Voltage and Degradation/Cycles charts
+LOD_THRESHOLD = int(os.getenv("DASHBOARD_LOD_THRESHOLD", "5000"))
+LOD_MODES = ("bins", "sample")
+LOD_MODE = os.getenv("DASHBOARD_LOD_MODE", "bins")
+if LOD_MODE not in LOD_MODES:
+    raise ValueError(f"DASHBOARD_LOD_MODE must be one of {', '.join(LOD_MODES)}, not {LOD_MODE!r}")
+LOD_BINS = int(os.getenv("DASHBOARD_LOD_BINS", "60"))
+LOD_SAMPLE_SIZE = int(os.getenv("DASHBOARD_LOD_SAMPLE_SIZE", "2000"))
+
+CLASS_COLORS = {0: "#22C55E", 1: "#FACC15", 2: "#EF4444"}
+
+
+def filter_frame(
+    df: pd.DataFrame,
+    ev_model: str = ALL,
+    battery_type: str = ALL,
+    charging_mode: str = ALL,
+) -> pd.DataFrame:
+    """Apply the dashboard filters (boolean masks leave the cached frame untouched)."""
+    filtered_df = df
+    for column, value in zip(FILTER_COLUMNS, (ev_model, battery_type, charging_mode)):
+        if value != ALL:
+            filtered_df = filtered_df[filtered_df[column] == value]
+    return filtered_df
+
+
+def stratified_sample(
+    df: pd.DataFrame,
+    size: int,
+    columns: List[str],
+    seed: int = 42,
+) -> pd.DataFrame:
+    """Downsample per charging class while keeping extreme points.
+
+    Up to a tenth of the budget goes to rows outside the 0.5-99.5 percentile
+    range of any of ``columns``; the rest is split across classes in
+    proportion to their share of ``df``.
+    """
+    if len(df) <= size:
+        return df
+
+    rng = np.random.default_rng(seed)
+    values = df[columns].to_numpy(dtype="float64")
+    low, high = np.nanquantile(values, [0.005, 0.995], axis=0)
+    outliers = np.flatnonzero(((values < low) | (values > high)).any(axis=1))
+    if len(outliers) > size // 10:
+        outliers = rng.choice(outliers, size // 10, replace=False)
+
+    keep = np.zeros(len(df), dtype=bool)
+    keep[outliers] = True
+    remaining = size - len(outliers)
+    classes = df[TARGET_COLUMN].to_numpy()
+    for class_id in CLASS_IDS:
+        members = classes == class_id
+        candidates = np.flatnonzero(members & ~keep)
+        share = min(len(candidates), int(remaining * members.sum() / len(df)))
+        keep[rng.choice(candidates, share, replace=False)] = True
+    return df[keep]
+
+
+def binned_scatter(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    title: str,
+    bins: int = LOD_BINS,
+) -> go.Figure:
+    """Scatter of non-empty 2D bin centres per charging class, sized by count."""
+    import plotly.graph_objects as go
+
+    xs = df[x].to_numpy(dtype="float64")
+    ys = df[y].to_numpy(dtype="float64")
+    classes = df[TARGET_COLUMN].to_numpy()
+    # Ingested rows may carry missing values, which the bin edges cannot span
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    if not finite.all():
+        xs, ys, classes = xs[finite], ys[finite], classes[finite]
+    x_edges = np.histogram_bin_edges(xs, bins)
+    y_edges = np.histogram_bin_edges(ys, bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+
+    counts = {
+        class_id: np.histogram2d(xs[classes == class_id], ys[classes == class_id], bins=[x_edges, y_edges])[0]
+        for class_id in CLASS_IDS
+    }
+    peak = max(max(grid.max() for grid in counts.values()), 1.0)
+
+    fig = go.Figure()
+    for class_id, grid in counts.items():
+        ix, iy = np.nonzero(grid)
+        bin_counts = grid[ix, iy]
+        fig.add_trace(go.Scatter(
+            x=x_centers[ix], y=y_centers[iy],
+            mode='markers',
+            name=f'Class {class_id}',
+            customdata=bin_counts,
+            marker={'size': 4 + 16 * np.sqrt(bin_counts / peak), 'color': CLASS_COLORS[class_id], 'opacity': 0.7},
+            hovertemplate=f'{x}=%{{x:.2f}}<br>{y}=%{{y:.2f}}<br>Sessions=%{{customdata}}<extra>Class {class_id}</extra>',
+        ))
+    fig.update_layout(
+        title=f'{title} (binned, {len(df):,} sessions)',
+        xaxis_title=x, yaxis_title=y,
+        legend_title_text='Charging Class',
+    )
+    return fig
+
+
+def build_figures(filtered_df: pd.DataFrame, lod: Optional[str] = None) -> Dict[str, Any]:
+    """Build the four dashboard charts.
+
+    ``lod`` picks the level-of-detail rendering ("bins" or "sample") used for
+    the point-cloud charts once the frame exceeds ``LOD_THRESHOLD`` rows.
+    """
+    # Plotly is imported on first use: plotly.express alone takes a few
+    # hundred ms to import, which every process would otherwise pay at startup.
+    import plotly.express as px
+
+    lod = lod or LOD_MODE
+    use_bins = len(filtered_df) > LOD_THRESHOLD and lod == "bins"
+    points_df = filtered_df
+    if len(filtered_df) > LOD_THRESHOLD and lod == "sample":
+        points_df = stratified_sample(
+            filtered_df, LOD_SAMPLE_SIZE,
+            ['SOC (%)', 'Voltage (V)', 'Charging Cycles', 'Degradation Rate (%)'],
+        )
+
+    if use_bins:
+        fig1 = binned_scatter(filtered_df, 'SOC (%)', 'Voltage (V)', 'State of Charge vs Voltage')
+    else:
+        fig1 = px.scatter(points_df, x='SOC (%)', y='Voltage (V)',
+                          color='Optimal Charging Duration Class',
+                          title='State of Charge vs Voltage',
+                          labels={'Optimal Charging Duration Class': 'Charging Class'},
+                          hover_data=['EV Model', 'Battery Type', 'Charging Mode'])
+
+    if len(filtered_df) > 0:
+        efficiency_df = filtered_df.groupby(['EV Model', 'Battery Type'], observed=True)['Efficiency (%)'].mean().reset_index()
+        fig2 = px.bar(efficiency_df, x='EV Model', y='Efficiency (%)',
+                      color='Battery Type',
+                      title='Average Efficiency per EV Model',
+                      barmode='group')
+    else:
+        fig2 = px.bar(title='Average Efficiency per EV Model')
+
+    # Pass the class counts rather than one label per row
+    class_counts = filtered_df[TARGET_COLUMN].value_counts(sort=False).rename_axis(TARGET_COLUMN).reset_index(name='Sessions')
+    fig3 = px.pie(class_counts, names='Optimal Charging Duration Class', values='Sessions',
+                  title='Optimal Charging Duration Class Distribution',
+                  labels={'Optimal Charging Duration Class': 'Class'})
+
+    if use_bins:
+        fig4 = binned_scatter(filtered_df, 'Charging Cycles', 'Degradation Rate (%)', 'Battery Degradation vs Charging Cycles')
+    else:
+        fig4 = px.scatter(points_df, x='Charging Cycles', y='Degradation Rate (%)',
+                          color='Optimal Charging Duration Class',
+                          size='Efficiency (%)',
+                          title='Battery Degradation vs Charging Cycles',
+                          hover_data=['EV Model', 'SOC (%)'])
+
+    return {"fig1": fig1, "fig2": fig2, "fig3": fig3, "fig4": fig4}
+
+
+class PayloadCache:
+    """Bounded, thread-safe LRU of encoded dashboard responses."""
+
+    def __init__(self, maxsize: int = PAYLOAD_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[Any, ...], entry: Tuple[bytes, str]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+payload_cache = PayloadCache()
+
+
+def get_dashboard_payload(
+    ev_model: str = ALL,
+    battery_type: str = ALL,
+    charging_mode: str = ALL,
+    lod: Optional[str] = None,
+) -> Tuple[bytes, str]:
+    """Return the encoded ``/api/dashboard/data`` body and its strong ETag.
+
+    Figures are embedded as JSON objects and the whole body is encoded once,
+    then cached per filter tuple, level-of-detail mode and dataset version.
+    """
+    if lod not in LOD_MODES:
+        lod = LOD_MODE
+    df, version = dataset_cache.snapshot()
+    key = (version, ev_model, battery_type, charging_mode, lod)
+    entry = payload_cache.get(key)
+    if entry is not None:
+        return entry
+
+    with stage("filter"):
+        filtered_df = filter_frame(df, ev_model, battery_type, charging_mode)
+    with stage("cube"):
+        payload: Dict[str, Any] = {"stats": get_cube().stats(ev_model, battery_type, charging_mode)}
+    with stage("figures"):
+        payload.update(build_figures(filtered_df, lod))
+    payload["has_data"] = len(filtered_df) > 0
+
+    from plotly.utils import PlotlyJSONEncoder
+
+    with stage("json_encode"):
+        body = json.dumps(payload, cls=PlotlyJSONEncoder).encode("utf-8")
+    entry = (body, hashlib.sha256(body).hexdigest()[:32])
+    payload_cache.put(key, entry)
+    return entry
+
+
+# --------------------------------------------------------------------------- #
+# Binary dataset for client-side filtering
+# --------------------------------------------------------------------------- #
+# "client" ships the dataset to the browser once; "server" keeps the
+# per-filter round trips to /api/dashboard/data.
+FILTERING_MODE = os.getenv("DASHBOARD_FILTERING", "client")
+# Larger datasets fall back to server-side filtering
+CLIENT_MAX_ROWS = int(os.getenv("DASHBOARD_CLIENT_MAX_ROWS", "500000"))
+
+BLOB_MAGIC = b"EVB1"
+
+# (key used by the browser, dataframe_column_name)
+CLIENT_COLUMNS: List[Tuple[str, str]] = [
+    ("soc", "SOC (%)"),
+    ("voltage", "Voltage (V)"),
+    ("cycles", "Charging Cycles"),
+    ("degradation", "Degradation Rate (%)"),
+    ("efficiency", "Efficiency (%)"),
+    ("ev_model", "EV Model"),
+    ("battery_type", "Battery Type"),
+    ("mode", "Charging Mode"),
+    ("class", TARGET_COLUMN),
+]
+
+
+def _client_array(values: pd.Series) -> Tuple[np.ndarray, Optional[List[str]]]:
+    """Smallest typed array the browser can view directly, plus a dictionary for strings."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = [str(category) for category in values.cat.categories]
+        dtype = np.int8 if len(categories) < 127 else np.int16 if len(categories) < 32767 else np.int32
+        return values.cat.codes.to_numpy().astype(dtype), categories
+    if pd.api.types.is_float_dtype(values):
+        return values.to_numpy(dtype=np.float32), None
+    data = values.to_numpy()
+    return data.astype(np.int8 if data.size and -128 <= data.min() and data.max() < 128 else np.int32), None
+
+
+def encode_dataset_blob(df: pd.DataFrame, version: int = 0) -> bytes:
+    """Encode the chart columns of ``df`` for the dashboard's client-side engine.
+
+    Layout (little-endian): ``EVB1``, a uint32 header length, a JSON header
+    (rows, version and per-column key, dtype, byte offset and dictionary),
+    then one typed array per column, each 4-byte aligned so the browser can
+    wrap it in a typed-array view without copying. Categorical columns are
+    codes into their dictionary (-1 for missing values).
+    """
+    buffers: List[bytes] = []
+    columns = []
+    offset = 0
+    for key, column in CLIENT_COLUMNS:
+        data, categories = _client_array(df[column])
+        raw = data.astype(data.dtype.newbyteorder("<")).tobytes()
+        columns.append({"key": key, "dtype": data.dtype.name, "offset": offset, "categories": categories})
+        buffers.append(raw + b"\0" * (-len(raw) % 4))
+        offset += len(buffers[-1])
+
+    header = json.dumps({"rows": len(df), "version": version, "columns": columns}).encode("utf-8")
+    # Pad so the column data starts 4-byte aligned
+    header += b" " * (-(len(BLOB_MAGIC) + 4 + len(header)) % 4)
+    return BLOB_MAGIC + struct.pack("<I", len(header)) + header + b"".join(buffers)
+
+
+_blob_lock = threading.Lock()
+# (dataset version, raw blob, gzipped blob, etag)
+_blob: Optional[Tuple[int, bytes, bytes, str]] = None
+
+
+def get_dataset_blob() -> Tuple[bytes, bytes, str]:
+    """Raw and gzip-compressed binary dataset for the current version, and its ETag.
+
+    Both encodings are built once per dataset version.
+    """
+    global _blob
+    df, version = dataset_cache.snapshot()
+    cached = _blob
+    if cached is None or cached[0] != version:
+        with _blob_lock:
+            if _blob is None or _blob[0] != version:
+                with stage("blob_encode"):
+                    raw = encode_dataset_blob(df, version)
+                _blob = (version, raw, gzip.compress(raw, 6, mtime=0), hashlib.sha256(raw).hexdigest()[:32])
+            cached = _blob
+    return cached[1], cached[2], cached[3]
+
+
+def client_filtering_enabled() -> bool:
+    """Whether the dashboard should filter in the browser for the current dataset."""
+    return FILTERING_MODE == "client" and len(dataset_cache.get()) <= CLIENT_MAX_ROWS
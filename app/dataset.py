@@ -0,0 +1,571 @@
+"""
+Dataset access helpers for EVBot.
+
+The CSV stays the source of truth, but it is parsed only once: its columns
+are converted into a typed binary columnar store (``ColumnarStore``) next to
+it, which every consumer memory-maps instead of re-parsing text. Rows
+appended to the CSV, by this or another process, are parsed on their own and
+appended to the store; any other change to the file rebuilds it.
+
+``DatasetCache`` keeps the dashboard routes' shared view of the dataset on
+top of the store.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from timing import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single development server writes the store
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# EVBOT_DATA_PATH points the app at another dataset (e.g. a synthetic one for load tests)
+DATA_PATH = os.getenv("EVBOT_DATA_PATH") or os.path.join(BASE_DIR, "data", "ev_battery_charging_data.csv")
+
+CATEGORICAL_COLUMNS = ["Charging Mode", "Battery Type", "EV Model"]
+TARGET_COLUMN = "Optimal Charging Duration Class"
+
+# Appends remembered for incremental consumers such as the aggregate cube
+APPEND_LOG_SIZE = 256
+# Bytes before the end of the converted region used to detect a rewritten CSV
+MARKER_BYTES = 64
+# Rows parsed at a time when (re)building a store, bounding peak memory
+REBUILD_CHUNK_ROWS = 1_000_000
+STORE_FORMAT = 1
+STORE_SUFFIX = ".columnar"
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Store string columns as categoricals and downcast numeric columns."""
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype("category")
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="float")
+    return df
+
+
+def store_path(csv_path: str) -> str:
+    """Default location of the columnar store for ``csv_path``."""
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+
+def _code_dtype(categories: int) -> np.dtype:
+    # The code width pandas itself uses, so categoricals can wrap the mapped
+    # codes without copying them
+    for dtype in (np.int8, np.int16, np.int32):
+        if categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class _Prefix(io.RawIOBase):
+    """The first ``limit`` bytes of a binary file."""
+
+    def __init__(self, handle: Any, limit: int) -> None:
+        self._handle = handle
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read = self._handle.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+
+
+def _column_array(chunks: List[Any]) -> Tuple[np.ndarray, Optional[List[str]]]:
+    """Merge the per-chunk values of one column into its stored array and dictionary."""
+    if any(isinstance(chunk, pd.Categorical) for chunk in chunks):
+        chunks = [chunk if isinstance(chunk, pd.Categorical) else _categorical(pd.Series(chunk)) for chunk in chunks]
+        merged = union_categoricals(chunks, sort_categories=True)
+        categories = [str(category) for category in merged.categories]
+        return merged.codes.astype(_code_dtype(len(categories))), categories
+    if any(chunk.dtype.kind == "f" for chunk in chunks):
+        return np.concatenate([chunk.astype(np.float32) for chunk in chunks]), None
+    return np.concatenate(chunks).astype(np.int64), None
+
+
+def _categorical(values: pd.Series) -> pd.Categorical:
+    values = values.astype(object)
+    return pd.Categorical(values.astype(str).where(values.notna()))
+
+
+class StoreMismatch(ValueError):
+    """Appended rows do not fit the store (changed type, too many categories)."""
+
+
+class ColumnarStore:
+    """Typed binary columnar copy of a CSV, kept in sync with it.
+
+    Layout of the store directory::
+
+        meta.json             columns, dtypes, category dictionaries, row
+                              count and how much of the CSV is converted
+        <generation>/<i>.bin  one raw little-endian array per column
+
+    Float columns are stored as float32 (the precision the trees compare
+    at), integer columns as int64 and string columns as dictionary codes.
+    Dictionaries are the sorted distinct values, i.e. the codes a
+    ``LabelEncoder`` fitted on the same data (``label_encoders.pkl``)
+    assigns, except that categories first seen in an append are added at
+    the end so existing codes stay valid; the next rebuild sorts them
+    again. A missing string is code -1.
+
+    Appends extend the column files in place and rewrite ``meta.json`` last,
+    so readers only map rows ``meta.json`` vouches for. Rebuilds write a new
+    generation directory, leaving files that other processes still map
+    untouched.
+
+    A last row without a trailing newline is converted once it has every
+    field, as ``pd.read_csv`` would read it. It is provisional: the next
+    sync drops and re-reads it, in case it was still being written. A
+    shorter one is left for the next sync.
+    """
+
+    def __init__(self, csv_path: str = DATA_PATH, directory: Optional[str] = None) -> None:
+        self.csv_path = csv_path
+        self.directory = directory or store_path(csv_path)
+        self._lock = threading.Lock()
+        self.last_action: Optional[str] = None
+        self.last_sync_seconds = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+    def read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, "meta.json"), encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("format") == STORE_FORMAT else None
+
+    def arrays(self, meta: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+        """Read-only memory-mapped column arrays (codes for string columns)."""
+        meta = meta or self.sync()
+        rows = meta["rows"]
+        arrays = {}
+        for index, column in enumerate(meta["columns"]):
+            dtype = np.dtype(column["dtype"])
+            path = os.path.join(self.directory, meta["generation"], f"{index}.bin")
+            # mmap cannot map an empty file
+            arrays[column["name"]] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows else np.empty(0, dtype)
+        return arrays
+
+    def load(self, meta: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """The dataset as a frame over the memory-mapped columns (no copies).
+
+        String columns are categoricals whose codes are the stored codes.
+        The frame is read-only.
+        """
+        meta = meta or self.sync()
+        columns: Dict[str, Any] = {}
+        for column, (name, data) in zip(meta["columns"], self.arrays(meta).items()):
+            if column["categories"] is None:
+                columns[name] = data
+            else:
+                # Codes were written by the store itself, so skip the range scan
+                columns[name] = pd.Categorical.from_codes(data, categories=column["categories"], validate=False)
+        return pd.DataFrame(columns, copy=False)
+
+    # ------------------------------------------------------------------ #
+    # Syncing with the CSV
+    # ------------------------------------------------------------------ #
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serialise writers across threads and, where supported, processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def _is_current(self, meta: Optional[Dict[str, Any]], stat: os.stat_result) -> bool:
+        return meta is not None and source_size(meta) == stat.st_size \
+            and meta["source"]["mtime_ns"] == stat.st_mtime_ns
+
+    def sync(self, rebuild: bool = False) -> Dict[str, Any]:
+        """Bring the store up to date with the CSV and return its metadata."""
+        meta = self.read_meta()
+        if not rebuild and self._is_current(meta, os.stat(self.csv_path)):
+            self.last_action = "unchanged"
+            return meta
+
+        with self._locked(), stage("csv_read"):
+            started = time.perf_counter()
+            # Another writer may have synced while we waited for the lock
+            meta = self.read_meta()
+            stat = os.stat(self.csv_path)
+            if not rebuild and self._is_current(meta, stat):
+                self.last_action = "unchanged"
+                return meta
+            try:
+                if rebuild or meta is None:
+                    raise StoreMismatch("no usable store")
+                meta = self._append_tail(meta, stat)
+                self.last_action = "appended"
+            except StoreMismatch:
+                meta = self._rebuild(stat)
+                self.last_action = "rebuilt"
+            self.last_sync_seconds = time.perf_counter() - started
+            return meta
+
+    def _complete_bytes(self, size: int) -> int:
+        """Length of the CSV up to its last complete row within ``size`` bytes."""
+        with open(self.csv_path, "rb") as handle:
+            end = size
+            while end > 0:
+                start = max(0, end - (1 << 16))
+                handle.seek(start)
+                block = handle.read(end - start)
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    return start + newline + 1
+                end = start
+        return 0
+
+    def _read_csv_bytes(self, start: int, stop: int) -> bytes:
+        with open(self.csv_path, "rb") as handle:
+            handle.seek(start)
+            return handle.read(stop - start)
+
+    @staticmethod
+    def _last_row(data: bytes, fields: int) -> bytes:
+        """Bytes after the last newline of ``data`` if they hold a whole row.
+
+        With fewer than ``fields`` fields the row is still being written by
+        another process and is picked up next time.
+        """
+        rest = data[data.rfind(b"\n") + 1:]
+        row = next(csv.reader([rest.decode("utf-8", "replace")]), [])
+        return rest if rest.strip() and len(row) == fields else b""
+
+    def _append_tail(self, meta: Dict[str, Any], stat: os.stat_result) -> Dict[str, Any]:
+        source = meta["source"]
+        if stat.st_size < source["bytes"]:
+            raise StoreMismatch("the CSV shrank")
+        marker = bytes.fromhex(source["marker"])
+        start = source["bytes"] - len(marker)
+        data = self._read_csv_bytes(start, stat.st_size)
+        if not data.startswith(marker):
+            raise StoreMismatch("the CSV was rewritten")
+        columns = meta["columns"]
+        # A provisional last row is dropped and read again with the tail
+        rows = meta["rows"] - source.get("partial_rows", 0)
+        last = self._last_row(data, len(columns))
+        complete = data[:data.rfind(b"\n") + 1]
+        tail = data[len(marker):len(complete)] + last
+
+        names = [column["name"] for column in columns]
+        chunks: List[np.ndarray] = []
+        if tail:
+            try:
+                frame = pd.read_csv(io.BytesIO(tail), header=None, names=names, index_col=False)
+            except (ValueError, pd.errors.ParserError) as error:
+                raise StoreMismatch(str(error)) from error
+            encoded = [self._encode_tail(frame[column["name"]], column) for column in columns]
+            chunks = [chunk for chunk, _ in encoded]
+            columns = [column for _, column in encoded]
+
+            directory = os.path.join(self.directory, meta["generation"])
+            for index, (column, chunk) in enumerate(zip(columns, chunks)):
+                with open(os.path.join(directory, f"{index}.bin"), "r+b") as handle:
+                    # Drop bytes of an append that crashed before meta.json
+                    # was written, and the previous provisional row
+                    handle.truncate(rows * np.dtype(column["dtype"]).itemsize)
+                    handle.seek(0, os.SEEK_END)
+                    handle.write(np.ascontiguousarray(chunk).tobytes())
+
+        meta = dict(meta, rows=rows + (len(chunks[0]) if chunks else 0), columns=columns)
+        meta["source"] = {
+            "bytes": start + len(complete),
+            "size": start + len(complete) + len(last),
+            "partial_rows": 1 if last else 0,
+            "mtime_ns": stat.st_mtime_ns,
+            "marker": complete[-MARKER_BYTES:].hex(),
+        }
+        self._write_meta(meta)
+        return meta
+
+    @staticmethod
+    def _encode_tail(values: pd.Series, column: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Stored values for appended rows, and the column with any new categories."""
+        dtype = np.dtype(column["dtype"])
+        if column["categories"] is not None:
+            strings = values.astype(object)
+            missing = strings.isna()
+            unknown = set(strings[~missing].astype(str)) - set(column["categories"])
+            if unknown:
+                categories = column["categories"] + sorted(unknown)
+                if len(categories) >= np.iinfo(dtype).max:
+                    raise StoreMismatch(f"too many categories for {column['name']}")
+                column = dict(column, categories=categories)
+            lookup = {category: code for code, category in enumerate(column["categories"])}
+            codes = strings.astype(str).map(lookup)
+            codes[missing] = -1
+            return codes.to_numpy(dtype=dtype), column
+        if dtype.kind == "i" and not pd.api.types.is_integer_dtype(values):
+            raise StoreMismatch(f"non-integer values for {column['name']}")
+        if not pd.api.types.is_numeric_dtype(values):
+            raise StoreMismatch(f"non-numeric values for {column['name']}")
+        return values.to_numpy(dtype=dtype), column
+
+    def _rebuild(self, stat: os.stat_result) -> Dict[str, Any]:
+        size = self._complete_bytes(stat.st_size)
+        last = b""
+        if size:
+            with open(self.csv_path, "rb") as handle:
+                header = next(csv.reader([handle.readline().decode("utf-8", "replace")]), [])
+            last = self._last_row(self._read_csv_bytes(size, stat.st_size), len(header))
+        names: List[str] = []
+        chunks: Dict[str, List[Any]] = {}
+        rows = 0
+        # Parsed in chunks, keeping only the compact per-chunk arrays
+        with open(self.csv_path, "rb") as handle:
+            reader = pd.read_csv(io.BufferedReader(_Prefix(handle, size + len(last))), chunksize=REBUILD_CHUNK_ROWS)
+            for frame in reader:
+                names = list(frame.columns)
+                rows += len(frame)
+                for name in names:
+                    values = frame[name]
+                    if pd.api.types.is_float_dtype(values):
+                        chunk: Any = values.to_numpy(dtype=np.float32)
+                    elif pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+                        chunk = values.to_numpy(dtype=np.int64)
+                    else:
+                        chunk = _categorical(values)
+                    chunks.setdefault(name, []).append(chunk)
+            marker = b""
+            if size:
+                handle.seek(max(0, size - MARKER_BYTES))
+                marker = handle.read(size - max(0, size - MARKER_BYTES))
+
+        generation = f"{time.time_ns():x}"
+        directory = os.path.join(self.directory, generation)
+        os.makedirs(directory)
+        columns = []
+        for index, name in enumerate(names):
+            array, categories = _column_array(chunks.pop(name))
+            array.tofile(os.path.join(directory, f"{index}.bin"))
+            columns.append({"name": name, "dtype": array.dtype.str, "categories": categories})
+
+        meta = {
+            "format": STORE_FORMAT,
+            "generation": generation,
+            "rows": rows,
+            "columns": columns,
+            "source": {
+                "bytes": size,
+                "size": size + len(last),
+                "partial_rows": 1 if last else 0,
+                "mtime_ns": stat.st_mtime_ns,
+                "marker": marker.hex(),
+            },
+        }
+        self._write_meta(meta)
+        # Older generations are only still needed by processes that mapped
+        # them; on POSIX their mappings survive the unlink.
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry != generation and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        return meta
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+        os.replace(path + ".tmp", path)
+
+    def info(self) -> Dict[str, Any]:
+        meta = self.read_meta()
+        return {
+            "directory": self.directory,
+            "generation": None if meta is None else meta["generation"],
+            "rows": 0 if meta is None else meta["rows"],
+            "last_action": self.last_action,
+            "last_sync_seconds": round(self.last_sync_seconds, 6),
+        }
+
+
+def source_size(meta: Dict[str, Any]) -> int:
+    """Bytes of the CSV the store has read, including a provisional last row."""
+    return meta["source"].get("size", meta["source"]["bytes"])
+
+
+def load_columnar(path: str = DATA_PATH, directory: Optional[str] = None) -> pd.DataFrame:
+    """Memory-mapped frame of the CSV at ``path``, converting it first if needed."""
+    return ColumnarStore(path, directory).load()
+
+
+class DatasetCache:
+    """Thread-safe view of the dataset keyed on the CSV's mtime and size.
+
+    The cached frame maps the columnar store and is shared between requests,
+    so callers must treat it as read-only (filtering with boolean masks
+    already returns a new frame). Every change bumps ``version``; appended
+    rows are kept in a short log (see ``changes_since``) so consumers can
+    update incrementally.
+    """
+
+    def __init__(self, path: str = DATA_PATH, store_dir: Optional[str] = None) -> None:
+        self._path = path
+        self.store = ColumnarStore(path, store_dir)
+        self._lock = threading.Lock()
+        # (frame or None until requested, (mtime_ns, converted bytes), version, store meta)
+        self._state: Optional[Tuple[Optional[pd.DataFrame], Tuple[int, int], int, Dict[str, Any]]] = None
+        self._appends: Deque[Tuple[int, pd.DataFrame]] = deque(maxlen=APPEND_LOG_SIZE)
+        self.version = 0
+        self.reload_count = 0
+        self.tail_reads = 0
+        self.appended_rows = 0
+        self.last_load_seconds = 0.0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _stat_signature(self) -> Tuple[int, int]:
+        stat = os.stat(self._path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def sync(self) -> int:
+        """Pick up changes to the file and return the dataset version.
+
+        Unlike ``snapshot`` this does not map the frame, so appended rows
+        cost only their own conversion.
+        """
+        state = self._state
+        if state is not None and state[1] == self._stat_signature():
+            return state[2]
+
+        with self._lock:
+            # Another thread may have synced while we waited for the lock.
+            signature = self._stat_signature()
+            state = self._state
+            if state is not None and state[1] == signature:
+                return state[2]
+
+            started = time.perf_counter()
+            meta = self.store.sync()
+            previous = None if state is None else state[3]
+            signature = (meta["source"]["mtime_ns"], source_size(meta))
+            # A provisional last row may have changed, so it is not an append
+            same_store = previous is not None and previous["generation"] == meta["generation"] \
+                and not previous["source"].get("partial_rows")
+            if same_store and previous["rows"] == meta["rows"]:
+                # Touched, or a row still being written: nothing new yet
+                self._state = (state[0], signature, state[2], meta)
+                return state[2]
+            self.version += 1
+            if same_store:
+                rows = self.store.load(meta).iloc[previous["rows"]:]
+                self.tail_reads += 1
+                self.appended_rows += len(rows)
+                self._appends.append((self.version, rows))
+            else:
+                self.reload_count += 1
+                self._appends.clear()
+            self.last_load_seconds = time.perf_counter() - started
+            self._state = (None, signature, self.version, meta)
+            return self.version
+
+    def snapshot(self) -> Tuple[pd.DataFrame, int]:
+        """Return the cached frame and its version, picking up file changes first."""
+        self.sync()
+        state = self._state
+        if state[0] is not None:
+            return state[0], state[2]
+
+        with self._lock:
+            frame, signature, version, meta = self._state
+            if frame is None:
+                with stage("dataset_load"):
+                    frame = self.store.load(meta)
+                self._state = (frame, signature, version, meta)
+            return frame, version
+
+    def get(self) -> pd.DataFrame:
+        """Return the cached frame, reloading it if the file changed."""
+        return self.snapshot()[0]
+
+    def changes_since(self, version: int) -> Optional[Tuple[List[pd.DataFrame], int]]:
+        """Rows appended after ``version`` and the version they bring the data to.
+
+        Returns None when that history is not available (the store was
+        rebuilt since, or too many appends happened), in which case
+        consumers rebuild from ``snapshot``.
+        """
+        with self._lock:
+            current = self._state[2] if self._state is not None else 0
+            changes = [rows for appended, rows in self._appends if appended > version]
+            if len(changes) != current - version:
+                return None
+            return changes, current
+
+    def append(self, rows: pd.DataFrame) -> int:
+        """Append ``rows`` to the CSV and return the new dataset version.
+
+        Rows are written with a single append so concurrent writers (other
+        worker processes) never interleave within a row; every process then
+        picks them up through ``sync``.
+        """
+        self.sync()
+        columns = [column["name"] for column in self._state[3]["columns"]]
+        text = rows[columns].to_csv(header=False, index=False, lineterminator="\n")
+        with self._lock:
+            with open(self._path, "a+b") as handle:
+                handle.seek(0, os.SEEK_END)
+                if handle.tell() > 0:
+                    handle.seek(-1, os.SEEK_END)
+                    if handle.read(1) != b"\n":
+                        text = "\n" + text
+                handle.write(text.encode("utf-8"))
+        return self.sync()
+
+    def info(self) -> Dict[str, Any]:
+        state = self._state
+        frame = None if state is None else state[0]
+        return {
+            "path": self._path,
+            "version": self.version,
+            "reload_count": self.reload_count,
+            "tail_reads": self.tail_reads,
+            "appended_rows": self.appended_rows,
+            "last_load_seconds": round(self.last_load_seconds, 6),
+            "rows": 0 if state is None else state[3]["rows"],
+            "memory_bytes": 0 if frame is None else int(frame.memory_usage(deep=True).sum()),
+            "store": self.store.info(),
+        }
+
+
+# Shared cache used by the Flask views
+dataset_cache = DatasetCache()
+
+
+def load_dataset() -> pd.DataFrame:
+    return dataset_cache.get()
@@ -0,0 +1,104 @@
+"""
+Ingestion of new charging sessions for EVBot.
+
+Sessions use the dataset's columns (or the prediction form keys) plus the
+observed duration class. They are validated against ``FEATURE_SPECS`` and
+appended to the dataset CSV, which the dataset cache and the dashboard
+aggregate cube then pick up incrementally: each ingested row is parsed once
+and added to the cube cells it belongs to, without re-reading the file.
+"""
+
+from __future__ import annotations
+
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataset import TARGET_COLUMN, dataset_cache
+from ml_model import BATCH_CHUNK_SIZE, FEATURE_SPECS, RESULT_TYPES, normalize_batch
+
+# Accepted spellings of the duration class
+TARGET_KEYS = (TARGET_COLUMN, "class_id")
+
+# Category values are rendered in the dashboard and stored one session per
+# CSV line, so new ones are limited to plain names
+CATEGORY_PATTERN = r"[\w .()+/-]{1,64}"
+
+
+def validate_sessions(
+    rows: pd.DataFrame, new_categories: bool = False
+) -> Tuple[pd.DataFrame, List[Optional[str]]]:
+    """Normalised sessions (dataset columns) and a per-row error, ``None`` if valid.
+
+    Category values must be known to the encoders unless ``new_categories``
+    is set (an EV model the next training run will encode). Even then,
+    they must match ``CATEGORY_PATTERN``.
+    """
+    rows = rows.reset_index(drop=True)
+    frame, errors = normalize_batch(rows, check_categories=not new_categories)
+
+    invalid: Dict[str, np.ndarray] = {}
+    for form_key, column_name, caster in FEATURE_SPECS:
+        values = frame[column_name]
+        if caster is str:
+            invalid[form_key] = ~values.str.fullmatch(CATEGORY_PATTERN).fillna(False).to_numpy(dtype=bool)
+        else:
+            invalid[form_key] = ~np.isfinite(values.to_numpy(dtype=np.float64))
+
+    target_key = next((key for key in TARGET_KEYS if key in rows.columns), None)
+    raw_target = rows[target_key] if target_key else pd.Series(None, index=rows.index, dtype=object)
+    target = pd.to_numeric(raw_target, errors="coerce")
+    target_missing = (raw_target.isna() | raw_target.astype(object).eq("")).to_numpy()
+    target_invalid = ~target_missing & ~target.isin(list(RESULT_TYPES)).to_numpy()
+    frame[TARGET_COLUMN] = target.fillna(-1).astype("int64")
+
+    for index in range(len(frame)):
+        if errors[index] is not None:
+            continue
+        if target_missing[index]:
+            errors[index] = f"Missing required fields for ingestion: {TARGET_KEYS[1]}"
+            continue
+        keys = [key for key, mask in invalid.items() if mask[index]]
+        if target_invalid[index]:
+            keys.append(TARGET_KEYS[1])
+        if keys:
+            errors[index] = f"Invalid values provided for: {', '.join(keys)}"
+
+    int_columns = [column for _, column, caster in FEATURE_SPECS if caster is int]
+    frame[int_columns] = frame[int_columns].fillna(0).astype("int64")
+    return frame, errors
+
+
+def ingest_sessions(rows: Any, start: int = 0, new_categories: bool = False) -> Dict[str, Any]:
+    """Validate ``rows`` (a DataFrame or list of dicts) and append the valid ones.
+
+    Invalid rows are reported with their ``row`` index (offset by ``start``)
+    and skipped; the others are appended in one write.
+    """
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame.from_records(list(rows))
+
+    frame, errors = validate_sessions(rows, new_categories)
+    valid = np.array([error is None for error in errors], dtype=bool)
+    version = dataset_cache.append(frame[valid]) if valid.any() else dataset_cache.sync()
+    return {
+        "accepted": int(valid.sum()),
+        "rejected": int((~valid).sum()),
+        "errors": [{"row": start + index, "error": error} for index, error in enumerate(errors) if error],
+        "version": version,
+    }
+
+
+def ingest_csv(source: IO, chunksize: int = BATCH_CHUNK_SIZE, new_categories: bool = False) -> Dict[str, Any]:
+    """Ingest a CSV upload ``chunksize`` rows at a time."""
+    result: Dict[str, Any] = {"accepted": 0, "rejected": 0, "errors": [], "version": dataset_cache.sync()}
+    start = 0
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        chunk_result = ingest_sessions(chunk, start=start, new_categories=new_categories)
+        for key in ("accepted", "rejected"):
+            result[key] += chunk_result[key]
+        result["errors"].extend(chunk_result["errors"])
+        result["version"] = chunk_result["version"]
+        start += len(chunk)
+    return result
@@ -0,0 +1,139 @@
+"""
+Offline EV knowledge base for the EVBot chatbot.
+
+A curated set of answers (``data/ev_knowledge_base.json``) indexed with
+BM25. ``KnowledgeBase.match`` returns the best entry for a question
+together with a confidence score, so FAQ-style questions can be answered
+locally in well under a millisecond instead of calling the LLM provider.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KB_PATH = os.path.join(BASE_DIR, "data", "ev_knowledge_base.json")
+
+STOPWORDS = frozenset(
+    "a about am an and any are as at be been being but by can could did do does doing for from "
+    "get got had has have how i if in into is it its just me my of on or our should so than that "
+    "the their them then there these they this to too up us was we were what when where which "
+    "while who why will with would you your ev evs car cars vehicle tell explain".split()
+)
+
+# Spellings folded onto one index term
+SYNONYMS = {
+    "lfp": "lifepo4",
+    "lithium-ion": "li-ion",
+    "liion": "li-ion",
+    "rapid": "fast",
+    "supercharger": "fast",
+    "supercharging": "fast",
+    "percentage": "percent",
+    "temperatures": "temperature",
+    "temp": "temperature",
+}
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", text.lower()):
+        token = SYNONYMS.get(token, token)
+        if token not in STOPWORDS:
+            tokens.append(_stem(token))
+    return tokens
+
+
+class KnowledgeMatch(NamedTuple):
+    entry_id: str
+    title: str
+    answer: str
+    score: float
+    confidence: float
+
+
+class KnowledgeBase:
+    """BM25 index over the knowledge-base entries.
+
+    ``confidence`` is the share of the question's information (summed IDF of
+    its distinct terms) that the best entry covers, counting terms found only
+    in an entry's answer at half weight. Terms the index has
+    never seen count with the highest IDF, so off-topic questions score low
+    even when they share a few common words with an entry.
+    """
+
+    def __init__(self, entries: List[Dict[str, object]], k1: float = 1.2, b: float = 0.75) -> None:
+        self.entries = entries
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int, float]]] = {}
+        self._lengths: List[int] = []
+        for index, entry in enumerate(entries):
+            # Titles, paraphrased questions and tags describe what the entry
+            # answers, so they count twice as much as words in the answer.
+            questions = " ".join([str(entry["title"])] + list(entry.get("questions", [])) + list(entry.get("tags", [])))
+            question_terms = tokenize(questions)
+            terms = Counter(question_terms * 2 + tokenize(str(entry["answer"])))
+            # Terms that only occur in the answer count half towards confidence
+            weights = {term: 1.0 if term in question_terms else 0.5 for term in terms}
+            self._lengths.append(sum(terms.values()))
+            for term, count in terms.items():
+                self._postings.setdefault(term, []).append((index, count, weights[term]))
+
+        self._average_length = sum(self._lengths) / max(len(self._lengths), 1)
+        total = len(entries)
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self._unknown_idf = math.log(1 + (total + 0.5) / 0.5)
+
+    @classmethod
+    def load(cls, path: str = KB_PATH) -> "KnowledgeBase":
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.load(handle))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(self, question: str) -> Optional[KnowledgeMatch]:
+        """Best entry for ``question``, or None if no term matches at all."""
+        terms = set(tokenize(question))
+        if not terms:
+            return None
+
+        scores: Dict[int, float] = {}
+        covered: Dict[int, float] = {}
+        for term in terms:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, count, weight in self._postings[term]:
+                norm = count + self.k1 * (1 - self.b + self.b * self._lengths[index] / self._average_length)
+                scores[index] = scores.get(index, 0.0) + idf * count * (self.k1 + 1) / norm
+                covered[index] = covered.get(index, 0.0) + idf * weight
+        if not scores:
+            return None
+
+        best = max(scores, key=scores.__getitem__)
+        information = sum(self._idf.get(term, self._unknown_idf) for term in terms)
+        entry = self.entries[best]
+        return KnowledgeMatch(
+            entry_id=str(entry["id"]),
+            title=str(entry["title"]),
+            answer=str(entry["answer"]),
+            score=scores[best],
+            confidence=covered[best] / information,
+        )
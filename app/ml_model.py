@@ -7,16 +7,28 @@ Flask views and chatbot can share the same logic.
 
 from __future__ import annotations
 
+import json
+import math
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from functools import lru_cache
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
 
 import joblib
+import numpy as np
 import pandas as pd
 
+from timing import stage
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "ev_model.pkl")
 ENCODERS_PATH = os.path.join(BASE_DIR, "models", "label_encoders.pkl")
+# Flattened RandomForest arrays exported from MODEL_PATH (see ForestEngine)
+FOREST_PATH = os.path.join(BASE_DIR, "models", "ev_model_forest")
 
 # (incoming_key, dataframe_column_name, caster)
 FEATURE_SPECS: List[Tuple[str, str, Any]] = [
@@ -42,6 +54,13 @@ CLASS_MESSAGES = {
 
 RESULT_TYPES = {0: "short", 1: "medium", 2: "long"}
 
+# Batch inputs may use either the form keys or the dataset column names
+COLUMN_TO_KEY = {column_name: form_key for form_key, column_name, _ in FEATURE_SPECS}
+
+BATCH_CHUNK_SIZE = int(os.getenv("PREDICT_BATCH_CHUNK_SIZE", "10000"))
+# Batches this large go through the pickled forest (see batch_engine)
+SKLEARN_BATCH_ROWS = int(os.getenv("PREDICT_SKLEARN_MIN_ROWS", "1000"))
+
 
 @lru_cache(maxsize=1)
 def _load_model():
@@ -57,6 +76,460 @@ def get_assets():
     return _load_model(), _load_encoders()
 
 
+# --------------------------------------------------------------------------- #
+# Compiled forest engine
+# --------------------------------------------------------------------------- #
+FOREST_ARRAYS = ("feature", "threshold", "children_left", "children_right", "value", "roots", "classes")
+# Interleaved traversal tables, exported next to the arrays as traverse_<name>.npy
+TRAVERSAL_TABLES = ("feature", "threshold", "children", "is_leaf", "roots")
+
+# Rows scored per traversal pass; bounds the (rows x trees) working set
+ENGINE_CHUNK_ROWS = 1024
+
+
+def _file_signature(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class ForestEngine:
+    """RandomForest inference over contiguous NumPy arrays.
+
+    Every tree's nodes live in shared ``feature``/``threshold``/child arrays
+    (leaves point to themselves) and ``value`` holds each node's normalised
+    class probabilities, so a batch walks all trees at once. Inputs are
+    compared as float32 and per-tree probabilities are accumulated in
+    estimator order, which keeps results bit-identical to sklearn's
+    ``predict_proba``.
+
+    A loaded export memory-maps both the arrays and the traversal tables
+    derived from them, so forked workers share those pages. The per-node
+    tables behind ``contributions`` are still built in each process.
+    """
+
+    def __init__(
+        self, arrays: Dict[str, np.ndarray], max_depth: int, tables: Optional[Dict[str, np.ndarray]] = None
+    ) -> None:
+        self.arrays = arrays
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.max_depth = max_depth
+
+        self.tables = tables if tables is not None else self.traversal_tables(arrays)
+        self._feature = self.tables["feature"]
+        self._threshold = self.tables["threshold"]
+        self._children = self.tables["children"]
+        self._is_leaf = self.tables["is_leaf"]
+        self._roots = self.tables["roots"]
+        self._paths: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @staticmethod
+    def traversal_tables(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Build the tables ``leaves`` walks.
+
+        A node's id is stored doubled, so "id + go_right" indexes the
+        interleaved (left, right) children directly. Thresholds are rounded
+        down to float32. That leaves "x <= threshold" unchanged for float32
+        inputs and halves the memory traffic.
+        """
+        node_count = len(arrays["feature"])
+        rounded = np.asarray(arrays["threshold"]).astype(np.float32)
+        rounded_up = rounded.astype(np.float64) > arrays["threshold"]
+        rounded[rounded_up] = np.nextafter(rounded[rounded_up], np.float32(-np.inf))
+        feature = np.zeros(2 * node_count, dtype=np.int32)
+        feature[0::2] = arrays["feature"]
+        threshold = np.full(2 * node_count, np.inf, dtype=np.float32)
+        threshold[0::2] = rounded
+        children = np.empty(2 * node_count, dtype=np.int32)
+        children[0::2] = np.asarray(arrays["children_left"]) * 2
+        children[1::2] = np.asarray(arrays["children_right"]) * 2
+        is_leaf = np.zeros(2 * node_count, dtype=bool)
+        is_leaf[0::2] = arrays["children_left"] == np.arange(node_count)
+        return {
+            "feature": feature,
+            "threshold": threshold,
+            "children": children,
+            "is_leaf": is_leaf,
+            "roots": (np.asarray(arrays["roots"]) * 2).astype(np.int32),
+        }
+
+    @classmethod
+    def from_model(cls, model: Any) -> "ForestEngine":
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            values.append(proba / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            "feature": np.concatenate(features).astype(np.intp),
+            "threshold": np.concatenate(thresholds).astype(np.float64),
+            "children_left": np.concatenate(lefts).astype(np.intp),
+            "children_right": np.concatenate(rights).astype(np.intp),
+            "value": np.ascontiguousarray(np.concatenate(values)),
+            "roots": np.asarray(roots, dtype=np.intp),
+            "classes": np.asarray(model.classes_),
+        }
+        engine = cls(arrays, max_depth)
+        engine.prepare_contributions()
+        return engine
+
+    def save(self, directory: str, source: Optional[List[int]] = None) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in FOREST_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), self.arrays[name])
+        for name in TRAVERSAL_TABLES:
+            np.save(os.path.join(directory, f"traverse_{name}.npy"), self.tables[name])
+        # meta.json is written last and marks the export as complete
+        meta_path = os.path.join(directory, "meta.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump({"max_depth": self.max_depth, "n_trees": self.n_trees, "source": source}, handle)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> Tuple["ForestEngine", Dict[str, Any]]:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as handle:
+            meta = json.load(handle)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in FOREST_ARRAYS
+        }
+        # Plain ndarray views of the maps: same pages, without memmap's
+        # per-indexing overhead in the traversal loop
+        tables = {
+            name: np.asarray(np.load(os.path.join(directory, f"traverse_{name}.npy"),
+                                     mmap_mode=mmap_mode, allow_pickle=False))
+            for name in TRAVERSAL_TABLES
+        }
+        engine = cls(arrays, int(meta["max_depth"]), tables)
+        engine.prepare_contributions()
+        return engine, meta
+
+    def conditioned(self, row: np.ndarray, free: Iterable[int]) -> "ForestEngine":
+        """Engine for inputs equal to ``row`` except in the ``free`` features.
+
+        Splits on every other feature are decided once for ``row`` and
+        bypassed, so scoring a sweep only walks the splits on the features
+        it varies. Results are identical to this engine's on such inputs.
+        """
+        feature = self.arrays["feature"]
+        left, right = self.arrays["children_left"], self.arrays["children_right"]
+        nodes = np.arange(len(feature))
+        is_leaf = left == nodes
+        x = np.ascontiguousarray(row, dtype=np.float32).ravel()
+        fixed = ~is_leaf & ~np.isin(feature, list(free))
+        # Same float32 comparison as leaves()
+        go_right = x[feature[fixed]] > self._threshold[0::2][fixed]
+        jump = nodes.copy()
+        jump[fixed] = np.where(go_right, right[fixed], left[fixed])
+        # Pointer doubling until every node jumps past all decided splits
+        while True:
+            further = jump[jump]
+            if np.array_equal(further, jump):
+                break
+            jump = further
+
+        arrays = dict(self.arrays, children_left=jump[left], children_right=jump[right], roots=jump[self.roots])
+        depth, frontier = 0, arrays["roots"]
+        while True:
+            internal = frontier[~is_leaf[frontier]]
+            if not internal.size:
+                break
+            frontier = np.unique(np.concatenate([arrays["children_left"][internal],
+                                                 arrays["children_right"][internal]]))
+            depth += 1
+        return ForestEngine(arrays, depth)
+
+    def predict_proba_grid(self, row: np.ndarray, axes: List[Tuple[int, np.ndarray]]) -> np.ndarray:
+        """``predict_proba`` for every combination of ``axes`` values on top of ``row``.
+
+        ``axes`` lists (feature index, values); the result has shape
+        ``(len(values_1), ..., len(values_k), classes)``. Rather than walking
+        each grid point down each tree, every tree is walked once over boxes
+        of the (sorted) grid: a split on a swept feature cuts the box at the
+        threshold and each leaf adds its probabilities to its box. The cost
+        is per tree node instead of per point, and since trees are still
+        added in order the result equals ``predict_proba`` on the expanded
+        grid.
+        """
+        engine = self.conditioned(row, [feature for feature, _ in axes])
+        values = [np.asarray(axis_values, dtype=np.float32) for _, axis_values in axes]
+        orders = [np.argsort(axis_values, kind="stable") for axis_values in values]
+        shape = tuple(len(axis_values) for axis_values in values)
+
+        # Where each swept split cuts its axis: values <= threshold go left
+        is_leaf = engine._is_leaf
+        cuts = np.zeros(len(is_leaf), dtype=np.intp)
+        axis_of = np.full(len(is_leaf), -1, dtype=np.intp)
+        for axis, ((feature, _), axis_values, order) in enumerate(zip(axes, values, orders)):
+            split = ~is_leaf & (engine._feature == feature)
+            split[1::2] = False
+            axis_of[split] = axis
+            cuts[split] = np.searchsorted(axis_values[order], engine._threshold[split], side="right")
+        is_leaf, cuts, axis_of, children = is_leaf.tolist(), cuts.tolist(), axis_of.tolist(), engine._children.tolist()
+
+        value = np.asarray(self.value)
+        proba = np.zeros(shape + (value.shape[1],), dtype=np.float64)
+        full = [(0, size) for size in shape]
+        for root in engine._roots.tolist():
+            stack = [(root, full)]
+            while stack:
+                node, box = stack.pop()
+                if is_leaf[node]:
+                    proba[tuple(slice(low, high) for low, high in box)] += value[node // 2]
+                    continue
+                axis, cut = axis_of[node], cuts[node]
+                low, high = box[axis]
+                if cut > low:
+                    stack.append((children[node], box[:axis] + [(low, min(cut, high))] + box[axis + 1:]))
+                if cut < high:
+                    stack.append((children[node + 1], box[:axis] + [(max(cut, low), high)] + box[axis + 1:]))
+        proba /= self.n_trees
+
+        # Back from sorted to the requested value order
+        inverses = []
+        for order in orders:
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            inverses.append(inverse)
+        return proba[np.ix_(*inverses)]
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached in every tree, shape ``(rows, trees)``.
+
+        Only finite inputs are routed: NaN would always go left here, while
+        sklearn sends it to the side chosen at fit time.
+        """
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        rows, n_features = X.shape
+        offsets = np.repeat(np.arange(rows, dtype=np.int32) * n_features, self.n_trees)
+        nodes = np.tile(self._roots, rows)
+        flat = X.ravel()
+
+        # For larger batches, drop (row, tree) paths that already reached a
+        # leaf every few levels; most trees are much shallower than max_depth.
+        compact_at = set(range(5, self.max_depth, 3)) if rows > 32 else set()
+        finished = nodes
+        active: Optional[np.ndarray] = None
+        for depth in range(self.max_depth):
+            if depth in compact_at:
+                live = ~np.take(self._is_leaf, nodes)
+                if active is None:
+                    finished = nodes.copy()
+                    active = np.flatnonzero(live)
+                else:
+                    finished[active] = nodes
+                    active = active[live]
+                nodes = nodes[live]
+                offsets = offsets[live]
+            go_right = np.take(flat, np.take(self._feature, nodes) + offsets) > np.take(self._threshold, nodes)
+            nodes = np.take(self._children, nodes + go_right)
+
+        if active is None:
+            finished = nodes
+        else:
+            finished[active] = nodes
+        return (finished // 2).reshape(rows, self.n_trees)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if len(X) > ENGINE_CHUNK_ROWS:
+            return np.concatenate([
+                self.predict_proba(X[start:start + ENGINE_CHUNK_ROWS])
+                for start in range(0, len(X), ENGINE_CHUNK_ROWS)
+            ])
+
+        # Trees are added strictly in order, matching the forest's running sum
+        leaves = self.leaves(X)
+        if len(leaves) <= 32:
+            proba = np.cumsum(self.value[leaves.T], axis=0)[-1]
+        else:
+            proba = np.zeros((len(leaves), self.value.shape[1]), dtype=np.float64)
+            for tree in range(self.n_trees):
+                proba += self.value[leaves[:, tree]]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def prepare_contributions(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Per-node tables for ``contributions``, built once per engine.
+
+        For every node: its parent (roots are their own parent), the feature
+        the parent splits on and how much the step from the parent changes
+        the class probabilities.
+        """
+        if self._paths is None:
+            feature = np.asarray(self.arrays["feature"])
+            left, right = np.asarray(self.arrays["children_left"]), np.asarray(self.arrays["children_right"])
+            nodes = np.arange(len(feature))
+            internal = left != nodes
+            parent = nodes.copy()
+            parent[left[internal]] = nodes[internal]
+            parent[right[internal]] = nodes[internal]
+            value = np.asarray(self.value)
+            self._paths = (parent, feature[parent], value - value[parent])
+        return self._paths
+
+    def contributions(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Tree-path decomposition of ``predict_proba``.
+
+        Returns the forest's ``bias`` (mean root probabilities, shape
+        ``(classes,)``) and each feature's contribution for every row, shape
+        ``(rows, features, classes)``: the probability change of every split
+        on that feature along the row's path, averaged over the trees.
+        ``bias + contributions.sum(axis=1)`` equals ``predict_proba(X)`` up
+        to rounding.
+        """
+        parent, split_feature, delta = self.prepare_contributions()
+        bias = np.asarray(self.value)[self.roots].mean(axis=0)
+        X = np.asarray(X, dtype=np.float64)
+        rows, n_features = X.shape
+        n_classes = delta.shape[1]
+        contributions = np.zeros((rows * n_features, n_classes), dtype=np.float64)
+        for start in range(0, rows, ENGINE_CHUNK_ROWS):
+            chunk = X[start:start + ENGINE_CHUNK_ROWS]
+            nodes = self.leaves(chunk).ravel()
+            owners = np.repeat(np.arange(start, start + len(chunk)) * n_features, self.n_trees)
+            # Walk every (row, tree) path from its leaf back up to the root
+            while True:
+                live = parent[nodes] != nodes
+                nodes, owners = nodes[live], owners[live]
+                if not nodes.size:
+                    break
+                index = owners + split_feature[nodes]
+                for label in range(n_classes):
+                    contributions[:, label] += np.bincount(
+                        index, weights=delta[nodes, label], minlength=len(contributions))
+                nodes = parent[nodes]
+        contributions /= self.n_trees
+        return bias, contributions.reshape(rows, n_features, n_classes)
+
+
+class _SklearnEngine:
+    """Fallback for models that cannot be flattened (non-forest estimators)."""
+
+    def __init__(self, model: Any) -> None:
+        self.model = model
+        self.classes_ = model.classes_
+
+    def _frame(self, X: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(np.asarray(X), columns=[column for _, column, _ in FEATURE_SPECS])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(self._frame(X))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(self._frame(X))
+
+
+def is_forest(model: Any) -> bool:
+    """Whether ``model`` is a tree ensemble the compiled engine can flatten."""
+    # Bagged classifier trees (RandomForest / ExtraTrees); boosted models keep
+    # an array of regression trees and go through the sklearn fallback.
+    estimators = getattr(model, "estimators_", None)
+    return (
+        isinstance(estimators, list)
+        and len(estimators) > 0
+        and hasattr(estimators[0], "tree_")
+        and hasattr(estimators[0], "predict_proba")
+    )
+
+
+def engine_for(model: Any, rows: int = 1):
+    """The engine batches of ``rows`` predictions for ``model`` would be served with."""
+    if is_forest(model) and rows < SKLEARN_BATCH_ROWS:
+        return ForestEngine.from_model(model)
+    return _SklearnEngine(model)
+
+
+def export_forest(model: Any = None, directory: Optional[str] = None, source_path: Optional[str] = None) -> ForestEngine:
+    """Flatten ``model`` (default: the pickled model) into ``directory``."""
+    model = model if model is not None else _load_model()
+    directory = directory or FOREST_PATH
+    engine = ForestEngine.from_model(model)
+    engine.save(directory, _file_signature(source_path or MODEL_PATH))
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """Return the inference engine, preferring the exported forest arrays.
+
+    The export is used when it matches the current model pickle (or when no
+    pickle is deployed). Otherwise the pickle is loaded once and re-exported.
+    """
+    source = _file_signature(MODEL_PATH)
+    try:
+        engine, meta = ForestEngine.load(FOREST_PATH)
+        if source is None or meta.get("source") == source:
+            return engine
+    except (OSError, ValueError, KeyError):
+        pass
+
+    model = _load_model()
+    if not is_forest(model):
+        return _SklearnEngine(model)
+    try:
+        return export_forest(model, FOREST_PATH, MODEL_PATH)
+    except OSError:
+        return ForestEngine.from_model(model)
+
+
+def batch_engine(rows: int):
+    """Engine to score ``rows`` rows at once with.
+
+    The flattened engine gathers every (row, tree) step with NumPy, which
+    beats sklearn's compiled traversal on small batches but not on large
+    ones: they break even around 1,000 rows, and at 5,000 rows sklearn is
+    about 2-3x faster (``benchmarks/bench_forest.py``). Batches of at least
+    ``SKLEARN_BATCH_ROWS`` therefore use the pickled forest when it is
+    deployed. Both give identical predictions.
+    """
+    engine = get_engine()
+    if rows >= SKLEARN_BATCH_ROWS and isinstance(engine, ForestEngine) and os.path.exists(MODEL_PATH):
+        return engine_for(_load_model(), rows)
+    return engine
+
+
+def get_inference_assets():
+    """Engine and encoders used for prediction (the pickle is only loaded if needed)."""
+    return get_engine(), _load_encoders()
+
+
+def reset_assets() -> None:
+    """Drop cached model artifacts so the next call reloads them from disk."""
+    _load_model.cache_clear()
+    _load_encoders.cache_clear()
+    get_engine.cache_clear()
+
+
 def _normalize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     normalized: Dict[str, Any] = {}
     missing: List[str] = []
@@ -73,7 +546,10 @@ def _normalize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
                 normalized[column_name] = str(raw_value).strip()
             else:
                 normalized[column_name] = caster(raw_value)
-        except (TypeError, ValueError):
+                # NaN and infinity would bypass the model's input checks
+                if not math.isfinite(normalized[column_name]):
+                    invalid.append(form_key)
+        except (TypeError, ValueError, OverflowError):
             invalid.append(form_key)
 
     if missing:
@@ -97,7 +573,7 @@ def build_feature_frame(payload: Dict[str, Any]) -> pd.DataFrame:
 
 
 def encode_categorical_features(features: pd.DataFrame) -> pd.DataFrame:
-    _, encoders = get_assets()
+    encoders = _load_encoders()
     encoded = features.copy()
 
     for _, column_name, caster in FEATURE_SPECS:
@@ -112,12 +588,160 @@ def encode_categorical_features(features: pd.DataFrame) -> pd.DataFrame:
     return encoded
 
 
-def predict_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
-    features = build_feature_frame(payload)
-    encoded_features = encode_categorical_features(features)
-    model, _ = get_assets()
+# (encoders artifact, compiled lookups); rebuilt whenever the artifact object changes
+_compiled_encoders: Tuple[Any, Dict[str, Dict[str, int]]] = (None, {})
+
+
+def _compile_encoders(encoders: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """Flatten each LabelEncoder into a plain ``label -> code`` dict."""
+    global _compiled_encoders
+    source, lookups = _compiled_encoders
+    if source is not encoders:
+        lookups = {
+            column_name: {str(label): code for code, label in enumerate(encoders[column_name].classes_)}
+            for _, column_name, caster in FEATURE_SPECS
+            if caster is str and column_name in encoders
+        }
+        _compiled_encoders = (encoders, lookups)
+    return lookups
+
 
-    prediction = int(model.predict(encoded_features)[0])
+def _feature_vector(normalized: Dict[str, Any], lookups: Dict[str, Dict[str, int]]) -> np.ndarray:
+    vector = np.empty((1, len(FEATURE_SPECS)), dtype=np.float64)
+    for position, (_, column_name, caster) in enumerate(FEATURE_SPECS):
+        value = normalized[column_name]
+        if caster is str:
+            lookup = lookups.get(column_name)
+            if lookup is None:
+                raise ValueError(
+                    f"Encoder not found for column '{column_name}'."
+                )
+            if value not in lookup:
+                raise ValueError(f"y contains previously unseen labels: {value!r}")
+            value = lookup[value]
+        vector[0, position] = value
+    return vector
+
+
+# --------------------------------------------------------------------------- #
+# Prediction cache
+# --------------------------------------------------------------------------- #
+def _parse_quantize(spec: str) -> Dict[str, float]:
+    """Parse ``"soc=0.5,battery_temp=0.1"`` into per-feature rounding steps.
+
+    Only numeric features can be quantized, and steps must be positive.
+    """
+    numeric = [form_key for form_key, _, caster in FEATURE_SPECS if caster is not str]
+    steps: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        form_key, _, step = (part.strip() for part in item.partition("="))
+        if form_key not in numeric:
+            raise ValueError(
+                f"PREDICTION_CACHE_QUANTIZE keys must be one of {', '.join(numeric)}, not {form_key!r}"
+            )
+        try:
+            value = float(step)
+        except ValueError:
+            value = math.nan
+        if not 0 < value < math.inf:
+            raise ValueError(
+                f"PREDICTION_CACHE_QUANTIZE step for {form_key} must be a positive number, not {step!r}"
+            )
+        steps[form_key] = value
+    return steps
+
+
+class PredictionCache:
+    """Bounded LRU + TTL memo of predicted classes keyed on normalised features.
+
+    ``quantize`` maps form keys to a rounding step so near-identical float
+    inputs share an entry. Entries are dropped whenever the model or
+    encoders artifact on disk changes.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0, quantize: Optional[Dict[str, float]] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.quantize = dict(quantize or {})
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, normalized: Dict[str, Any]) -> Tuple[Any, ...]:
+        values = []
+        for form_key, column_name, _ in FEATURE_SPECS:
+            value = normalized[column_name]
+            step = self.quantize.get(form_key)
+            if step:
+                value = math.floor(value / step + 0.5) * step
+            values.append(value)
+        return tuple(values)
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[Any, ...], class_id: int) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, class_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def check_artifacts(self) -> None:
+        """Clear the cache, and reload assets, if the artifacts changed on disk."""
+        signature = (_file_signature(MODEL_PATH), _file_signature(ENCODERS_PATH))
+        if signature == self._signature:
+            return
+        with self._lock:
+            if self._signature is not None:
+                reset_assets()
+                self.invalidations += 1
+            self._entries.clear()
+            self._signature = signature
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "quantize": self.quantize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+prediction_cache = PredictionCache(
+    maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+    quantize=_parse_quantize(os.getenv("PREDICTION_CACHE_QUANTIZE", "")),
+)
+
+
+def _prediction_result(prediction: int, normalized: Dict[str, Any]) -> Dict[str, Any]:
     message = CLASS_MESSAGES.get(
         prediction, f"Prediction: Class {prediction}"
     )
@@ -127,5 +751,593 @@ def predict_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
         "class_id": prediction,
         "result_type": result_type,
         "message": message,
-        "inputs": features.iloc[0].to_dict(),
+        "inputs": normalized,
+    }
+
+
+def predict_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    with stage("normalize"):
+        normalized = _normalize_payload(payload)
+    prediction_cache.check_artifacts()
+    key = prediction_cache.key(normalized)
+    prediction = prediction_cache.get(key)
+    if prediction is None:
+        with stage("encode"):
+            vector = _feature_vector(normalized, _compile_encoders(_load_encoders()))
+        with stage("predict"):
+            prediction = int(get_engine().predict(vector)[0])
+        prediction_cache.put(key, prediction)
+    return _prediction_result(prediction, normalized)
+
+
+# --------------------------------------------------------------------------- #
+# Micro-batching
+# --------------------------------------------------------------------------- #
+class BatcherOverloaded(RuntimeError):
+    """Raised when the micro-batch queue stays full for longer than max_wait."""
+
+
+class _PendingPrediction:
+    __slots__ = ("normalized", "key", "future", "enqueued")
+
+    def __init__(self, normalized: Dict[str, Any], key: Tuple[Any, ...]) -> None:
+        self.normalized = normalized
+        self.key = key
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher:
+    """Groups concurrent single-row predictions into one vectorised call.
+
+    Requests arriving within ``window`` seconds of the first queued one (or
+    until ``max_rows`` are waiting) are scored together by a background
+    thread. The bounded queue provides backpressure and callers wait at most
+    ``max_wait`` seconds for their result.
+    """
+
+    BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(self, window: float = 0.002, max_rows: int = 64, max_queue: int = 1024, max_wait: float = 1.0) -> None:
+        self.window = window
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[_PendingPrediction]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.batch_sizes: Dict[str, int] = {f"<={bucket}": 0 for bucket in self.BUCKETS}
+        self.batch_sizes[f">{self.BUCKETS[-1]}"] = 0
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork(), so restart in each worker process
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        normalized = _normalize_payload(payload)
+        prediction_cache.check_artifacts()
+        key = prediction_cache.key(normalized)
+        prediction = prediction_cache.get(key)
+        if prediction is not None:
+            return _prediction_result(prediction, normalized)
+
+        self._ensure_worker()
+        pending = _PendingPrediction(normalized, key)
+        try:
+            self._queue.put(pending, timeout=self.max_wait)
+        except queue.Full:
+            self.rejected += 1
+            raise BatcherOverloaded("Prediction queue is full, please retry shortly.")
+
+        remaining = self.max_wait - (time.monotonic() - pending.enqueued)
+        try:
+            prediction = pending.future.result(timeout=max(remaining, 0.0))
+        except FutureTimeout:
+            pending.future.cancel()
+            self.timeouts += 1
+            raise TimeoutError("Prediction timed out waiting for a batch slot.")
+        return _prediction_result(prediction, normalized)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0].enqueued + self.window
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._score(batch)
+
+    def _score(self, batch: List[_PendingPrediction]) -> None:
+        # Skip requests whose caller already gave up
+        live = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+        scored: List[_PendingPrediction] = []
+        try:
+            lookups = _compile_encoders(_load_encoders())
+            rows = []
+            for pending in live:
+                try:
+                    rows.append(_feature_vector(pending.normalized, lookups)[0])
+                    scored.append(pending)
+                except ValueError as exc:
+                    pending.future.set_exception(exc)
+            predictions = get_engine().predict(np.vstack(rows)) if rows else []
+        except Exception as exc:
+            for pending in live:
+                if not pending.future.done():
+                    pending.future.set_exception(exc)
+            return
+
+        for pending, prediction in zip(scored, predictions):
+            prediction_cache.put(pending.key, int(prediction))
+            pending.future.set_result(int(prediction))
+        self._record(len(scored))
+
+    def _record(self, size: int) -> None:
+        if size == 0:
+            return
+        self.batches += 1
+        self.rows += size
+        bucket = next((f"<={bucket}" for bucket in self.BUCKETS if size <= bucket), f">{self.BUCKETS[-1]}")
+        self.batch_sizes[bucket] += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_rows": self.max_rows,
+            "max_wait": self.max_wait,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0,
+            "batch_sizes": dict(self.batch_sizes),
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+MICROBATCH_ENABLED = os.getenv("PREDICT_MICROBATCH", "0") == "1"
+
+micro_batcher = MicroBatcher(
+    window=float(os.getenv("PREDICT_MICROBATCH_WINDOW_MS", "2")) / 1000,
+    max_rows=int(os.getenv("PREDICT_MICROBATCH_MAX_ROWS", "64")),
+    max_queue=int(os.getenv("PREDICT_MICROBATCH_QUEUE", "1024")),
+    max_wait=float(os.getenv("PREDICT_MICROBATCH_MAX_WAIT", "1.0")),
+)
+
+
+def dispatch_prediction(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Predict one payload, through the micro-batcher when it is enabled."""
+    if MICROBATCH_ENABLED:
+        return micro_batcher.submit(payload)
+    return predict_from_payload(payload)
+
+
+# --------------------------------------------------------------------------- #
+# Batch prediction
+# --------------------------------------------------------------------------- #
+def _int_literal(value: Any) -> float:
+    """``int(value)`` for a text value, NaN if it is not an integer literal."""
+    try:
+        return float(int(value))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def normalize_batch(
+    rows: pd.DataFrame, check_categories: bool = True
+) -> Tuple[pd.DataFrame, List[Optional[str]]]:
+    """Vectorised counterpart of ``_normalize_payload`` for many rows.
+
+    Returns the normalised frame (dataset column names, ``FEATURE_SPECS``
+    order) and a per-row error message, ``None`` for valid rows. With
+    ``check_categories`` unset, categorical values the encoders have never
+    seen are accepted (used when ingesting new sessions).
+    """
+    rows = rows.rename(columns=COLUMN_TO_KEY).reset_index(drop=True)
+    encoders = _load_encoders() if check_categories else {}
+    columns: Dict[str, pd.Series] = {}
+    missing: Dict[str, np.ndarray] = {}
+    invalid: Dict[str, np.ndarray] = {}
+
+    for form_key, column_name, caster in FEATURE_SPECS:
+        if form_key in rows.columns:
+            raw = rows[form_key]
+        else:
+            raw = pd.Series(None, index=rows.index, dtype=object)
+        is_missing = (raw.isna() | raw.astype(object).eq("")).to_numpy()
+
+        if caster is str:
+            values = raw.astype(str).str.strip()
+            is_invalid = np.zeros(len(rows), dtype=bool)
+            if check_categories:
+                encoder = encoders.get(column_name)
+                if encoder is None:
+                    raise ValueError(
+                        f"Encoder not found for column '{column_name}'."
+                    )
+                is_invalid = ~is_missing & ~values.isin(encoder.classes_).to_numpy()
+        else:
+            values = pd.to_numeric(raw, errors="coerce")
+            if caster is int and raw.dtype == object:
+                # Text goes through int() itself, as in _normalize_payload, so "3.0" is rejected
+                is_text = raw.map(lambda value: isinstance(value, str)).astype(bool)
+                values = values.where(~is_text, raw.map(_int_literal)).astype(np.float64)
+            # Unparseable text coerces to NaN; infinity is rejected as in _normalize_payload
+            is_invalid = ~is_missing & ~np.isfinite(values.to_numpy(dtype=np.float64))
+            if caster is int:
+                values = np.trunc(values)
+
+        columns[column_name] = values
+        missing[form_key] = is_missing
+        invalid[form_key] = is_invalid & ~is_missing
+
+    errors: List[Optional[str]] = [None] * len(rows)
+    any_missing = np.logical_or.reduce(list(missing.values())) if missing else np.zeros(len(rows), bool)
+    any_invalid = np.logical_or.reduce(list(invalid.values())) if invalid else np.zeros(len(rows), bool)
+    for index in np.flatnonzero(any_missing | any_invalid):
+        if any_missing[index]:
+            keys = [key for key, mask in missing.items() if mask[index]]
+            errors[index] = f"Missing required fields for prediction: {', '.join(keys)}"
+        else:
+            keys = [key for key, mask in invalid.items() if mask[index]]
+            errors[index] = f"Invalid values provided for: {', '.join(keys)}"
+
+    return pd.DataFrame(columns), errors
+
+
+def encode_batch(features: pd.DataFrame) -> pd.DataFrame:
+    """Encode each categorical column once for the whole batch (unknown -> -1)."""
+    encoders = _load_encoders()
+    encoded = {}
+    for _, column_name, caster in FEATURE_SPECS:
+        if caster is str:
+            encoded[column_name] = pd.Categorical(
+                features[column_name], categories=encoders[column_name].classes_
+            ).codes
+        elif caster is int:
+            encoded[column_name] = features[column_name].astype("int64")
+        else:
+            encoded[column_name] = features[column_name].astype("float64")
+    return pd.DataFrame(encoded, index=features.index)
+
+
+def predict_batch(rows: Any, start: int = 0, explain: bool = False) -> List[Dict[str, Any]]:
+    """Score many rows with a single ``model.predict`` call.
+
+    ``rows`` is a DataFrame or a list of payload dictionaries. Each result
+    carries its ``row`` index (offset by ``start``) and either the predicted
+    class or the validation ``error`` for that row. With ``explain`` set,
+    results also carry the top feature ``contributions`` (see
+    ``explain_inputs``), computed for the whole batch at once.
+    """
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame.from_records(list(rows))
+
+    with stage("normalize"):
+        features, errors = normalize_batch(rows)
+    valid = np.array([error is None for error in errors], dtype=bool)
+    predictions = np.empty(0, dtype=int)
+    if valid.any():
+        with stage("encode"):
+            encoded = encode_batch(features[valid]).to_numpy(dtype=np.float64)
+        with stage("predict"):
+            predictions = batch_engine(len(encoded)).predict(encoded)
+        if explain:
+            explained = iter(_explain_rows(encoded, predictions, features[valid].itertuples(index=False)))
+
+    results: List[Dict[str, Any]] = []
+    scored = iter(predictions)
+    for index, error in enumerate(errors):
+        if error is not None:
+            results.append({"row": start + index, "error": error})
+            continue
+        prediction = int(next(scored))
+        result = {
+            "row": start + index,
+            "class_id": prediction,
+            "result_type": RESULT_TYPES.get(prediction, "short"),
+            "message": CLASS_MESSAGES.get(prediction, f"Prediction: Class {prediction}"),
+        }
+        if explain:
+            result.update(next(explained))
+        results.append(result)
+    return results
+
+
+def iter_batch_predictions(chunks: Iterable[pd.DataFrame], explain: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield per-row results for a stream of row chunks."""
+    start = 0
+    for chunk in chunks:
+        yield from predict_batch(chunk, start=start, explain=explain)
+        start += len(chunk)
+
+
+def iter_csv_predictions(
+    source: IO, chunksize: int = BATCH_CHUNK_SIZE, explain: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """Stream predictions for a CSV upload, ``chunksize`` rows at a time.
+
+    The CSV reader is created eagerly so header errors surface immediately.
+    """
+    return iter_batch_predictions(pd.read_csv(source, chunksize=chunksize), explain=explain)
+
+
+# --------------------------------------------------------------------------- #
+# Explanations
+# --------------------------------------------------------------------------- #
+EXPLAIN_TOP = int(os.getenv("PREDICT_EXPLAIN_TOP", "3"))
+
+
+def _explain_rows(
+    encoded: np.ndarray, predictions: np.ndarray, inputs: Iterable[Tuple[Any, ...]], top: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """``bias`` and top ``contributions`` towards each row's predicted class.
+
+    ``inputs`` holds each row's normalised values in ``FEATURE_SPECS`` order.
+    """
+    engine = get_engine()
+    if not isinstance(engine, ForestEngine):
+        raise ValueError("Explanations are only available for forest models.")
+    top = EXPLAIN_TOP if top is None else top
+    with stage("explain"):
+        bias, contributions = engine.contributions(encoded)
+    class_index = np.searchsorted(engine.classes_, predictions)
+    scores = contributions[np.arange(len(encoded)), :, class_index]
+    # Largest effect first, either way
+    order = np.argsort(-np.abs(scores), axis=1, kind="stable")[:, :max(top, 0)]
+
+    explanations = []
+    for values, row_scores, row_order, index in zip(inputs, scores, order, class_index):
+        explanations.append({
+            "bias": round(float(bias[index]), 4),
+            "contributions": [
+                {
+                    "feature": FEATURE_SPECS[position][0],
+                    "column": FEATURE_SPECS[position][1],
+                    "value": FEATURE_SPECS[position][2](values[position]),
+                    "contribution": round(float(row_scores[position]), 4),
+                }
+                for position in row_order
+            ],
+        })
+    return explanations
+
+
+def explain_inputs(normalized: Dict[str, Any], class_id: int, top: Optional[int] = None) -> Dict[str, Any]:
+    """Which features pushed a prediction towards ``class_id``.
+
+    ``normalized`` is a prediction's ``inputs``. Contributions come from
+    decomposing every tree path (``ForestEngine.contributions``): each is
+    the change in the class probability caused by the splits on one
+    feature, and ``bias`` plus all of them is the predicted probability.
+    The ``top`` (default ``PREDICT_EXPLAIN_TOP``) largest, by size, are
+    returned.
+    """
+    vector = _feature_vector(normalized, _compile_encoders(_load_encoders()))
+    values = tuple(normalized[column] for _, column, _ in FEATURE_SPECS)
+    return _explain_rows(vector, np.array([class_id]), [values], top)[0]
+
+
+def explain_prediction(payload: Dict[str, Any], top: Optional[int] = None) -> Dict[str, Any]:
+    """``predict_from_payload`` plus the contributions behind the prediction."""
+    prediction = predict_from_payload(payload)
+    return dict(prediction, **explain_inputs(prediction["inputs"], prediction["class_id"], top))
+
+
+# --------------------------------------------------------------------------- #
+# What-if sweeps
+# --------------------------------------------------------------------------- #
+SWEEP_MAX_POINTS = int(os.getenv("PREDICT_SWEEP_MAX_POINTS", "100000"))
+SWEEP_MAX_STEPS = 1000
+
+KEY_TO_SPEC = {form_key: (position, column_name, caster)
+               for position, (form_key, column_name, caster) in enumerate(FEATURE_SPECS)}
+RESULT_CLASSES = {result_type: class_id for class_id, result_type in RESULT_TYPES.items()}
+
+
+def _sweep_values(
+    key: str, spec: Any, base: Any, lookups: Dict[str, Dict[str, int]]
+) -> Tuple[List[Any], np.ndarray]:
+    """Values of one sweep axis and their encoded feature values.
+
+    ``spec`` is a list of values or, for numeric features, a
+    ``{"min", "max", "steps"}`` (or ``"step"``) range. Categorical features
+    also accept ``"all"`` for every known category. The ``base`` value is
+    always added so "leave it as is" is part of the grid; numeric axes are
+    sorted.
+    """
+    _, column_name, caster = KEY_TO_SPEC[key]
+    if caster is str:
+        lookup = lookups.get(column_name)
+        if lookup is None:
+            raise ValueError(f"Encoder not found for column '{column_name}'.")
+        values = list(lookup) if spec == "all" else [str(value).strip() for value in spec]
+        unknown = [value for value in values if value not in lookup]
+        if unknown:
+            raise ValueError(f"Unknown values for {key}: {', '.join(map(repr, unknown))}")
+        values = list(dict.fromkeys(values + [base]))
+        return values, np.array([lookup[value] for value in values], dtype=np.float64)
+
+    if isinstance(spec, dict):
+        try:
+            low, high = float(spec["min"]), float(spec["max"])
+            if "step" in spec:
+                steps = int(math.floor((high - low) / float(spec["step"]) + 1e-9)) + 1
+            else:
+                steps = int(spec.get("steps", 10))
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            raise ValueError(f"Invalid range for {key}: expected min, max and steps or step")
+        if not 1 <= steps <= SWEEP_MAX_STEPS or high < low:
+            raise ValueError(f"Invalid range for {key}: 1 to {SWEEP_MAX_STEPS} steps from min to max")
+        values = np.linspace(low, high, steps)
+    else:
+        try:
+            values = np.array([float(value) for value in spec], dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid values provided for: {key}")
+    if not np.isfinite(values).all():
+        raise ValueError(f"Invalid values provided for: {key}")
+    if caster is int:
+        values = np.rint(values)
+    values = np.unique(np.append(values, base))
+    return [caster(value) for value in values], values
+
+
+def _target_classes(target: Any, base_class: int, classes: np.ndarray) -> List[int]:
+    """Classes a recommendation has to reach: any change (``None``), one class,
+    or every ``"shorter"`` / ``"longer"`` class than the base prediction."""
+    if target is None:
+        return [int(c) for c in classes if c != base_class]
+    if target == "shorter":
+        return [int(c) for c in classes if c < base_class]
+    if target == "longer":
+        return [int(c) for c in classes if c > base_class]
+    if target in RESULT_CLASSES:
+        return [RESULT_CLASSES[target]]
+    try:
+        class_id = int(target)
+    except (TypeError, ValueError):
+        raise ValueError(f"Unknown target: {target!r}")
+    if class_id not in RESULT_TYPES:
+        raise ValueError(f"Unknown target: {target!r}")
+    return [class_id]
+
+
+def what_if_sweep(
+    payload: Dict[str, Any],
+    ranges: Dict[str, Any],
+    target: Any = None,
+    top: int = 5,
+    max_points: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Score a grid of variations of ``payload`` in one vectorised pass.
+
+    ``ranges`` maps feature keys (``soc``, ``battery_temp``, ``mode``, ...) to
+    the values to try (see ``_sweep_values``); every other feature keeps its
+    value from ``payload``. Returns the class of every grid point (row-major
+    over ``axes``), the class counts, the nearest point of each other class
+    and the ``top`` nearest points reaching ``target``.
+
+    Distance is the sum over swept features of the change from the base
+    value, as a fraction of the axis span for numeric features and 1 for a
+    different category. Recommendations are the nearest points for each set
+    of changed features, skipping sets that include a nearer
+    recommendation's, so none of them changes more than it needs to.
+    """
+    if not isinstance(ranges, dict) or not ranges:
+        raise ValueError("Expected ranges for at least one feature.")
+    unknown = [key for key in ranges if key not in KEY_TO_SPEC]
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(unknown)}")
+
+    normalized = _normalize_payload(payload)
+    lookups = _compile_encoders(_load_encoders())
+    base = _feature_vector(normalized, lookups)
+
+    keys = list(ranges)
+    axes = [_sweep_values(key, ranges[key], normalized[KEY_TO_SPEC[key][1]], lookups) for key in keys]
+    shape = tuple(len(values) for values, _ in axes)
+    points = int(np.prod(shape))
+    limit = SWEEP_MAX_POINTS if max_points is None else max_points
+    if points > limit:
+        raise ValueError(f"Sweep of {points} points exceeds the limit of {limit}.")
+
+    engine = get_engine()
+    with stage("predict"):
+        grid_axes = [(KEY_TO_SPEC[key][0], encoded) for key, (_, encoded) in zip(keys, axes)]
+        if isinstance(engine, ForestEngine):
+            grid_proba = engine.predict_proba_grid(base[0], grid_axes).reshape(points, -1)
+        else:
+            grid = np.repeat(base, points, axis=0)
+            for (position, _), mesh in zip(grid_axes, np.meshgrid(*(encoded for _, encoded in axes), indexing="ij")):
+                grid[:, position] = mesh.ravel()
+            grid_proba = engine.predict_proba(grid)
+        # Row 0 is the base payload itself; the grid follows in row-major order
+        proba = np.vstack([engine.predict_proba(base), grid_proba])
+    winners = np.argmax(proba, axis=1)
+    predicted = engine.classes_.take(winners).astype(np.int64)
+    confidence = proba[np.arange(len(proba)), winners]
+    base_class, classes = int(predicted[0]), predicted[1:]
+
+    # Distance of every grid point from the base payload, and a bit mask of
+    # the features it changes
+    distance = np.zeros(points)
+    changed = np.zeros(points, dtype=np.int64)
+    for bit, (key, (values, encoded), position) in enumerate(
+        zip(keys, axes, np.indices(shape).reshape(len(shape), -1))
+    ):
+        column, caster = KEY_TO_SPEC[key][1:]
+        if caster is str:
+            step = (encoded != base[0, KEY_TO_SPEC[key][0]]).astype(np.float64)
+        else:
+            span = float(encoded.max() - encoded.min()) or 1.0
+            step = np.abs(encoded - normalized[column]) / span
+        distance += step[position]
+        changed |= (step[position] > 0).astype(np.int64) << bit
+
+    def describe(index: int) -> Dict[str, Any]:
+        setting = np.unravel_index(index, shape)
+        changes = {}
+        for key, (values, _), axis_index in zip(keys, axes, setting):
+            value = values[axis_index]
+            if value != normalized[KEY_TO_SPEC[key][1]]:
+                changes[key] = value
+        class_id = int(classes[index])
+        return {
+            "changes": changes,
+            "class_id": class_id,
+            "result_type": RESULT_TYPES.get(class_id, "short"),
+            "probability": round(float(confidence[index + 1]), 4),
+            "distance": round(float(distance[index]), 4),
+        }
+
+    # Nearest first; among equally near points, the more confident one
+    order = np.lexsort((-confidence[1:], distance))
+    targets = _target_classes(target, base_class, engine.classes_)
+    reaching = order[np.isin(classes[order], targets)]
+    # The nearest point per set of changed features, then only the minimal sets
+    masks, first = np.unique(changed[reaching], return_index=True)
+    recommendations: List[int] = []
+    picked: List[int] = []
+    for mask, index in sorted(zip(masks.tolist(), first.tolist()), key=lambda item: item[1]):
+        if len(recommendations) >= top:
+            break
+        if not any(mask & chosen == chosen for chosen in picked):
+            picked.append(mask)
+            recommendations.append(int(reaching[index]))
+    nearest = {}
+    for class_id in engine.classes_:
+        if class_id != base_class:
+            candidates = order[classes[order] == class_id]
+            if candidates.size:
+                nearest[RESULT_TYPES.get(int(class_id), str(class_id))] = describe(int(candidates[0]))
+
+    return {
+        "base": {
+            "class_id": base_class,
+            "result_type": RESULT_TYPES.get(base_class, "short"),
+            "probability": round(float(confidence[0]), 4),
+        },
+        "axes": [{"key": key, "values": values} for key, (values, _) in zip(keys, axes)],
+        "shape": list(shape),
+        "points": points,
+        "classes": classes.tolist(),
+        "class_counts": {RESULT_TYPES.get(int(c), str(c)): int((classes == c).sum()) for c in engine.classes_},
+        "nearest": nearest,
+        "recommendations": [describe(index) for index in recommendations],
     }
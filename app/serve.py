@@ -0,0 +1,171 @@
+"""
+Pre-forking server for EVBot (Unix only).
+
+The parent process loads the compiled model, encoders, dataset, aggregate
+cube, default dashboard payload and chatbot once (see ``app.warm_up``),
+then forks worker processes that accept connections on a shared listening
+socket. Workers inherit those objects copy-on-write (``gc.freeze`` keeps
+the collector from dirtying them). The exported forest arrays and
+traversal tables are memory-mapped, so every worker reads the same pages
+from the OS page cache. Two things stay per worker: the pickled forest,
+which a worker loads the first time it scores a large batch
+(``ml_model.batch_engine``), and anything a worker builds after the fork.
+
+Each worker runs Werkzeug's threaded WSGI server. That server is meant for
+development: it starts a thread per connection and has no worker timeouts
+or protection against slow clients. Run it behind a reverse proxy that
+buffers requests, or serve ``app:app`` with a production WSGI server
+(for example ``gunicorn --preload``, which shares memory the same way)
+where that matters.
+
+Usage: python app/serve.py --workers 4 --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+from flask import jsonify
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, warm_up  # noqa: E402
+
+_ready_ms = 0.0
+
+
+def process_memory() -> Dict[str, float]:
+    """RSS, PSS and shared/private memory of this process in MB.
+
+    Pages a worker still shares copy-on-write with the master count as
+    shared here; PSS splits them evenly between the processes using them.
+    """
+    fields: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as handle:
+            for line in handle:
+                name, _, rest = line.partition(":")
+                parts = rest.split()
+                if len(parts) == 2 and parts[1] == "kB":
+                    fields[name] = int(parts[0])
+    except OSError:
+        return {"rss_mb": 0.0, "pss_mb": 0.0, "shared_mb": 0.0, "private_mb": 0.0}
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "shared_mb": round((fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024, 1),
+        "private_mb": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+@app.route('/api/worker', methods=['GET'])
+def worker_info():
+    """Report which worker served the request and its memory footprint"""
+    info = {"pid": os.getpid(), "startup_ms": round(_ready_ms, 1)}
+    info.update(process_memory())
+    return jsonify(info)
+
+
+def preload() -> float:
+    """Load everything the workers share; returns the time taken in ms."""
+    started = time.perf_counter()
+    warm_up()
+    # Move everything loaded so far out of the collector's reach so the
+    # workers do not copy these pages when a collection runs.
+    gc.collect()
+    gc.freeze()
+    return (time.perf_counter() - started) * 1000
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, host: str, port: int, forked_at: float) -> None:
+    global _ready_ms
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    _ready_ms = (time.perf_counter() - forked_at) * 1000
+    memory = process_memory()
+    print(
+        f"[worker {os.getpid()}] ready in {_ready_ms:.1f} ms, RSS {memory['rss_mb']} MB "
+        f"(PSS {memory['pss_mb']} MB, shared {memory['shared_mb']} MB, private {memory['private_mb']} MB)",
+        flush=True,
+    )
+    server.serve_forever()
+
+
+def _spawn(sock: socket.socket, host: str, port: int) -> int:
+    forked_at = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _run_worker(sock, host, port, forked_at)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def serve(host: str, port: int, workers: int, backlog: int = 1024) -> None:
+    preload_ms = preload()
+    memory = process_memory()
+    print(f"[master {os.getpid()}] preloaded in {preload_ms:.1f} ms, RSS {memory['rss_mb']} MB", flush=True)
+
+    sock = _bind(host, port, backlog)
+    children: List[int] = [_spawn(sock, host, port) for _ in range(workers)]
+    print(f"[master {os.getpid()}] serving on http://{host}:{port} with {workers} workers", flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid in children:
+            children.remove(pid)
+            if not stopping:
+                print(f"[master {os.getpid()}] worker {pid} exited, restarting", flush=True)
+                children.append(_spawn(sock, host, port))
+    sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run EVBot with pre-forked workers.")
+    parser.add_argument("--host", default=os.getenv("EVBOT_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("EVBOT_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EVBOT_WORKERS", str(os.cpu_count() or 1))))
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
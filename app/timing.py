@@ -0,0 +1,185 @@
+"""
+Per-stage latency instrumentation for EVBot.
+
+``with stage("figures"):`` times a block. Every duration is added to a
+per-stage histogram, which ``/metrics`` serves in the Prometheus text
+format. While a request is being handled, the duration is also added to
+that request's ``Server-Timing`` header, so the breakdown shows up in the
+browser devtools.
+
+``EVBOT_TIMING=0`` turns the hooks off. ``stage`` then returns a shared
+no-op context manager, so a hook costs one call and one flag check.
+``EVBOT_SERVER_TIMING=0`` keeps the histograms but drops the header.
+Histograms are per process: under ``serve.py`` each worker reports its own.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, from cached lookups to slow upstream LLM calls
+BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_enabled = os.getenv("EVBOT_TIMING", "1") == "1"
+SERVER_TIMING = os.getenv("EVBOT_SERVER_TIMING", "1") == "1"
+
+_NOOP = contextlib.nullcontext()
+# (stage, seconds) recorded while handling the current request, None outside one
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = \
+    contextvars.ContextVar("evbot_request_timings", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds for one label value."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class HistogramFamily:
+    """Histograms keyed by their label values, rendered as one Prometheus metric."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._histograms: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values: Tuple[str, ...], seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(values)
+            if histogram is None:
+                histogram = self._histograms[values] = Histogram()
+            histogram.observe(seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(h.counts), h.sum, h.count) for values, h in self._histograms.items())
+        for values, counts, total, count in items:
+            labels = ",".join(f'{label}="{_escape(value)}"' for label, value in zip(self.labels, values))
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+stage_durations = HistogramFamily(
+    "evbot_stage_duration_seconds", "Time spent in each request-handling stage.", ("stage",))
+request_durations = HistogramFamily(
+    "evbot_request_duration_seconds", "Time to handle a request, per endpoint.", ("endpoint", "method"))
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool) -> None:
+    global _enabled
+    _enabled = bool(value)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a duration measured elsewhere to the histograms (and the current request)."""
+    if not _enabled:
+        return
+    stage_durations.observe((name,), seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record(self.name, time.perf_counter() - self.started)
+
+
+def stage(name: str) -> Any:
+    """Context manager timing the ``name`` stage (a no-op while disabled)."""
+    if not _enabled:
+        return _NOOP
+    return _Stage(name)
+
+
+# --------------------------------------------------------------------------- #
+# Per-request collection
+# --------------------------------------------------------------------------- #
+def begin_request() -> Optional[float]:
+    """Start collecting stage timings for the request; returns its start time."""
+    if not _enabled:
+        return None
+    _request_timings.set([])
+    return time.perf_counter()
+
+
+def end_request(started: Optional[float], endpoint: str, method: str) -> Optional[str]:
+    """Record the request duration and return its ``Server-Timing`` header value.
+
+    Stages that ran several times in the request are summed.
+    """
+    timings = _request_timings.get()
+    _request_timings.set(None)
+    if started is None or not _enabled:
+        return None
+    elapsed = time.perf_counter() - started
+    request_durations.observe((endpoint, method), elapsed)
+    if not SERVER_TIMING:
+        return None
+
+    totals: Dict[str, float] = {}
+    for name, seconds in timings or ():
+        totals[name] = totals.get(name, 0.0) + seconds
+    totals["total"] = elapsed
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in totals.items())
+
+
+def render_metrics() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    lines = stage_durations.render() + request_durations.render()
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    stage_durations.clear()
+    request_durations.clear()
+
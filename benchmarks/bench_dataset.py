@@ -0,0 +1,118 @@
+"""
+Dataset loading benchmark: pd.read_csv versus the memory-mapped columnar store.
+
+Builds synthetic datasets with ``synthetic.py`` (1k, 1M and 10M rows by
+default) and, in a fresh process per measurement, reports the time
+to load each one and the memory it takes, both right after loading and
+after a full scan of every column. Memory is the growth of the process RSS
+and of its private part. Mapped store pages count as private while only one
+process maps them, but they are clean page cache that every worker mapping
+the store shares and the OS can drop at any time.
+
+Usage: python benchmarks/bench_dataset.py [--sizes 1000,1000000,10000000] [--workdir DIR] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+sys.path.insert(0, APP_DIR)
+
+from synthetic import DEFAULT_WORKDIR, synthetic_csv  # noqa: E402
+
+SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {app!r})
+import numpy as np
+import pandas as pd
+from dataset import ColumnarStore
+
+def memory():
+    fields = {{}}
+    try:
+        with open('/proc/self/smaps_rollup') as handle:
+            for line in handle:
+                name, _, rest = line.partition(':')
+                parts = rest.split()
+                if len(parts) == 2:
+                    fields[name] = int(parts[0]) / 1024
+    except OSError:
+        import resource
+        fields['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return fields.get('Rss', 0.0), fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)
+
+def scan(df):
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values.cat.codes.to_numpy().sum()
+        elif values.dtype == object:
+            pd.factorize(values)
+        else:
+            np.nansum(values.to_numpy())
+
+base_rss, base_private = memory()
+started = time.perf_counter()
+store = ColumnarStore({path!r})
+if {mode!r} == 'csv':
+    df = pd.read_csv({path!r})
+elif {mode!r} == 'convert':
+    store.sync(rebuild=True)
+    df = store.load()
+else:
+    df = store.load()
+loaded = time.perf_counter() - started
+rss, private = memory()
+started = time.perf_counter()
+scan(df)
+scanned = time.perf_counter() - started
+scan_rss, scan_private = memory()
+print(json.dumps({{
+    'load_ms': loaded * 1000, 'scan_ms': scanned * 1000,
+    'rss_mb': rss - base_rss, 'private_mb': private - base_private,
+    'scan_rss_mb': scan_rss - base_rss, 'scan_private_mb': scan_private - base_private,
+}}))
+"""
+
+MODES = (
+    ('csv', 'pd.read_csv'),
+    ('convert', 'convert to columnar (one-off)'),
+    ('columnar', 'columnar store (mmap)'),
+)
+
+
+def measure(path, mode):
+    code = SNIPPET.format(app=APP_DIR, path=path, mode=mode)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='1000,1000000,10000000')
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR)
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for rows in (int(size) for size in args.sizes.split(',')):
+        path = synthetic_csv(rows, args.workdir)
+        print(f"\n{rows:,} rows ({os.path.getsize(path) / 2 ** 20:.1f} MB CSV)")
+        print(f"  {'':32s} {'load ms':>10s} {'RSS MB':>8s} {'private':>8s} {'scan ms':>9s} "
+              f"{'RSS MB':>8s} {'private':>8s}")
+        for mode, label in MODES:
+            result = dict(measure(path, mode), rows=rows, mode=mode)
+            results.append(result)
+            print(f"  {label:32s} {result['load_ms']:10.1f} {result['rss_mb']:8.1f} {result['private_mb']:8.1f} "
+                  f"{result['scan_ms']:9.1f} {result['scan_rss_mb']:8.1f} {result['scan_private_mb']:8.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the flattened forest engine against the pickled sklearn model.
+
+Reports load time and resident memory (each measured in a fresh
+subprocess), checks that predictions are bit-identical, and compares
+latency across batch sizes, including the engine ``predict_batch``
+picks for each size (``ml_model.batch_engine``).
+
+Usage: python benchmarks/bench_forest.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import ml_model
+from dataset import DATA_PATH
+
+# Resident memory is read from /proc (Linux), so this measures the current
+# RSS increase rather than the peak reached while importing libraries.
+LOAD_SNIPPET = """
+import os, sys, time
+sys.path.insert(0, {app!r})
+import numpy, pandas, sklearn.ensemble, joblib
+import ml_model
+
+def rss():
+    with open('/proc/self/statm') as handle:
+        return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+before = rss()
+started = time.perf_counter()
+loaded = {load}
+elapsed = time.perf_counter() - started
+print(elapsed, (rss() - before) / 2 ** 20)
+"""
+
+
+def measure_load(load):
+    code = LOAD_SNIPPET.format(app=os.path.join(ROOT, 'app'), load=load)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    seconds, megabytes = output.split()
+    return float(seconds) * 1000, float(megabytes)
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    model = joblib.load(ml_model.MODEL_PATH)
+    engine = ml_model.export_forest(model)
+
+    pickle_ms, pickle_mb = measure_load('joblib.load(ml_model.MODEL_PATH)')
+    engine_ms, engine_mb = measure_load('ml_model.ForestEngine.load(ml_model.FOREST_PATH)')
+    print(f"Load  pickle: {pickle_ms:8.2f} ms  +{pickle_mb:6.1f} MB RSS")
+    print(f"Load  engine: {engine_ms:8.2f} ms  +{engine_mb:6.1f} MB RSS")
+
+    df = pd.read_csv(DATA_PATH).drop(columns=['Optimal Charging Duration Class'])
+    for column, encoder in ml_model._load_encoders().items():
+        df[column] = encoder.transform(df[column])
+    # Jitter the continuous columns so rows are not just training points
+    rng = np.random.default_rng(0)
+    sample = df.sample(5000, replace=True, random_state=0).reset_index(drop=True)
+    continuous = [column for _, column, caster in ml_model.FEATURE_SPECS if caster is float]
+    sample[continuous] = sample[continuous] * rng.normal(1, 0.05, (len(sample), len(continuous)))
+
+    identical = np.array_equal(model.predict_proba(sample), engine.predict_proba(sample.to_numpy()))
+    print(f"Bit-identical predict_proba on {len(sample)} rows: {identical}")
+
+    for rows in (1, 10, 100, 1000, 5000):
+        frame = sample.head(rows)
+        array = frame.to_numpy()
+        sklearn_ms = best_of(lambda: model.predict(frame))
+        engine_ms = best_of(lambda: engine.predict(array))
+        served = ml_model.batch_engine(rows)
+        served_ms = best_of(lambda: served.predict(array))
+        print(f"Batch {rows:5d}: sklearn {sklearn_ms:8.2f} ms  engine {engine_ms:8.2f} ms  "
+              f"served {served_ms:8.2f} ms ({type(served).__name__.strip('_')})")
+
+
+if __name__ == '__main__':
+    main()
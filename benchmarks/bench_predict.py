@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for single-row prediction latency.
+
+Compares the DataFrame/LabelEncoder path (build_feature_frame +
+encode_categorical_features + model.predict) with the compiled NumPy path
+used by predict_from_payload, on rows from the bundled dataset.
+
+Usage: python benchmarks/bench_predict.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import numpy as np
+import pandas as pd
+
+from dataset import DATA_PATH
+from ml_model import (
+    FEATURE_SPECS,
+    build_feature_frame,
+    encode_categorical_features,
+    get_assets,
+    predict_from_payload,
+    prediction_cache,
+)
+
+
+def frame_path(payload):
+    model, _ = get_assets()
+    features = encode_categorical_features(build_feature_frame(payload))
+    return int(model.predict(features)[0])
+
+
+def fast_path(payload):
+    return predict_from_payload(payload)['class_id']
+
+
+def measure(fn, payloads):
+    timings = []
+    results = []
+    for payload in payloads:
+        started = time.perf_counter()
+        results.append(fn(payload))
+        timings.append(time.perf_counter() - started)
+    timings_ms = np.array(timings) * 1000
+    return results, np.percentile(timings_ms, 50), np.percentile(timings_ms, 99)
+
+
+def main(iterations=500):
+    df = pd.read_csv(DATA_PATH)
+    rows = df.sample(iterations, replace=True, random_state=0).to_dict('records')
+    payloads = [{key: row[column] for key, column, _ in FEATURE_SPECS} for row in rows]
+
+    get_assets()
+    # Measure the inference path itself, not memoised results
+    prediction_cache.maxsize = 0
+    # Warm both paths before timing
+    frame_path(payloads[0])
+    fast_path(payloads[0])
+
+    frame_results, frame_p50, frame_p99 = measure(frame_path, payloads)
+    fast_results, fast_p50, fast_p99 = measure(fast_path, payloads)
+
+    assert frame_results == fast_results, "fast path disagrees with model.predict"
+
+    print(f"Rows: {iterations}")
+    print(f"DataFrame path: p50 {frame_p50:.3f} ms  p99 {frame_p99:.3f} ms")
+    print(f"Compiled path:  p50 {fast_p50:.3f} ms  p99 {fast_p99:.3f} ms")
+    print(f"Speed-up:       p50 {frame_p50 / fast_p50:.1f}x  p99 {frame_p99 / fast_p99:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
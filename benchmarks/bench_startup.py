@@ -0,0 +1,107 @@
+"""
+Application startup benchmark.
+
+In fresh interpreters, measures how long ``import app`` takes, the latency
+of the first requests on a cold app (which pay for anything loaded lazily),
+and the time of an explicit ``warm_up()``. A ``-X importtime`` run breaks the
+import down by top-level package.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--top 12]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+
+COLD_SNIPPET = """
+import sys, time
+sys.path.insert(0, {app!r})
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+client = module.app.test_client()
+timings = [imported - started]
+for method, path, data in (
+    ('GET', '/', None),
+    ('POST', '/predict', {form!r}),
+    ('GET', '/api/dashboard/data', None),
+    ('POST', '/api/chatbot', None),
+):
+    begin = time.perf_counter()
+    if path == '/api/chatbot':
+        response = client.post(path, json={{'message': 'How often should I fast charge?'}})
+    else:
+        response = client.open(path, method=method, data=data)
+    assert response.status_code == 200, (path, response.status_code)
+    timings.append(time.perf_counter() - begin)
+print(' '.join(str(value) for value in timings))
+"""
+
+WARM_SNIPPET = """
+import sys, time
+sys.path.insert(0, {app!r})
+import app as module
+print(module.warm_up() / 1000)
+"""
+
+LABELS = ['import app', 'first GET /', 'first POST /predict', 'first dashboard data', 'first chatbot answer']
+
+
+def sample_form():
+    sys.path.insert(0, APP_DIR)
+    import pandas as pd
+    from dataset import DATA_PATH
+    from ml_model import FEATURE_SPECS
+
+    row = pd.read_csv(DATA_PATH, nrows=1).iloc[0]
+    return {key: str(row[column]) for key, column, _ in FEATURE_SPECS}
+
+
+def run(code, env=None, extra_args=()):
+    env = dict(os.environ, EVBOT_WARMUP='off', **(env or {}))
+    result = subprocess.run([sys.executable, *extra_args, '-c', code], capture_output=True, text=True,
+                            check=True, env=env, cwd=ROOT)
+    return result
+
+
+def import_breakdown(top):
+    """Cumulative import time per top-level package, in ms."""
+    stderr = run(f"import sys; sys.path.insert(0, {APP_DIR!r}); import app", extra_args=('-X', 'importtime')).stderr
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)', line)
+        if match:
+            # Self time summed per top-level package: nested packages are
+            # attributed to themselves, not to whoever imported them first.
+            totals[match.group(4).split('.')[0]] += int(match.group(1)) / 1000
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    cold_code = COLD_SNIPPET.format(app=APP_DIR, form=sample_form())
+    cold = [list(map(float, run(cold_code).stdout.split()[-len(LABELS):])) for _ in range(args.repeat)]
+    warm = [float(run(WARM_SNIPPET.format(app=APP_DIR)).stdout.split()[-1]) for _ in range(args.repeat)]
+
+    print(f"Median of {args.repeat} fresh processes")
+    for index, label in enumerate(LABELS):
+        print(f"  {label:22s} {statistics.median(run_[index] for run_ in cold) * 1000:8.1f} ms")
+    print(f"  {'warm_up()':22s} {statistics.median(warm) * 1000:8.1f} ms")
+
+    print(f"\nImport time by top-level package (self time, top {args.top})")
+    for package, milliseconds in import_breakdown(args.top):
+        print(f"  {package:22s} {milliseconds:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Throughput load test for the pre-forked production server.
+
+Starts ``app/serve.py`` with 1, 2, ... N workers, drives POST /predict (or
+another endpoint) from several client processes for a fixed duration and
+reports requests/second, latency percentiles and the scaling factor
+relative to one worker. Prediction memoisation is disabled on the server
+so every request does real work.
+
+Usage: python benchmarks/load_test.py [--workers 1 2 4] [--clients 8] [--seconds 10]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+from ml_model import FEATURE_SPECS  # noqa: E402
+
+DATA_PATH = os.path.join(ROOT, 'data', 'ev_battery_charging_data.csv')
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+def build_bodies(count=200):
+    rows = pd.read_csv(DATA_PATH).sample(count, random_state=0).to_dict('records')
+    return [
+        urllib.parse.urlencode({key: row[column] for key, column, _ in FEATURE_SPECS})
+        for row in rows
+    ]
+
+
+def build_requests(path, bodies):
+    """(method, path, body, headers) requests a client cycles through."""
+    if path == '/predict':
+        return [('POST', path, body, FORM_HEADERS) for body in bodies]
+    return [('GET', path, None, {})]
+
+
+def client(args):
+    """Send ``requests`` in turn, starting at ``offset``, for ``seconds``.
+
+    Also used by ``suite.py``. Returns the latencies and the error count.
+    """
+    port, requests, seconds, offset = args
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    index = offset
+    while time.perf_counter() < deadline:
+        method, path, body, headers = requests[index % len(requests)]
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        latencies.append(time.perf_counter() - started)
+        index += 1
+    connection.close()
+    return latencies, errors
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/worker')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(workers, clients, seconds, path, port, bodies):
+    env = dict(os.environ, PREDICTION_CACHE_SIZE='0')
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'app', 'serve.py'), '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(client, [(port, build_requests(path, bodies), seconds, 0)] * clients)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = np.concatenate([np.array(lat) for lat, _ in results]) * 1000
+    errors = sum(err for _, err in results)
+    return {
+        'workers': workers,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / seconds,
+        'p50': float(np.percentile(latencies, 50)),
+        'p99': float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cores = os.cpu_count() or 1
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, max(1, cores // 2), cores}))
+    parser.add_argument('--clients', type=int, default=max(4, 2 * cores))
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--path', default='/predict')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    bodies = build_bodies()
+    print(f"{cores} cores, {args.clients} client processes, {args.seconds:.0f}s per run, {args.path}")
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args.clients, args.seconds, args.path, args.port, bodies)
+        baseline = baseline or result['rps']
+        print(f"workers {workers:2d}: {result['rps']:8.1f} req/s  p50 {result['p50']:7.2f} ms  "
+              f"p99 {result['p99']:7.2f} ms  errors {result['errors']}  scaling {result['rps'] / baseline:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the OpenAI and Hugging Face chat APIs.
+
+Serves ``POST /v1/responses`` (OpenAI Responses API) and
+``POST /v1/chat/completions`` (the OpenAI-compatible route the Hugging
+Face InferenceClient calls), both plain JSON and streamed as SSE. Latency,
+per-token delay and failures are configurable per API, at start-up or at
+runtime with ``POST /_stub/config``, so timeouts, retries and hedging can be
+exercised without network access or API keys.
+
+Usage: python benchmarks/stub_llm.py --port 8900 --openai-latency-ms 800 --hf-latency-ms 200
+
+Then point the app at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub
+    HF_BASE_URL=http://127.0.0.1:8900 HF_API_KEY=stub
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "Keep daily charging between 20 and 80 percent and save fast charging "
+    "for trips; it adds heat and wears the battery faster."
+)
+
+DEFAULT_CONFIG = {
+    "latency_ms": 0.0,      # delay before the first byte
+    "jitter_ms": 0.0,       # uniform extra delay added to latency_ms
+    "token_delay_ms": 0.0,  # delay between streamed chunks
+    "fail_rate": 0.0,       # probability of answering with fail_status
+    "fail_next": 0,         # answer the next N requests with fail_status
+    "fail_status": 503,
+    "answer": DEFAULT_ANSWER,
+}
+
+
+class StubState:
+    """Per-API configuration and request counters shared by handler threads."""
+
+    def __init__(self, **overrides):
+        self.lock = threading.Lock()
+        self.config = {api: dict(DEFAULT_CONFIG) for api in ("openai", "huggingface")}
+        self.requests = {api: 0 for api in self.config}
+        for api, values in overrides.items():
+            self.config[api].update(values)
+
+    def update(self, changes):
+        with self.lock:
+            for api, values in changes.items():
+                self.config[api].update(values)
+
+    def begin(self, api):
+        """Count a request and decide how to answer it: (config, fail)."""
+        with self.lock:
+            self.requests[api] += 1
+            config = dict(self.config[api])
+            fail = config["fail_next"] > 0 or random.random() < config["fail_rate"]
+            if config["fail_next"] > 0:
+                self.config[api]["fail_next"] -= 1
+        return config, fail
+
+
+def _words(text):
+    words = text.split(" ")
+    return [word + (" " if index < len(words) - 1 else "") for index, word in enumerate(words)]
+
+
+def _openai_events(text, response_id, model):
+    response = {"id": response_id, "object": "response", "model": model, "status": "in_progress", "output": []}
+    yield "response.created", {"type": "response.created", "response": response}
+    for word in _words(text):
+        yield "response.output_text.delta", {
+            "type": "response.output_text.delta", "item_id": "msg_stub",
+            "output_index": 0, "content_index": 0, "delta": word,
+        }
+    yield "response.completed", {"type": "response.completed", "response": dict(response, status="completed")}
+
+
+def _openai_body(text, response_id, model):
+    return {
+        "id": response_id, "object": "response", "created_at": int(time.time()), "model": model,
+        "status": "completed", "output_text": text,
+        "output": [{
+            "id": "msg_stub", "type": "message", "role": "assistant", "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+    }
+
+
+def _chat_chunks(text, completion_id, model):
+    base = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+    for word in _words(text):
+        yield None, dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": word},
+                                         "finish_reason": None}])
+    yield None, dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+
+
+def _chat_body(text, completion_id, model):
+    return {
+        "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": len(text.split())},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set on the server-specific subclass
+
+    def log_message(self, format, *args):  # noqa: A002 - keep the console quiet
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client timed out first
+
+    def do_GET(self):
+        if self.path == "/_stub/stats":
+            with self.state.lock:
+                self._send_json(200, {"requests": dict(self.state.requests), "config": self.state.config})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/_stub/config":
+            self.state.update(body)
+            self._send_json(200, self.state.config)
+            return
+        if self.path.endswith("/responses"):
+            api, events, plain = "openai", _openai_events, _openai_body
+        elif self.path.endswith("/chat/completions"):
+            api, events, plain = "huggingface", _chat_chunks, _chat_body
+        else:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        config, fail = self.state.begin(api)
+        time.sleep((config["latency_ms"] + random.uniform(0, config["jitter_ms"])) / 1000)
+        if fail:
+            self._send_json(config["fail_status"], {"error": {"message": "stub failure", "type": "server_error"}})
+            return
+
+        request_id = f"stub-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub-model")
+        if not body.get("stream"):
+            self._send_json(200, plain(config["answer"], request_id, model))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for index, (event, data) in enumerate(events(config["answer"], request_id, model)):
+                if index and config["token_delay_ms"]:
+                    time.sleep(config["token_delay_ms"] / 1000)
+                prefix = f"event: {event}\n" if event else ""
+                self.wfile.write(f"{prefix}data: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            if api == "huggingface":
+                self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up, e.g. it lost a hedged race
+        self.close_connection = True
+
+
+class StubLLMServer:
+    """Run the stub in a background thread; ``url`` is its base URL."""
+
+    def __init__(self, host="127.0.0.1", port=0, **overrides):
+        self.state = StubState(**overrides)
+        handler = type("BoundStubHandler", (StubHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def configure(self, **changes):
+        self.state.update(changes)
+
+    def requests(self, api):
+        with self.state.lock:
+            return self.state.requests[api]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI and Hugging Face chat APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    for api, flag in (("openai", "openai"), ("huggingface", "hf")):
+        parser.add_argument(f"--{flag}-latency-ms", type=float, default=0.0)
+        parser.add_argument(f"--{flag}-token-delay-ms", type=float, default=0.0)
+        parser.add_argument(f"--{flag}-fail-rate", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    overrides = {
+        api: {
+            "latency_ms": getattr(args, f"{flag}_latency_ms"),
+            "token_delay_ms": getattr(args, f"{flag}_token_delay_ms"),
+            "fail_rate": getattr(args, f"{flag}_fail_rate"),
+            "jitter_ms": args.jitter_ms,
+        }
+        for api, flag in (("openai", "openai"), ("huggingface", "hf"))
+    }
+    server = StubLLMServer(args.host, args.port, **overrides)
+    print(f"Stub LLM APIs on {server.url} (OpenAI base_url {server.url}/v1, HF base_url {server.url})", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
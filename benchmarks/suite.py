@@ -0,0 +1,295 @@
+"""
+End-to-end benchmark and load-test suite.
+
+Runs against a synthetic dataset of ``--rows`` sessions (see ``synthetic.py``):
+
+- micro-benchmarks, in process: ``predict_from_payload`` with memoisation
+  off, the dashboard figure builders in each level-of-detail mode, the
+  encoded dashboard payload, the aggregate cube and the client-side dataset
+  blob;
+- load tests against ``app/serve.py``: ``POST /predict``,
+  ``GET /api/dashboard/data`` over every filter combination and
+  ``POST /api/chatbot`` answered by the stub LLM server (``stub_llm.py``)
+  with ``--llm-latency-ms`` of latency. Each reports throughput and
+  p50/p95/p99 latency. Prediction and chatbot answer caches are disabled on
+  the server so every request does real work.
+
+Results are written as JSON (``benchmarks/results/<commit>.json`` by
+default) together with the commit and machine they were measured on.
+``--compare`` prints the change against an earlier results file, so
+regressions show up across commits.
+
+Usage: python benchmarks/suite.py [--rows 10000] [--seconds 10] [--clients 4] [--workers 1]
+                                  [--only micro|load] [--output FILE] [--compare OLD.json]
+"""
+import argparse
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+sys.path.insert(0, APP_DIR)
+
+# App modules are imported lazily, once EVBOT_DATA_PATH names the synthetic dataset
+from stub_llm import StubLLMServer  # noqa: E402
+from synthetic import DEFAULT_WORKDIR, synthetic_csv  # noqa: E402
+
+SCENARIOS = ('predict', 'dashboard', 'chatbot')
+QUESTIONS = (
+    'How often should I fast charge my battery?',
+    'Does cold weather reduce charging efficiency?',
+    'What state of charge should I keep for daily driving?',
+    'How much does degradation depend on charging cycles?',
+)
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+JSON_HEADERS = {'Content-Type': 'application/json'}
+# Relative change that counts as a regression in --compare
+DEFAULT_THRESHOLD = 0.10
+
+
+def summarize(latencies_ms, seconds=None):
+    """Count, mean and p50/p95/p99 of ``latencies_ms`` (plus throughput over ``seconds``)."""
+    latencies_ms = np.asarray(latencies_ms, dtype=np.float64)
+    if not latencies_ms.size:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    result = {
+        'count': int(latencies_ms.size),
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
+    if seconds:
+        result['rps'] = latencies_ms.size / seconds
+    return result
+
+
+def timed(fn, iterations, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(np.array(samples) * 1000)
+
+
+def payloads_from(df, count, seed=0):
+    from ml_model import FEATURE_SPECS
+
+    rows = df.sample(count, replace=True, random_state=seed)
+    return [{key: rows[column].iloc[index] for key, column, _ in FEATURE_SPECS} for index in range(count)]
+
+
+# --- micro-benchmarks -------------------------------------------------------
+
+def run_micro(iterations):
+    """In-process micro-benchmarks on the dataset ``EVBOT_DATA_PATH`` points at."""
+    import dashboard
+    from dataset import dataset_cache
+    from ml_model import get_assets, predict_from_payload, prediction_cache
+
+    df = dataset_cache.get()
+    get_assets()
+    prediction_cache.maxsize = 0
+    payloads = itertools.cycle(payloads_from(df, 1000))
+
+    def payload():
+        dashboard.payload_cache.clear()
+        dashboard.get_dashboard_payload()
+
+    points = df.head(dashboard.LOD_THRESHOLD)
+    results = {
+        'predict_from_payload': timed(lambda: predict_from_payload(next(payloads)), iterations * 100),
+        'build_figures[points]': timed(lambda: dashboard.build_figures(points), iterations),
+    }
+    if len(df) > dashboard.LOD_THRESHOLD:
+        for lod in dashboard.LOD_MODES:
+            results[f'build_figures[{lod}]'] = timed(lambda: dashboard.build_figures(df, lod), iterations)
+    results['dashboard_payload'] = timed(payload, iterations)
+    results['aggregate_cube'] = timed(lambda: dashboard.AggregateCube.from_frame(df), iterations)
+    results['dataset_blob'] = timed(lambda: dashboard.encode_dataset_blob(df), iterations)
+    return results
+
+
+# --- load tests -------------------------------------------------------------
+
+def scenario_requests(name, df):
+    """(method, path, body, headers) requests a client cycles through."""
+    from dataset import CATEGORICAL_COLUMNS
+
+    if name == 'predict':
+        return [('POST', '/predict', urllib.parse.urlencode(payload), FORM_HEADERS)
+                for payload in payloads_from(df, 200)]
+    if name == 'dashboard':
+        choices = [['all'] + sorted(map(str, df[column].dropna().unique())) for column in CATEGORICAL_COLUMNS]
+        requests = []
+        for charging_mode, battery_type, ev_model in itertools.product(*choices):
+            query = urllib.parse.urlencode(
+                {'ev_model': ev_model, 'battery_type': battery_type, 'charging_mode': charging_mode})
+            requests.append(('GET', f'/api/dashboard/data?{query}', None, {}))
+        return requests
+    return [('POST', '/api/chatbot', json.dumps({'message': question}), JSON_HEADERS) for question in QUESTIONS]
+
+
+def run_load(data_path, df, scenarios, workers, clients, seconds, port, llm_latency_ms):
+    """Drive each scenario against a pre-forked server; one result per scenario."""
+    from load_test import client, wait_ready
+
+    results = {}
+    with StubLLMServer(huggingface={'latency_ms': llm_latency_ms}) as stub:
+        env = dict(
+            os.environ,
+            EVBOT_DATA_PATH=data_path,
+            PREDICTION_CACHE_SIZE='0',
+            CHATBOT_CACHE_SIZE='0',
+            CHATBOT_LOCAL_ANSWERS='0',
+            HF_API_KEY='stub',
+            HF_BASE_URL=stub.url,
+            HF_MODEL='stub-model',
+            OPENAI_API_KEY='',
+        )
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(APP_DIR, 'serve.py'), '--host', '127.0.0.1',
+             '--port', str(port), '--workers', str(workers)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port, timeout=300)
+            with multiprocessing.Pool(clients) as pool:
+                for name in scenarios:
+                    requests = scenario_requests(name, df)
+                    # Warm every worker's lazily loaded state before timing
+                    pool.map(client, [(port, requests, 0.5, offset) for offset in range(clients)])
+                    runs = pool.map(client, [(port, requests, seconds, offset * 7) for offset in range(clients)])
+                    latencies = np.concatenate([np.array(run) for run, _ in runs]) * 1000
+                    results[name] = dict(summarize(latencies, seconds), errors=sum(errors for _, errors in runs))
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+# --- results ----------------------------------------------------------------
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{commit}-dirty' if dirty else commit
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Rows of (section, name, metric, old, new, change, regressed) for metrics in both runs.
+
+    Latencies regress when they grow by more than ``threshold``, throughput
+    when it drops by more than ``threshold``.
+    """
+    rows = []
+    for section in ('micro', 'load'):
+        for name, metrics in current.get(section, {}).items():
+            old_metrics = baseline.get(section, {}).get(name, {})
+            for metric in ('p50_ms', 'p99_ms', 'rps'):
+                old, new = old_metrics.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                regressed = change < -threshold if metric == 'rps' else change > threshold
+                rows.append((section, name, metric, old, new, change, regressed))
+    return rows
+
+
+def print_results(results):
+    for section in ('micro', 'load'):
+        if not results.get(section):
+            continue
+        print(f"\n{section}")
+        for name, metrics in results[section].items():
+            rate = f"  {metrics['rps']:8.1f} req/s  errors {metrics['errors']}" if 'rps' in metrics else ''
+            print(f"  {name:24s} p50 {metrics['p50_ms']:9.3f} ms  p95 {metrics['p95_ms']:9.3f} ms  "
+                  f"p99 {metrics['p99_ms']:9.3f} ms{rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10_000, help='synthetic dataset size')
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR)
+    parser.add_argument('--only', choices=('micro', 'load'), default=None)
+    parser.add_argument('--iterations', type=int, default=10, help='repeats of each heavy micro-benchmark')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--llm-latency-ms', type=float, default=200)
+    parser.add_argument('--output', default=None, help='results file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', default=None, help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    data_path = synthetic_csv(args.rows, args.workdir)
+    # Before the app modules are imported, so dataset_cache reads it too
+    os.environ['EVBOT_DATA_PATH'] = data_path
+    from dataset import dataset_cache
+
+    df = dataset_cache.get()
+    commit = git_commit()
+    results = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'rows': len(df),
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+    }
+    print(f"{len(df):,} synthetic sessions ({data_path}), commit {commit}")
+    if args.only in (None, 'micro'):
+        results['micro'] = run_micro(args.iterations)
+    if args.only in (None, 'load'):
+        results['load'] = run_load(data_path, df, args.scenarios, args.workers, args.clients,
+                                   args.seconds, args.port, args.llm_latency_ms)
+    print_results(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nAgainst {baseline.get('meta', {}).get('commit', args.compare)}")
+        if baseline.get('meta', {}).get('rows') != len(df):
+            print(f"  (baseline measured on {baseline.get('meta', {}).get('rows')} rows, not {len(df)})")
+        for section, name, metric, old, new, change, regressed in rows:
+            print(f"  {section:5s} {name:24s} {metric:6s} {old:10.3f} -> {new:10.3f}  {change:+7.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+        if args.fail_on_regression and any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Synthetic charging-session generator.
+
+Scales the bundled dataset to any number of rows (10k, 1M and 10M by
+default). Rows are drawn with replacement from the bundled sessions, which
+keeps the mix of EV models, battery types, charging modes and duration
+classes and the correlations between columns. Each continuous column then
+gets Gaussian noise of ``noise`` times its standard deviation, clipped to
+the observed range, so rows are not exact copies of training points; label
+columns such as the duration class are kept as drawn. Output is
+deterministic for a given seed.
+
+Usage: python benchmarks/synthetic.py [--rows 10000,1000000,10000000] [--out DIR] [--seed 0]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Always the bundled file: EVBOT_DATA_PATH may already point at a synthetic one
+SOURCE_PATH = os.path.join(ROOT, 'data', 'ev_battery_charging_data.csv')
+DEFAULT_SIZES = (10_000, 1_000_000, 10_000_000)
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), 'evbot-bench-dataset')
+CHUNK_ROWS = 500_000
+# Numeric columns with at most this many distinct values are labels, not measurements
+MAX_LABEL_VALUES = 20
+
+
+def generate(rows, path, seed=0, noise=0.05, source_path=SOURCE_PATH):
+    """Write ``rows`` synthetic sessions to ``path`` (in chunks, so memory stays flat)."""
+    source = pd.read_csv(source_path)
+    numeric = [column for column in source.select_dtypes('number').columns
+               if source[column].nunique() > MAX_LABEL_VALUES]
+    low = source[numeric].min().to_numpy()
+    high = source[numeric].max().to_numpy()
+    scale = source[numeric].std().to_numpy() * noise
+    integer = [pd.api.types.is_integer_dtype(source[column]) for column in numeric]
+
+    rng = np.random.default_rng(seed)
+    with open(path + '.tmp', 'w', encoding='utf-8', newline='') as handle:
+        for start in range(0, rows, CHUNK_ROWS):
+            sample = source.iloc[rng.integers(0, len(source), min(CHUNK_ROWS, rows - start))].reset_index(drop=True)
+            values = sample[numeric].to_numpy(dtype=np.float64)
+            values = np.clip(values + rng.normal(0.0, 1.0, values.shape) * scale, low, high)
+            for index, column in enumerate(numeric):
+                sample[column] = np.rint(values[:, index]).astype(np.int64) if integer[index] else values[:, index]
+            sample.to_csv(handle, header=start == 0, index=False)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def synthetic_csv(rows, workdir=DEFAULT_WORKDIR, seed=0):
+    """Path of a CSV of ``rows`` synthetic sessions, generated once per (rows, seed) in ``workdir``."""
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f'sessions_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        generate(rows, path, seed=seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', default=','.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--out', default=DEFAULT_WORKDIR)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for rows in (int(size) for size in args.rows.split(',')):
+        path = synthetic_csv(rows, args.out, args.seed)
+        print(f"{rows:>12,} rows  {os.path.getsize(path) / 2 ** 20:9.1f} MB  {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Shared pytest fixtures.
+
+The repository does not ship trained artifacts, so tests that need the
+model train a small forest on the bundled dataset and point ``ml_model``
+at it.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import joblib
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+
+@pytest.fixture(scope='session')
+def model_artifacts(tmp_path_factory):
+    import ml_model
+    from dataset import DATA_PATH
+
+    df = pd.read_csv(DATA_PATH)
+    X = df.drop('Optimal Charging Duration Class', axis=1)
+    y = df['Optimal Charging Duration Class']
+    label_encoders = {}
+    for col in ['Charging Mode', 'Battery Type', 'EV Model']:
+        le = LabelEncoder()
+        X[col] = le.fit_transform(X[col])
+        label_encoders[col] = le
+    model = RandomForestClassifier(n_estimators=25, random_state=42).fit(X, y)
+
+    directory = tmp_path_factory.mktemp('models')
+    model_path = str(directory / 'ev_model.pkl')
+    encoders_path = str(directory / 'label_encoders.pkl')
+    joblib.dump(model, model_path)
+    joblib.dump(label_encoders, encoders_path)
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(ml_model, 'MODEL_PATH', model_path)
+    patch.setattr(ml_model, 'ENCODERS_PATH', encoders_path)
+    patch.setattr(ml_model, 'FOREST_PATH', str(directory / 'ev_model_forest'))
+    ml_model.reset_assets()
+    yield {'model_path': model_path, 'encoders_path': encoders_path, 'frame': df}
+    patch.undo()
+    ml_model.reset_assets()
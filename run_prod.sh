@@ -0,0 +1,5 @@
+#!/bin/bash
+# Production mode: preload once, then fork one worker per core (override with EVBOT_WORKERS)
+cd "$(dirname "$0")"
+source venv/bin/activate
+python app/serve.py --host "${EVBOT_HOST:-0.0.0.0}" --port "${EVBOT_PORT:-8000}" --workers "${EVBOT_WORKERS:-$(nproc)}"
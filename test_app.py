@@ -0,0 +1,20 @@
+"""
+Tests for application startup.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_import_defers_heavy_libraries():
+    code = (
+        "import sys; sys.path.insert(0, 'app'); import app; "
+        "print(sorted(m for m in ('plotly', 'openai', 'huggingface_hub.inference._client', 'sklearn') "
+        "if m in sys.modules))"
+    )
+    env = dict(os.environ, EVBOT_WARMUP='off')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]'
@@ -0,0 +1,44 @@
+"""
+Tests for the benchmark suite's synthetic data generator and result comparison.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import pandas as pd
+
+from dataset import DATA_PATH, TARGET_COLUMN
+from suite import compare, summarize
+from synthetic import generate
+
+
+def test_synthetic_sessions_follow_the_source(tmp_path):
+    source = pd.read_csv(DATA_PATH)
+    path = generate(5000, str(tmp_path / 'sessions.csv'), seed=1)
+    synthetic = pd.read_csv(path)
+
+    assert len(synthetic) == 5000
+    assert (synthetic.dtypes == source.dtypes).all()
+    for column in source.select_dtypes('object').columns:
+        assert set(synthetic[column]) <= set(source[column])
+    assert set(synthetic[TARGET_COLUMN]) <= set(source[TARGET_COLUMN])
+    shares = synthetic[TARGET_COLUMN].value_counts(normalize=True)
+    expected = source[TARGET_COLUMN].value_counts(normalize=True)
+    assert (shares - expected).abs().max() < 0.05
+
+    numeric = source.select_dtypes('float').columns
+    assert (synthetic[numeric].min() >= source[numeric].min()).all()
+    assert (synthetic[numeric].max() <= source[numeric].max()).all()
+    # Jittered, not copied
+    assert not synthetic['SOC (%)'].isin(source['SOC (%)']).all()
+
+
+def test_compare_flags_regressions():
+    baseline = {'micro': {'predict': summarize([1.0] * 10)}, 'load': {'chatbot': summarize([100.0] * 20, 2)}}
+    current = {'micro': {'predict': summarize([1.5] * 10)}, 'load': {'chatbot': summarize([100.0] * 12, 2)}}
+
+    regressed = {(name, metric) for _, name, metric, *_, flag in compare(current, baseline) if flag}
+    assert regressed == {('predict', 'p50_ms'), ('predict', 'p99_ms'), ('chatbot', 'rps')}
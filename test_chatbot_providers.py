@@ -0,0 +1,120 @@
+"""
+Tests for chatbot timeouts, retries, failover and hedging against the
+local stub LLM server.
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from chatbot import EVBotChatbot, ResponseCache, RetryPolicy
+from stub_llm import DEFAULT_ANSWER, StubLLMServer
+
+
+@pytest.fixture
+def stub():
+    with StubLLMServer() as server:
+        yield server
+
+
+class SlowOpenAI:
+    """In-process OpenAI stand-in (the pinned SDK predates the Responses API)."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay, self.error, self.calls = delay, error, 0
+        self.responses = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(output_text='openai answer')
+
+
+def _bot(monkeypatch, stub, openai_client=None, hf_timeout_ms=2000, hedge_after_ms=0):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setenv('HF_BASE_URL', stub.url)
+    monkeypatch.setenv('HF_TIMEOUT_MS', str(hf_timeout_ms))
+    monkeypatch.setenv('CHATBOT_HEDGE_AFTER_MS', str(hedge_after_ms))
+    bot = EVBotChatbot(hf_api_key='stub', hf_model='stub-model')
+    bot.retry_policy = RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.02)
+    bot.response_cache = ResponseCache(maxsize=0)
+    bot.knowledge = None  # exercise the provider path
+    if openai_client is not None:
+        bot._clients['openai'] = openai_client
+        bot._openai_key = 'stub'
+        bot._provider = 'openai'
+    return bot
+
+
+def test_retries_transient_failures(monkeypatch, stub):
+    bot = _bot(monkeypatch, stub)
+    stub.configure(huggingface={'fail_next': 2})
+
+    assert bot.get_response('How often should I fast charge?') == DEFAULT_ANSWER
+    assert ''.join(bot.stream_response('Is heat bad for the battery?')) == DEFAULT_ANSWER
+    assert stub.requests('huggingface') == 4
+    assert bot.provider_stats.info()['providers']['huggingface']['retries'] == 2
+
+
+def test_timeout_bounds_a_slow_provider(monkeypatch, stub):
+    bot = _bot(monkeypatch, stub, hf_timeout_ms=100)
+    bot.retry_policy = RetryPolicy(attempts=2, base_delay=0.01, max_delay=0.01)
+    stub.configure(huggingface={'latency_ms': 1000})
+
+    started = time.perf_counter()
+    answer = bot.get_response('Hello?')
+    assert answer.startswith("Sorry, I couldn't reach the EV assistant service")
+    assert time.perf_counter() - started < 0.8
+    assert bot.provider_stats.info()['providers']['huggingface']['failures'] == 1
+
+
+def test_fails_over_to_the_backup_provider(monkeypatch, stub):
+    openai = SlowOpenAI(error=ConnectionError('refused'))
+    bot = _bot(monkeypatch, stub, openai_client=openai)
+
+    assert bot.get_response('Best charging routine?') == DEFAULT_ANSWER
+    assert openai.calls == 3
+    assert bot.provider_stats.failovers == 1
+
+
+def test_hedged_request_takes_the_first_answer(monkeypatch, stub):
+    openai = SlowOpenAI(delay=1.0)
+    bot = _bot(monkeypatch, stub, openai_client=openai, hedge_after_ms=50)
+    stub.configure(huggingface={'latency_ms': 50})
+
+    started = time.perf_counter()
+    assert bot.get_response('Can I charge to 100%?') == DEFAULT_ANSWER
+    assert ''.join(bot.stream_response('And in winter?')) == DEFAULT_ANSWER
+    assert time.perf_counter() - started < 0.9
+    assert bot.provider_stats.hedges == 2
+
+    # A fast primary answers before the hedge fires
+    openai.delay = 0
+    assert bot.get_response('What about LFP batteries?') == 'openai answer'
+    assert bot.provider_stats.hedges == 2
+
+
+def test_failover_answers_are_cached_under_the_backup_provider(monkeypatch, stub):
+    openai = SlowOpenAI(error=ConnectionError('refused'))
+    bot = _bot(monkeypatch, stub, openai_client=openai)
+    bot.response_cache = cache = ResponseCache(maxsize=8)
+
+    for answer in (bot.get_response('Best charging routine?'), ''.join(bot.stream_response('And in winter?'))):
+        assert answer == DEFAULT_ANSWER
+    for question in ('Best charging routine?', 'And in winter?'):
+        messages = bot._build_messages(question)
+        assert cache.get(cache.key('openai', bot._openai_model, messages)) is None
+        assert cache.get(cache.key('huggingface', 'stub-model', messages)) == DEFAULT_ANSWER
+
+    # The primary is asked again rather than answering from the backup's entry
+    calls = openai.calls
+    bot.get_response('Best charging routine?')
+    assert openai.calls > calls
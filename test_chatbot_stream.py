@@ -0,0 +1,99 @@
+"""
+Tests for streamed and cached chatbot answers, using a fake provider client.
+"""
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from chatbot import EVBotChatbot
+
+
+class FakeOpenAI:
+    def __init__(self, pieces):
+        self.calls = []
+        self.responses = SimpleNamespace(create=self._create)
+        self._pieces = pieces
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if not kwargs.get('stream'):
+            return SimpleNamespace(output_text=''.join(self._pieces))
+        events = [SimpleNamespace(type='response.created')]
+        events += [SimpleNamespace(type='response.output_text.delta', delta=p) for p in self._pieces]
+        events.append(SimpleNamespace(type='response.completed'))
+        return iter(events)
+
+
+def _bot(client, provider='openai'):
+    bot = EVBotChatbot()
+    bot._provider = provider
+    bot._clients = {provider: client}
+    bot._openai_key = bot._hf_key = 'test'
+    bot._openai_model = bot._hf_model = 'test-model'
+    bot.knowledge = None  # always reach the provider
+    return bot
+
+
+def test_openai_stream_yields_text_deltas_and_records_ttft():
+    client = FakeOpenAI(['Charge ', 'to ', '80%.'])
+    bot = _bot(client)
+
+    assert list(bot.stream_response('How full should I charge?')) == ['Charge ', 'to ', '80%.']
+    assert client.calls[0]['stream'] is True
+    info = bot.stream_stats.info()
+    assert info['streams'] == 1
+    assert info['time_to_first_token']['p50_ms'] >= 0
+
+
+def test_hf_stream_skips_empty_chunks():
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))]),
+        SimpleNamespace(choices=[]),
+        SimpleNamespace(choices=[SimpleNamespace(delta={'content': 'Avoid heat.'})]),
+    ]
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: iter(chunks))))
+    bot = _bot(client, provider='huggingface')
+
+    assert list(bot.stream_response('tips?')) == ['Avoid heat.']
+
+
+def test_stream_endpoint_emits_sse_events(monkeypatch):
+    import app as app_module
+
+    bot = _bot(FakeOpenAI(['Hello', ' there']))
+    monkeypatch.setattr(app_module, 'get_chatbot', lambda: bot)
+    response = app_module.app.test_client().post('/api/chatbot/stream', json={'message': 'hi'})
+
+    assert response.mimetype == 'text/event-stream'
+    events = [block for block in response.get_data(as_text=True).split('\n\n') if block]
+    deltas = [json.loads(block[len('data: '):])['delta'] for block in events if block.startswith('data: ')]
+    assert deltas == ['Hello', ' there']
+    assert events[-1].startswith('event: done')
+
+
+def test_response_cache_serves_repeat_questions(tmp_path):
+    from chatbot import ResponseCache
+
+    for cache in (ResponseCache(maxsize=2), ResponseCache(maxsize=2, path=str(tmp_path / 'answers.db'))):
+        client = FakeOpenAI(['Keep it ', 'between 20 and 80%.'])
+        bot = _bot(client)
+        bot.response_cache = cache
+
+        first = ''.join(bot.stream_response('How often should I fast charge?'))
+        assert bot.get_response('  how often should I FAST charge ') == first
+        assert len(client.calls) == 1
+
+        # A different model-summary context must not share the entry
+        other = bot._build_messages('How often should I fast charge?')
+        other.insert(1, {'role': 'system', 'content': 'Model prediction: Class 2'})
+        assert cache.get(cache.key('openai', 'test-model', other)) is None
+
+        for question in ('a', 'b', 'c'):
+            bot.get_response(question)
+        info = cache.info()
+        assert info['size'] == 2
+        assert info['hits'] == 1 and info['evictions'] >= 2
+        assert info['hit_rate'] > 0 and info['latency_saved_seconds'] >= 0
@@ -0,0 +1,68 @@
+"""
+Tests for session history and token-budgeted context assembly.
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from chatbot import EVBotChatbot, ResponseCache
+from conversation import ConversationStore, estimate_tokens
+
+
+def _tokens(messages):
+    return sum(estimate_tokens(message['content']) for message in messages)
+
+
+def test_history_stays_within_budget_and_summarises_old_turns():
+    store = ConversationStore(token_budget=300, summary_budget=120)
+    sizes = []
+    for turn in range(200):
+        store.record('s1', f'Question {turn}: how should I charge in situation {turn}?',
+                     f'Answer {turn}. ' + 'Keep the battery cool and avoid deep discharge. ' * 5)
+        sizes.append(_tokens(store.history('s1')))
+
+    assert max(sizes) <= 300
+    assert max(sizes[50:]) - min(sizes[50:]) < 100
+    history = store.history('s1')
+    assert history[0]['role'] == 'system'
+    assert history[0]['content'].startswith('Earlier in this conversation:\nUser asked: Question')
+    assert history[-1]['content'].startswith('Answer 199')
+    assert store.info()['folded_turns'] > 150
+    assert store.history('other') == []
+
+
+def test_idle_and_excess_sessions_are_evicted():
+    store = ConversationStore(max_sessions=2)
+    for session_id in ('a', 'b'):
+        store.record(session_id, 'q', 'a')
+    store.history('a')  # touch: 'b' is now least recently used
+    store.record('c', 'q', 'a')
+    assert store.history('b') == [] and store.history('a') and store.history('c')
+
+    store.idle_ttl = -1
+    assert store.history('a') == []
+    assert store.info()['sessions'] == 0
+
+
+def test_chatbot_sends_session_history():
+    sent = []
+
+    def create(**kwargs):
+        sent.append(kwargs['input'])
+        return SimpleNamespace(output_text=f'answer {len(sent)}')
+
+    bot = EVBotChatbot()
+    bot._provider, bot._clients, bot._openai_key = 'openai', {'openai': SimpleNamespace(
+        responses=SimpleNamespace(create=create))}, 'test'
+    bot.response_cache = ResponseCache(maxsize=0)
+    bot.knowledge = None
+    bot.conversations = ConversationStore()
+
+    bot.get_response('What is a good charge limit?', session_id='tab-1')
+    bot.get_response('And for road trips?', session_id='tab-1')
+    bot.get_response('And for road trips?')
+
+    assert [m['content'] for m in sent[1][1:]] == ['What is a good charge limit?', 'answer 1', 'And for road trips?']
+    assert len(sent[2]) == 2
@@ -0,0 +1,131 @@
+"""
+Tests for the dashboard aggregate cube.
+"""
+import gzip
+import itertools
+import json
+import os
+import struct
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+import numpy as np
+import pandas as pd
+
+import app as app_module
+import dashboard
+from dashboard import (
+    ALL,
+    CLIENT_COLUMNS,
+    FILTER_COLUMNS,
+    AggregateCube,
+    encode_dataset_blob,
+    get_dashboard_payload,
+    payload_cache,
+)
+from dataset import DATA_PATH, compact_frame
+
+
+def test_cube_matches_direct_filtering():
+    df = pd.read_csv(DATA_PATH)
+    cube = AggregateCube.from_frame(df)
+    choices = [[ALL] + sorted(df[column].unique().tolist()) + ['Unknown'] for column in FILTER_COLUMNS]
+
+    for ev_model, battery_type, charging_mode in itertools.product(*choices):
+        filtered = df
+        for column, value in zip(FILTER_COLUMNS, (ev_model, battery_type, charging_mode)):
+            if value != ALL:
+                filtered = filtered[filtered[column] == value]
+
+        stats = cube.stats(ev_model, battery_type, charging_mode)
+        assert stats['total_samples'] == len(filtered)
+        if len(filtered):
+            assert stats['avg_efficiency'] == round(filtered['Efficiency (%)'].mean(), 2)
+            assert stats['avg_voltage'] == round(filtered['Voltage (V)'].mean(), 2)
+        for class_id in (0, 1, 2):
+            expected = int((filtered['Optimal Charging Duration Class'] == class_id).sum())
+            assert stats[f'class_{class_id}'] == expected
+
+
+def test_payload_is_cached_and_single_encoded():
+    body, etag = get_dashboard_payload('all', 'all', 'Fast')
+    hits = payload_cache.hits
+    again, same_etag = get_dashboard_payload('all', 'all', 'Fast')
+
+    assert again is body and same_etag == etag
+    assert payload_cache.hits == hits + 1
+    payload = json.loads(body)
+    assert isinstance(payload['fig1'], dict) and 'data' in payload['fig1']
+    assert payload['has_data'] is True
+
+
+def test_level_of_detail_bounds_point_charts(monkeypatch):
+    df = compact_frame(pd.read_csv(DATA_PATH))
+    monkeypatch.setattr(dashboard, 'LOD_THRESHOLD', 100)
+    monkeypatch.setattr(dashboard, 'LOD_SAMPLE_SIZE', 200)
+
+    binned = dashboard.build_figures(df, 'bins')
+    assert [trace.name for trace in binned['fig1'].data] == ['Class 0', 'Class 1', 'Class 2']
+    assert sum(trace.customdata.sum() for trace in binned['fig4'].data) == len(df)
+
+    sampled = dashboard.stratified_sample(df, 200, ['SOC (%)', 'Voltage (V)'])
+    assert len(sampled) <= 200
+    assert sampled['SOC (%)'].max() == df['SOC (%)'].max()
+
+
+def test_dataset_blob_round_trips():
+    df = compact_frame(pd.read_csv(DATA_PATH))
+    blob = encode_dataset_blob(df, version=3)
+    assert blob[:4] == b'EVB1'
+    header_length = struct.unpack('<I', blob[4:8])[0]
+    header = json.loads(blob[8:8 + header_length])
+    start = 8 + header_length
+    assert start % 4 == 0 and header['rows'] == len(df) and header['version'] == 3
+
+    for column, (key, name) in zip(header['columns'], CLIENT_COLUMNS):
+        assert column['key'] == key and column['offset'] % 4 == 0
+        values = np.frombuffer(blob, dtype=np.dtype(column['dtype']).newbyteorder('<'),
+                               count=len(df), offset=start + column['offset'])
+        if column['categories'] is not None:
+            assert column['categories'] == list(df[name].cat.categories)
+            assert (values == df[name].cat.codes.to_numpy()).all()
+        else:
+            assert np.allclose(values, df[name].to_numpy(dtype=np.float64), rtol=1e-6)
+
+
+def test_dataset_route_is_gzipped_and_revalidates():
+    client = app_module.app.test_client()
+    assert b'const lod = ' in client.get('/dashboard').data
+    response = client.get('/api/dashboard/dataset', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data)[:4] == b'EVB1'
+    again = client.get('/api/dashboard/dataset', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_embedded_chart_json_cannot_close_the_script(monkeypatch):
+    body = json.dumps({'fig1': {'data': [{'name': '</script><script>alert(1)</script> & more'}]}})
+    monkeypatch.setattr(app_module, 'get_dashboard_payload', lambda *args: (body.encode('utf-8'), 'etag'))
+    page = app_module.app.test_client().get('/dashboard').get_data(as_text=True)
+
+    assert '<script>alert(1)' not in page
+    embedded = page.split('const graphs = ', 1)[1].split(';\n', 1)[0]
+    assert json.loads(embedded) == json.loads(body)
+
+
+def test_binned_scatter_skips_non_finite_values():
+    df = pd.read_csv(DATA_PATH)
+    df.loc[df.index[:3], 'SOC (%)'] = [np.nan, np.inf, -np.inf]
+    figure = dashboard.binned_scatter(df, 'SOC (%)', 'Voltage (V)', 'SOC vs Voltage')
+    assert sum(trace.customdata.sum() for trace in figure.data) == len(df) - 3
+
+
+def test_unknown_lod_mode_is_rejected_at_import():
+    env = dict(os.environ, DASHBOARD_LOD_MODE='points')
+    result = subprocess.run([sys.executable, '-c', 'import dashboard'], cwd=os.path.join(ROOT, 'app'),
+                            env=env, capture_output=True, text=True)
+    assert result.returncode != 0 and 'DASHBOARD_LOD_MODE must be one of bins, sample' in result.stderr
@@ -0,0 +1,99 @@
+"""
+Tests for the shared dataset cache.
+"""
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from dataset import DATA_PATH, ColumnarStore, DatasetCache
+
+
+def test_cache_reloads_only_when_file_changes(tmp_path):
+    path = tmp_path / 'data.csv'
+    shutil.copy(DATA_PATH, path)
+    cache = DatasetCache(str(path))
+
+    first = cache.get()
+    assert cache.get() is first
+    assert cache.reload_count == 1
+    assert str(first['EV Model'].dtype) == 'category'
+    assert first['SOC (%)'].dtype.itemsize == 4
+
+    with open(path, 'a', encoding='utf-8') as handle:
+        handle.write(open(DATA_PATH, encoding='utf-8').read().splitlines()[1] + '\n')
+
+    # Appended rows are parsed on their own rather than reloading the file
+    second = cache.get()
+    assert second is not first
+    assert len(second) == len(first) + 1
+    assert cache.reload_count == 1 and cache.tail_reads == 1
+    assert cache.info()['version'] == 2
+    assert str(second['EV Model'].dtype) == 'category'
+
+    # Any other change reloads it
+    shutil.copy(DATA_PATH, path)
+    assert len(cache.get()) == len(first)
+    assert cache.reload_count == 2
+
+
+def _store(tmp_path):
+    path = tmp_path / 'data.csv'
+    shutil.copy(DATA_PATH, path)
+    return path, ColumnarStore(str(path))
+
+
+def test_columnar_store_matches_csv_and_label_encoder(tmp_path):
+    _, store = _store(tmp_path)
+    frame = store.load()
+    assert store.last_action == 'rebuilt'
+    # Columns are read-only views of the mapped files, not copies
+    assert not frame['SOC (%)'].to_numpy().flags.writeable
+
+    expected = pd.read_csv(DATA_PATH)
+    arrays = store.arrays()
+    for column in expected.columns:
+        if expected[column].dtype == object:
+            codes = LabelEncoder().fit_transform(expected[column])
+            assert (np.asarray(arrays[column]) == codes).all()
+            assert (frame[column].astype(str) == expected[column]).all()
+        else:
+            assert np.array_equal(frame[column], expected[column].astype(frame[column].dtype))
+
+
+def test_columnar_store_appends_only_complete_rows(tmp_path):
+    path, store = _store(tmp_path)
+    rows = len(store.load())
+
+    # A half-written row is left for the next sync
+    line = open(DATA_PATH, encoding='utf-8').read().splitlines()[1]
+    with open(path, 'a', encoding='utf-8') as handle:
+        handle.write(line[:20])
+    assert store.sync()['rows'] == rows
+    with open(path, 'a', encoding='utf-8') as handle:
+        handle.write(line[20:] + '\n')
+    assert store.sync()['rows'] == rows + 1 and store.last_action == 'appended'
+    assert ColumnarStore(str(path)).load().equals(store.load())
+
+
+def test_last_row_without_a_newline_is_kept(tmp_path):
+    path = tmp_path / 'data.csv'
+    lines = open(DATA_PATH, encoding='utf-8').read().splitlines()
+    path.write_text('\n'.join(lines[:1001]), encoding='utf-8')
+    cache = DatasetCache(str(path))
+    assert len(cache.get()) == len(pd.read_csv(path)) == 1000
+    assert cache.store.last_action == 'rebuilt'
+
+    # Appending ends the provisional row first, and it is read again
+    version = cache.append(pd.read_csv(DATA_PATH).tail(2))
+    expected = pd.read_csv(path)
+    frame, current = cache.snapshot()
+    assert current == version and len(frame) == len(expected) == 1002
+    assert cache.store.last_action == 'appended'
+    assert (frame['SOC (%)'].to_numpy() == expected['SOC (%)'].to_numpy(dtype=np.float32)).all()
+    assert ColumnarStore(str(path)).load().equals(cache.store.load())
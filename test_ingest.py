@@ -0,0 +1,112 @@
+"""
+Tests for session ingestion and the incremental dataset/cube updates.
+"""
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import pandas as pd
+import pytest
+
+import app as app_module
+import dashboard
+import ingest
+from dashboard import AggregateCube, get_cube
+from dataset import DATA_PATH, DatasetCache
+
+AUTH = {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def data_copy(tmp_path, monkeypatch, model_artifacts):
+    monkeypatch.setenv('EVBOT_INGEST_TOKEN', 'secret')
+    path = tmp_path / 'data.csv'
+    shutil.copy(DATA_PATH, path)
+    cache = DatasetCache(str(path))
+    monkeypatch.setattr(dashboard, 'dataset_cache', cache)
+    monkeypatch.setattr(ingest, 'dataset_cache', cache)
+    monkeypatch.setattr(dashboard, '_cube', None)
+    return path, cache
+
+
+def _session(**overrides):
+    row = pd.read_csv(DATA_PATH, nrows=1).iloc[0].to_dict()
+    row.update(overrides)
+    return row
+
+
+def test_ingest_updates_cube_incrementally(data_copy):
+    path, cache = data_copy
+    before = get_cube().stats()
+    client = app_module.app.test_client()
+
+    response = client.post('/api/sessions', json=_session(**{'Efficiency (%)': 50.0}), headers=AUTH)
+    assert response.status_code == 201 and response.get_json()['accepted'] == 1
+
+    rows = [
+        _session(),
+        {**_session(), 'Optimal Charging Duration Class': 7},
+        {key: value for key, value in _session().items() if key != 'SOC (%)'},
+    ]
+    result = client.post('/api/sessions', json={'rows': rows}, headers=AUTH).get_json()
+    assert result['accepted'] == 1 and result['rejected'] == 2
+    assert [error['row'] for error in result['errors']] == [1, 2]
+    assert 'class_id' in result['errors'][0]['error'] and 'soc' in result['errors'][1]['error']
+
+    cube = get_cube()
+    assert cache.reload_count == 1 and cache.appended_rows == 2
+    assert cube.stats()['total_samples'] == before['total_samples'] + 2
+
+    # A new category extends the store's dictionary in place
+    client.post('/api/sessions?new_categories=1', json=_session(**{'EV Model': 'Model Z', 'Efficiency (%)': 50.0}),
+                headers=AUTH)
+    cube = get_cube()
+    assert cache.reload_count == 1 and cache.appended_rows == 3
+    assert cache.store.last_action == 'appended'
+    assert cube.stats('Model Z')['avg_efficiency'] == 50.0
+
+    # Same totals as rebuilding from the file
+    rebuilt = AggregateCube.from_frame(pd.read_csv(path))
+    assert cube.stats() == rebuilt.stats()
+    assert cube.stats('Model Z') == rebuilt.stats('Model Z')
+
+
+def test_other_writers_are_picked_up_from_the_tail(data_copy):
+    path, cache = data_copy
+    rows = len(cache.get())
+    other = DatasetCache(str(path))
+    other.append(pd.DataFrame([_session(), _session()]))
+
+    assert len(cache.get()) == rows + 2
+    assert cache.tail_reads == 1 and cache.reload_count == 1
+    assert cache.changes_since(cache.version - 1)[1] == cache.version
+    pd.testing.assert_frame_equal(cache.get(), DatasetCache(str(path)).get())
+
+
+def test_ingest_requires_a_token_unless_disabled(data_copy, monkeypatch):
+    client = app_module.app.test_client()
+    assert client.post('/api/sessions', json=_session()).status_code == 401
+    assert client.post('/api/sessions', json=_session(), headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+    monkeypatch.delenv('EVBOT_INGEST_TOKEN')
+    assert client.post('/api/sessions', json=_session()).status_code == 403
+    monkeypatch.setenv('EVBOT_INGEST_AUTH', 'off')
+    assert client.post('/api/sessions', json=_session()).status_code == 201
+    # New categories still need an authenticated request
+    assert client.post('/api/sessions?new_categories=1', json=_session()).status_code == 403
+
+
+def test_ingest_rejects_unknown_and_unsafe_categories(data_copy):
+    path, _ = data_copy
+    client = app_module.app.test_client()
+    script = '</script><script>alert(1)</script>'
+
+    unknown = client.post('/api/sessions', json=_session(**{'EV Model': 'Model Z'}), headers=AUTH)
+    assert unknown.status_code == 400 and 'ev_model' in unknown.get_json()['errors'][0]['error']
+    unsafe = client.post('/api/sessions?new_categories=1', json=_session(**{'EV Model': script}), headers=AUTH)
+    assert unsafe.status_code == 400 and 'ev_model' in unsafe.get_json()['errors'][0]['error']
+
+    assert 'Model Z' not in path.read_text() and script not in path.read_text()
+    assert '<script>alert(1)' not in client.get('/dashboard').get_data(as_text=True)
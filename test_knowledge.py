@@ -0,0 +1,61 @@
+"""
+Tests for the offline knowledge-base answer tier.
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from chatbot import EVBotChatbot, ResponseCache
+from knowledge import KnowledgeBase
+from ml_model import FEATURE_SPECS
+
+
+def test_faq_questions_match_their_entries():
+    kb = KnowledgeBase.load()
+    expected = {
+        'How often should I fast charge?': 'how-often-fast',
+        'Should I charge my car to 100%?': 'soc-window',
+        'Is it bad to charge in the cold?': 'temperature',
+        'LiFePO4 vs Li-ion, which lasts longer?': 'lfp-vs-liion',
+        'What is the difference between fast and normal charging': 'fast-vs-normal',
+    }
+    for question, entry_id in expected.items():
+        match = kb.match(question)
+        assert match.entry_id == entry_id and match.confidence >= 0.6, question
+
+    for off_topic in ("What's the weather in Paris tomorrow?", 'How do I fix my brakes?', 'and for road trips?'):
+        match = kb.match(off_topic)
+        assert match is None or match.confidence < 0.6, off_topic
+
+
+def test_local_tier_answers_without_calling_the_provider(model_artifacts):
+    calls = []
+    bot = EVBotChatbot()
+    bot._provider, bot._openai_key = 'openai', 'test'
+    bot._clients = {'openai': SimpleNamespace(responses=SimpleNamespace(
+        create=lambda **kw: calls.append(kw) or SimpleNamespace(output_text='from the provider')))}
+    bot.response_cache = ResponseCache(maxsize=0)
+
+    started = time.perf_counter()
+    answer = bot.get_response('How often should I fast charge?')
+    assert time.perf_counter() - started < 0.05
+    assert 'fast charging' in answer.lower() and not calls
+
+    assert bot.get_response('Can I charge my EV with solar panels at home?') == 'from the provider'
+    assert len(calls) == 1
+
+    row = model_artifacts['frame'].iloc[0]
+    payload = {key: row[column] for key, column, _ in FEATURE_SPECS}
+    answer = ''.join(bot.stream_response('What does my prediction mean?', payload=payload))
+    assert answer.startswith('EV model prediction:') and len(calls) == 1
+    assert bot.local_info()['answered'] == 2
+
+
+def test_local_tier_works_without_an_api_key():
+    bot = EVBotChatbot()
+    bot._provider = None  # no API key configured
+    assert 'LiFePO4' in bot.get_response('Is LFP better than lithium ion?')
+    assert bot.get_response('Tell me a joke about cats').startswith('The chatbot is not configured yet')
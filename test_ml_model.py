@@ -0,0 +1,329 @@
+"""
+Tests for the shared prediction helpers.
+"""
+import itertools
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+import ml_model
+from chatbot import EVBotChatbot
+from ml_model import (
+    FEATURE_SPECS,
+    BatcherOverloaded,
+    ForestEngine,
+    MicroBatcher,
+    PredictionCache,
+    build_feature_frame,
+    encode_batch,
+    encode_categorical_features,
+    explain_prediction,
+    export_forest,
+    get_assets,
+    get_engine,
+    normalize_batch,
+    predict_batch,
+    predict_from_payload,
+    prediction_cache,
+    what_if_sweep,
+)
+
+
+def _payloads(frame, count):
+    return [
+        {form_key: row[column] for form_key, column, _ in FEATURE_SPECS}
+        for row in frame.head(count).to_dict('records')
+    ]
+
+
+def test_batch_matches_single_row_predictions(model_artifacts):
+    payloads = _payloads(model_artifacts['frame'], 50)
+    results = predict_batch(payloads)
+
+    assert [r['row'] for r in results] == list(range(50))
+    assert [r['class_id'] for r in results] == [predict_from_payload(p)['class_id'] for p in payloads]
+
+
+def test_batch_reports_per_row_errors(model_artifacts):
+    good, *_ = _payloads(model_artifacts['frame'], 1)
+    rows = [
+        good,
+        dict(good, soc='abc'),
+        dict(good, mode='Turbo'),
+        dict(good, voltage=''),
+        {key: str(value) for key, value in good.items()},
+    ]
+    results = predict_batch(rows)
+
+    assert 'class_id' in results[0] and 'class_id' in results[4]
+    assert results[1]['error'] == 'Invalid values provided for: soc'
+    assert results[2]['error'] == 'Invalid values provided for: mode'
+    assert results[3]['error'] == 'Missing required fields for prediction: voltage'
+
+
+@pytest.mark.parametrize('cycles', ['3', ' 4 ', '+5', '3.0', '3.5', '1e2', 'abc', 3.0, 3.7])
+def test_batch_and_single_paths_agree_on_integer_fields(model_artifacts, cycles):
+    good, *_ = _payloads(model_artifacts['frame'], 1)
+    payload = dict(good, cycles=cycles)
+    batch, = predict_batch([payload])
+    try:
+        single = predict_from_payload(payload)
+    except ValueError as exc:
+        assert batch['error'] == str(exc)
+    else:
+        assert batch['class_id'] == single['class_id'] and 'error' not in batch
+
+
+def test_fast_path_matches_dataframe_path(model_artifacts):
+    model, _ = get_assets()
+    for payload in _payloads(model_artifacts['frame'], 200):
+        expected = int(model.predict(encode_categorical_features(build_feature_frame(payload)))[0])
+        assert predict_from_payload(payload)['class_id'] == expected
+
+
+def test_fast_path_rejects_unknown_categories(model_artifacts):
+    good, *_ = _payloads(model_artifacts['frame'], 1)
+    with pytest.raises(ValueError):
+        predict_from_payload(dict(good, ev_model='Model Z'))
+
+
+@pytest.mark.parametrize('key', ['soc', 'cycles'])
+@pytest.mark.parametrize('value', ['inf', '-inf', 'nan', float('inf'), float('nan')])
+def test_fast_path_rejects_non_finite_values(model_artifacts, key, value):
+    good, *_ = _payloads(model_artifacts['frame'], 1)
+    payload = dict(good, **{key: value})
+    for predict in (predict_from_payload, build_feature_frame):
+        with pytest.raises(ValueError, match=f'Invalid values provided for: {key}'):
+            predict(payload)
+
+
+def test_forest_engine_is_bit_identical(model_artifacts, tmp_path):
+    model = joblib.load(model_artifacts['model_path'])
+    export_forest(model, str(tmp_path / 'forest'), model_artifacts['model_path'])
+    engine, meta = ForestEngine.load(str(tmp_path / 'forest'))
+
+    frame = model_artifacts['frame'].drop(columns=['Optimal Charging Duration Class'])
+    for column, encoder in joblib.load(model_artifacts['encoders_path']).items():
+        frame[column] = encoder.transform(frame[column])
+    rng = np.random.default_rng(0)
+    rows = np.vstack([frame.to_numpy(float), frame.to_numpy(float) * rng.normal(1, 0.1, frame.shape)])
+    # Inputs sitting exactly on split thresholds
+    tree = model.estimators_[0].tree_
+    for feature, threshold in zip(tree.feature, tree.threshold):
+        if feature >= 0:
+            row = rows[0].copy()
+            row[feature] = threshold
+            rows = np.vstack([rows, row])
+
+    assert meta['n_trees'] == len(model.estimators_)
+    expected = model.predict_proba(pd.DataFrame(rows, columns=frame.columns))
+    assert np.array_equal(engine.predict_proba(rows), expected)
+    assert np.array_equal(engine.predict_proba(rows[:5]), expected[:5])
+
+
+def test_non_finite_inputs_are_rejected_not_routed(model_artifacts):
+    payloads = _payloads(model_artifacts['frame'], 3)
+    rows = [dict(payloads[0], soc=value) for value in ('inf', float('-inf'), 'nan')] + payloads[1:]
+    results = predict_batch(rows)
+    assert [result.get('error') for result in results[:3]] == ['Invalid values provided for: soc'] * 3
+    assert [result['class_id'] for result in results[3:]] == \
+        [result['class_id'] for result in predict_batch(payloads[1:])]
+
+    engine = get_engine()
+    features, _ = normalize_batch(model_artifacts['frame'].head(1))
+    encoded = encode_batch(features).to_numpy(dtype=np.float64)
+    for column in range(encoded.shape[1]):
+        for value in (np.nan, np.inf, -np.inf):
+            row = encoded.copy()
+            row[0, column] = value
+            with pytest.raises(ValueError):
+                engine.predict_proba(row)
+
+
+def test_export_maps_the_traversal_tables(model_artifacts, tmp_path):
+    model = joblib.load(model_artifacts['model_path'])
+    built = ml_model.export_forest(model, str(tmp_path / 'forest'), model_artifacts['model_path'])
+    engine, _ = ml_model.ForestEngine.load(str(tmp_path / 'forest'))
+
+    for name in ml_model.TRAVERSAL_TABLES:
+        assert isinstance(engine.tables[name].base, np.memmap)
+        assert np.array_equal(engine.tables[name], built.tables[name])
+
+
+def test_large_batches_use_the_sklearn_forest(model_artifacts, monkeypatch):
+    payloads = _payloads(model_artifacts['frame'], 40)
+    small = predict_batch(payloads)
+    assert isinstance(ml_model.batch_engine(39), ml_model.ForestEngine)
+
+    monkeypatch.setattr(ml_model, 'SKLEARN_BATCH_ROWS', 40)
+    assert isinstance(ml_model.batch_engine(40), ml_model._SklearnEngine)
+    assert predict_batch(payloads) == small
+
+
+def test_prediction_cache_hits_quantizes_and_invalidates(model_artifacts):
+    good, *_ = _payloads(model_artifacts['frame'], 1)
+    first = predict_from_payload(good)
+    hits = prediction_cache.hits
+    again = predict_from_payload(dict(good))
+    assert again['class_id'] == first['class_id']
+    assert prediction_cache.hits == hits + 1
+
+    stat = os.stat(model_artifacts['model_path'])
+    os.utime(model_artifacts['model_path'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    invalidations = prediction_cache.invalidations
+    predict_from_payload(good)
+    assert prediction_cache.invalidations == invalidations + 1
+
+    cache = PredictionCache(maxsize=2, ttl=60, quantize={'soc': 0.5})
+    base = {column: 1.0 for _, column, _ in FEATURE_SPECS}
+    assert cache.key(dict(base, **{'SOC (%)': 40.1})) == cache.key(dict(base, **{'SOC (%)': 39.9}))
+    for value in range(3):
+        cache.put((value,), value)
+    assert cache.get((0,)) is None and cache.get((2,)) == 2
+    assert cache.evictions == 1
+
+    expired = PredictionCache(ttl=-1)
+    expired.put(('stale',), 1)
+    assert expired.get(('stale',)) is None
+
+
+@pytest.mark.parametrize('spec', ['mode=1', 'speed=1', 'soc=0', 'soc=-1', 'soc=abc', 'soc=inf', 'soc'])
+def test_cache_quantize_setting_is_validated(spec):
+    with pytest.raises(ValueError, match='PREDICTION_CACHE_QUANTIZE'):
+        ml_model._parse_quantize(spec)
+
+
+def test_cache_quantize_setting_parses_numeric_steps():
+    assert ml_model._parse_quantize(' soc = 0.5, cycles=2 ,') == {'soc': 0.5, 'cycles': 2.0}
+
+
+def test_micro_batcher_groups_concurrent_requests(model_artifacts):
+    payloads = [dict(p, soc=p['soc'] + 1e-9) for p in _payloads(model_artifacts['frame'], 64)]
+    # Scored straight through the engine, before the batcher fills the prediction cache
+    expected = [result['class_id'] for result in predict_batch(payloads)]
+    prediction_cache.clear()
+    batcher = MicroBatcher(window=0.02, max_rows=16)
+    results = [None] * len(payloads)
+
+    def worker(index):
+        results[index] = batcher.submit(payloads[index])['class_id']
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(payloads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == expected
+    assert batcher.rows == len(payloads)
+    assert batcher.batches < len(payloads)
+
+    stalled = MicroBatcher(max_queue=1, max_wait=0.01)
+    stalled._ensure_worker = lambda: None  # no consumer, so the queue fills up
+    with pytest.raises(TimeoutError):
+        stalled.submit(dict(payloads[0], soc=1.2345))
+    with pytest.raises(BatcherOverloaded):
+        stalled.submit(dict(payloads[0], soc=1.2346))
+
+
+def test_what_if_sweep_matches_pointwise_predictions(model_artifacts):
+    ranges = {
+        'mode': 'all',
+        'duration': {'min': 20, 'max': 120, 'steps': 11},
+        'battery_temp': [20, 30.5, 40],
+    }
+    for payload in _payloads(model_artifacts['frame'], 3):
+        sweep = what_if_sweep(payload, ranges)
+        values = [axis['values'] for axis in sweep['axes']]
+        assert all(payload[axis['key']] in axis['values'] for axis in sweep['axes'])
+        grid = [dict(payload, **dict(zip(ranges, setting))) for setting in itertools.product(*values)]
+        assert sweep['classes'] == [result['class_id'] for result in predict_batch(grid)]
+        assert sweep['base']['class_id'] == predict_from_payload(payload)['class_id']
+        for recommendation in sweep['recommendations']:
+            assert recommendation['class_id'] != sweep['base']['class_id']
+            assert predict_from_payload(dict(payload, **recommendation['changes']))['class_id'] == \
+                recommendation['class_id']
+
+
+@pytest.mark.parametrize('ranges', [
+    {}, {'speed': [1]}, {'mode': ['Turbo']}, {'duration': {'min': 1}}, {'soc': ['abc']},
+])
+def test_what_if_sweep_rejects_bad_ranges(model_artifacts, ranges):
+    payload, *_ = _payloads(model_artifacts['frame'], 1)
+    with pytest.raises(ValueError):
+        what_if_sweep(payload, ranges)
+
+
+def test_what_if_sweep_caps_the_grid(model_artifacts):
+    payload, *_ = _payloads(model_artifacts['frame'], 1)
+    with pytest.raises(ValueError):
+        what_if_sweep(payload, {'duration': {'min': 0, 'max': 1, 'steps': 100}}, max_points=50)
+
+
+def test_sweep_route_limits_recommendations(model_artifacts):
+    payload, *_ = _payloads(model_artifacts['frame'], 1)
+    client = app_module.app.test_client()
+    ranges = {'mode': 'all', 'duration': {'min': 20, 'max': 120, 'steps': 11}}
+    response = client.post('/api/predict/sweep', json={'payload': payload, 'ranges': ranges, 'top': 2})
+    assert response.status_code == 200 and len(response.get_json()['recommendations']) <= 2
+    assert client.post('/api/predict/sweep', json={'payload': payload, 'ranges': {}}).status_code == 400
+
+
+def test_chatbot_context_lists_what_if_changes(model_artifacts):
+    payloads = _payloads(model_artifacts['frame'], 20)
+    payload = next(p for p in payloads if predict_from_payload(p)['class_id'] > 0)
+    bot = EVBotChatbot()
+    lines = bot._what_if_lines(payload)
+    assert lines and all(line.startswith('- What-if: ') for line in lines)
+    assert lines[0] in bot._format_model_summary(payload)
+
+
+def test_contributions_decompose_the_forest_probabilities(model_artifacts):
+    engine = get_engine()
+    features, _ = normalize_batch(model_artifacts['frame'].head(300))
+    encoded = encode_batch(features).to_numpy(dtype=np.float64)
+    bias, contributions = engine.contributions(encoded)
+    assert contributions.shape == (300, len(FEATURE_SPECS), len(engine.classes_))
+    assert np.allclose(bias + contributions.sum(axis=1), engine.predict_proba(encoded), rtol=0, atol=1e-12)
+
+
+def test_explained_batches_match_single_explanations(model_artifacts):
+    payloads = _payloads(model_artifacts['frame'], 20)
+    batch = predict_batch(payloads + [dict(payloads[0], soc='abc')], explain=True)
+    assert 'contributions' not in batch[-1]
+
+    features, _ = normalize_batch(model_artifacts['frame'].head(20))
+    probabilities = get_engine().predict_proba(encode_batch(features).to_numpy(dtype=np.float64)).max(axis=1)
+    for payload, result, probability in zip(payloads, batch, probabilities):
+        single = explain_prediction(payload, top=len(FEATURE_SPECS))
+        assert result['contributions'] == single['contributions'][:len(result['contributions'])]
+        scores = [factor['contribution'] for factor in single['contributions']]
+        assert [abs(score) for score in scores] == sorted(map(abs, scores), reverse=True)
+        assert abs(single['bias'] + sum(scores) - probability) < 1e-3
+
+
+def test_chatbot_context_lists_main_factors(model_artifacts):
+    payload, *_ = _payloads(model_artifacts['frame'], 1)
+    top = explain_prediction(payload)['contributions'][0]['column']
+    assert '- Main factors: ' + top in EVBotChatbot()._format_model_summary(payload)
+
+
+def test_predict_page_shows_factors_only_for_forests(model_artifacts, monkeypatch):
+    payload, *_ = _payloads(model_artifacts['frame'], 1)
+    form = {key: str(value) for key, value in payload.items()}
+    client = app_module.app.test_client()
+    assert b'class="factors"' in client.post('/predict', data=form).data
+
+    model = joblib.load(model_artifacts['model_path'])
+    monkeypatch.setattr(ml_model, 'get_engine', lambda: ml_model._SklearnEngine(model))
+    page = client.post('/predict', data=form).data
+    assert b'class="result"' in page and b'Error' not in page
+    assert b'class="factors"' not in page
@@ -0,0 +1,46 @@
+"""
+Tests for per-stage timing, the /metrics endpoint and Server-Timing headers.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import timing
+
+
+def test_stage_histograms_and_server_timing():
+    from app import app
+    from dashboard import payload_cache
+
+    timing.reset()
+    payload_cache.clear()
+    client = app.test_client()
+    response = client.get('/api/dashboard/data?charging_mode=Fast')
+
+    stages = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+    assert {'filter', 'figures', 'json_encode', 'total'} <= set(stages)
+    assert stages[-1] == 'total'
+
+    metrics = client.get('/metrics')
+    assert metrics.mimetype == 'text/plain'
+    lines = metrics.data.decode().splitlines()
+    assert '# TYPE evbot_stage_duration_seconds histogram' in lines
+    assert 'evbot_stage_duration_seconds_count{stage="figures"} 1' in lines
+    assert 'evbot_stage_duration_seconds_bucket{stage="figures",le="+Inf"} 1' in lines
+    assert any(line.startswith('evbot_request_duration_seconds_count{endpoint="get_dashboard_data",method="GET"}')
+               for line in lines)
+
+
+def test_disabled_hooks_record_nothing():
+    from app import app
+
+    timing.reset()
+    timing.set_enabled(False)
+    try:
+        assert timing.stage('figures') is timing.stage('json_encode')
+        response = app.test_client().get('/api/dashboard/data')
+        assert 'Server-Timing' not in response.headers
+        assert 'evbot_stage_duration_seconds_count' not in timing.render_metrics()
+    finally:
+        timing.set_enabled(True)
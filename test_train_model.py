@@ -0,0 +1,132 @@
+"""
+Tests for the training CLI: columnar data loading, versioned artifacts,
+incremental retraining and latency-aware model selection.
+"""
+import json
+import os
+
+import joblib
+import pandas as pd
+import pytest
+
+import app as app_module
+import ml_model
+import train_model
+from chatbot import EVBotChatbot
+
+
+def _run(tmp_path, *extra):
+    return train_model.main(['--data', str(tmp_path / 'data.csv'), '--models-dir', str(tmp_path / 'models'),
+                             '--n-estimators', '10', '--jobs', '1', *extra])
+
+
+def test_full_then_incremental_training(tmp_path):
+    frame = pd.read_csv(train_model.DATA_PATH)
+    frame.head(600).to_csv(tmp_path / 'data.csv', index=False)
+
+    first = _run(tmp_path)
+    models = tmp_path / 'models'
+    assert first['mode'] == 'full' and first['params']['n_estimators'] == 10
+    assert (models / 'versions' / first['version'] / 'manifest.json').exists()
+    assert json.loads((models / 'manifest.json').read_text())['version'] == first['version']
+    assert (models / 'ev_model_forest' / 'meta.json').exists()
+
+    # Unchanged data: incremental is a no-op
+    assert _run(tmp_path, '--incremental') is None
+
+    # Append rows: the columnar store is extended and trees are added, not refit
+    frame.iloc[600:800].to_csv(tmp_path / 'data.csv', mode='a', header=False, index=False)
+    second = _run(tmp_path, '--incremental', '--add-trees', '5')
+    assert second['mode'] == 'incremental' and second['parent'] == first['version']
+    assert second['data']['raw_rows'] == 800
+    model = joblib.load(models / 'ev_model.pkl')
+    assert len(model.estimators_) == 15 and not model.warm_start
+
+    extended, _, _ = train_model.load_features(str(tmp_path / 'data.csv'))
+    rebuilt, _, _ = train_model.load_features(str(tmp_path / 'data.csv'), use_cache=False)
+    pd.testing.assert_frame_equal(extended, rebuilt)
+
+
+def test_appended_categories_keep_the_label_encoding(tmp_path):
+    frame = pd.read_csv(train_model.DATA_PATH)
+    frame.head(300).to_csv(tmp_path / 'data.csv', index=False)
+    train_model.load_features(str(tmp_path / 'data.csv'))
+
+    # Sorts before every existing model, so the store appends it out of order
+    frame.iloc[300:310].assign(**{'EV Model': 'AAA Model'}).to_csv(
+        tmp_path / 'data.csv', mode='a', header=False, index=False)
+    extended, encoders, _ = train_model.load_features(str(tmp_path / 'data.csv'))
+    rebuilt, rebuilt_encoders, _ = train_model.load_features(str(tmp_path / 'data.csv'), use_cache=False)
+    pd.testing.assert_frame_equal(extended, rebuilt)
+    assert list(encoders['EV Model'].classes_) == list(rebuilt_encoders['EV Model'].classes_)
+    assert (extended['EV Model'].tail(10) == 0).all()
+
+
+def test_search_records_best_params(tmp_path):
+    pd.read_csv(train_model.DATA_PATH).head(400).to_csv(tmp_path / 'data.csv', index=False)
+    manifest = _run(tmp_path, '--search', '--n-iter', '2', '--cv', '2')
+    assert manifest['mode'] == 'search'
+    assert manifest['search']['candidates'] == 2
+    assert manifest['params']['n_estimators'] == manifest['search']['best_params']['n_estimators']
+
+
+def test_select_reports_pareto_front_and_respects_budget(tmp_path):
+    pd.read_csv(train_model.DATA_PATH).head(400).to_csv(tmp_path / 'data.csv', index=False)
+    candidates = '--candidates', 'rf-25x8,rf-50xfull,hgb-50'
+    manifest = _run(tmp_path, '--select', *candidates, '--single-rows', '50', '--batch-rows', '100')
+    selection = manifest['selection']
+    rows = {row['name']: row for row in selection['candidates']}
+    assert set(rows) == {'rf-25x8', 'rf-50xfull', 'hgb-50'}
+    assert manifest['mode'] == 'select' and selection['within_budget']
+    assert not rows['hgb-50']['promotable'] and manifest['estimator'] == 'RandomForestClassifier'
+    forests = [row for row in rows.values() if row['promotable']]
+    assert rows[selection['chosen']]['accuracy'] == max(row['accuracy'] for row in forests)
+    assert any(row['pareto'] for row in rows.values())
+    assert all(row['artifact_bytes'] > 0 and row['load_ms'] >= 0 for row in rows.values())
+
+    # A budget nothing meets falls back to the fastest forest
+    fastest = min(forests, key=lambda row: row['single_p99_ms'])
+    assert train_model.choose(list(rows.values()), latency_budget_ms=0) == (fastest, False)
+
+    # Gradient boosting alone is never promoted implicitly
+    with pytest.raises(SystemExit):
+        _run(tmp_path, '--select', '--candidates', 'hgb-50', '--single-rows', '20', '--batch-rows', '50')
+
+
+def test_boosted_model_is_served_end_to_end(tmp_path, monkeypatch):
+    frame = pd.read_csv(train_model.DATA_PATH)
+    frame.head(400).to_csv(tmp_path / 'data.csv', index=False)
+    manifest = _run(tmp_path, '--select', '--allow-boosting', '--candidates', 'hgb-50',
+                    '--single-rows', '20', '--batch-rows', '50')
+    models = tmp_path / 'models'
+    # Served through sklearn, so no forest export is kept
+    assert manifest['estimator'] == 'HistGradientBoostingClassifier'
+    assert not (models / 'ev_model_forest').exists()
+
+    monkeypatch.setattr(ml_model, 'MODEL_PATH', str(models / 'ev_model.pkl'))
+    monkeypatch.setattr(ml_model, 'ENCODERS_PATH', str(models / 'label_encoders.pkl'))
+    monkeypatch.setattr(ml_model, 'FOREST_PATH', str(models / 'ev_model_forest'))
+    ml_model.reset_assets()
+    ml_model.prediction_cache.clear()
+    try:
+        payloads = [{key: row[column] for key, column, _ in ml_model.FEATURE_SPECS}
+                    for row in frame.tail(5).to_dict('records')]
+        expected = joblib.load(models / 'ev_model.pkl').predict(
+            ml_model.encode_batch(ml_model.normalize_batch(pd.DataFrame(payloads))[0]))
+        client = app_module.app.test_client()
+
+        page = client.post('/predict', data={key: str(value) for key, value in payloads[0].items()}).data
+        assert ml_model.CLASS_MESSAGES[int(expected[0])].encode() in page
+        results = client.post('/api/predict/batch', json=payloads).get_json()['results']
+        assert [result['class_id'] for result in results] == expected.tolist()
+        sweep = client.post('/api/predict/sweep', json={'payload': payloads[0], 'ranges': {'mode': 'all'}})
+        assert sweep.status_code == 200 and sweep.get_json()['base']['class_id'] == expected[0]
+        assert client.post('/api/predict/explain', json=payloads[0]).status_code == 400
+        summary = EVBotChatbot()._format_model_summary(payloads[0])
+        assert 'EV model prediction' in summary and 'Main factors' not in summary
+    finally:
+        ml_model.reset_assets()
+
+    # Trees cannot be added to a boosted model, so new rows mean a full retrain
+    frame.iloc[400:500].to_csv(tmp_path / 'data.csv', mode='a', header=False, index=False)
+    assert _run(tmp_path, '--incremental')['mode'] == 'full'
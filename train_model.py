@@ -1,66 +1,511 @@
+"""
+Train the EVBot charging-duration model.
+
+    python train_model.py                  # full fit with the default parameters
+    python train_model.py --search         # cross-validated hyperparameter search
+    python train_model.py --incremental    # add trees for rows appended since the last run
+    python train_model.py --select --latency-budget-ms 2
+                                           # most accurate candidate within a latency budget
+
+Every run uses all CPU cores, reads the dataset from its memory-mapped
+columnar store (only rows appended to the CSV since the last conversion are
+parsed), and writes a versioned copy of its artifacts plus a
+manifest (data hash, parameters, metrics) to models/versions/<version>/
+before promoting them to the paths the app loads.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import RandomizedSearchCV, StratifiedKFold
 from sklearn.preprocessing import LabelEncoder
-import joblib
-import os
 
-# Load the cleaned dataset (same file you used)
-df = pd.read_csv("data/ev_battery_charging_data.csv")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "app"))
+from dataset import ColumnarStore, source_size  # noqa: E402
+from ml_model import ForestEngine, engine_for, export_forest, is_forest  # noqa: E402
+
+DATA_PATH = os.path.join(BASE_DIR, "data", "ev_battery_charging_data.csv")
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+TARGET = "Optimal Charging Duration Class"
+CATEGORICAL_COLUMNS = ['Charging Mode', 'Battery Type', 'EV Model']
+TEST_FRACTION = 0.2
+RANDOM_STATE = 42
+
+DEFAULT_PARAMS = {"n_estimators": 200}
+SEARCH_SPACE = {
+    "n_estimators": [100, 200, 300],
+    "max_depth": [None, 12, 20, 30],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": ["sqrt", "log2", 0.5],
+}
+# Candidates compared by --select
+SELECT_TREES = [25, 50, 100, 200]
+SELECT_DEPTHS = [None, 8, 12, 20]
+SELECT_BOOSTING_ITERATIONS = [50, 100, 200]
+MANIFEST_PARAMS = ("n_estimators", "max_depth", "min_samples_leaf", "max_features", "criterion",
+                   "max_iter", "learning_rate", "max_leaf_nodes", "random_state")
+
+
+def file_digest(path, size=None):
+    """SHA-256 of the first ``size`` bytes of ``path`` (the whole file by default)."""
+    digest = hashlib.sha256()
+    remaining = os.path.getsize(path) if size is None else size
+    with open(path, "rb") as handle:
+        while remaining > 0:
+            block = handle.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def is_test_row(row_numbers):
+    """Stable hold-out split keyed on the CSV row number.
+
+    Rows keep their side of the split as the file grows, so trees added by
+    incremental retraining never see the rows earlier versions were scored on.
+    """
+    hashed = (np.asarray(row_numbers, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return hashed < np.uint64(TEST_FRACTION * 2 ** 32)
+
+
+def load_features(data_path=DATA_PATH, cache_dir=None, use_cache=True):
+    """Cleaned, encoded feature frame (indexed by CSV row number) and encoders.
+
+    Columns come from the dataset's columnar store (``dataset.ColumnarStore``):
+    the CSV is converted once, rows appended to it later are converted on
+    their own, and the store's category codes are the label encodings.
+    """
+    store = ColumnarStore(data_path, cache_dir)
+    meta = store.sync(rebuild=not use_cache)
+    print(f"Columnar store {store.last_action} ({meta['rows']} rows)")
+
+    arrays = store.arrays(meta)
+    frame = pd.DataFrame({name: np.array(values) for name, values in arrays.items()})
+    encoders = {}
+    for column in meta["columns"]:
+        if column["name"] in CATEGORICAL_COLUMNS:
+            encoders[column["name"]] = LabelEncoder().fit(column["categories"])
+            # Appends add new categories at the end of the store's dictionary,
+            # so map its codes to the encoder's; code -1 marks a missing value
+            codes = frame[column["name"]].to_numpy().astype("int64")
+            order = encoders[column["name"]].transform(column["categories"])
+            frame[column["name"]] = pd.Series(order[codes], index=frame.index).where(codes >= 0)
+    frame = frame.dropna()
+    for col in CATEGORICAL_COLUMNS:
+        frame[col] = frame[col].astype("int64")
+
+    frame = frame[~frame.duplicated()]
+    size = source_size(meta)
+    entry = {"sha256": file_digest(data_path, size), "bytes": size, "raw_rows": meta["rows"]}
+    return frame, encoders, entry
+
+
+def split(frame):
+    test = is_test_row(frame.index.to_numpy())
+    X = frame.drop(columns=[TARGET])
+    y = frame[TARGET]
+    return X[~test], X[test], y[~test], y[test]
+
+
+def search_params(X_train, y_train, n_iter, cv, n_jobs):
+    """Randomised cross-validated search; candidates x folds run in parallel."""
+    search = RandomizedSearchCV(
+        RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1),
+        SEARCH_SPACE,
+        n_iter=n_iter,
+        cv=StratifiedKFold(cv, shuffle=True, random_state=RANDOM_STATE),
+        scoring="accuracy",
+        n_jobs=n_jobs,
+        random_state=RANDOM_STATE,
+        refit=False,
+    )
+    search.fit(X_train, y_train)
+    print(f"Best CV accuracy {search.best_score_:.4f} with {search.best_params_}")
+    return search.best_params_, {
+        "best_params": search.best_params_,
+        "best_cv_accuracy": float(search.best_score_),
+        "candidates": len(search.cv_results_["params"]),
+        "folds": cv,
+    }
+
+
+def candidate_models(columns, jobs):
+    """``(name, estimator)`` pairs evaluated by ``--select``."""
+    for n_estimators in SELECT_TREES:
+        for max_depth in SELECT_DEPTHS:
+            yield f"rf-{n_estimators}x{max_depth or 'full'}", RandomForestClassifier(
+                n_estimators=n_estimators, max_depth=max_depth, random_state=RANDOM_STATE, n_jobs=jobs)
+    categorical = [column in CATEGORICAL_COLUMNS for column in columns]
+    for max_iter in SELECT_BOOSTING_ITERATIONS:
+        yield f"hgb-{max_iter}", HistGradientBoostingClassifier(
+            max_iter=max_iter, categorical_features=categorical, random_state=RANDOM_STATE)
+
+
+def _milliseconds(samples, q=99):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def measure_latency(engine, X, single_rows=1000, batch_rows=1000, repeats=20, batch_engine=None):
+    """p50/p99 of one-row and ``batch_rows``-row predictions, in ms.
+
+    Batches go through ``batch_engine`` when given (the app serves large
+    forest batches with sklearn), otherwise through ``engine``.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    batch_engine = batch_engine or engine
+    engine.predict(X[:1])
+    single, batch = [], []
+    # Collector pauses would land on whichever candidate happens to trigger them
+    gc.disable()
+    try:
+        for row in np.resize(X, (single_rows, X.shape[1])):
+            begin = time.perf_counter()
+            engine.predict(row[np.newaxis])
+            single.append(time.perf_counter() - begin)
+        batch_X = np.resize(X, (batch_rows, X.shape[1]))
+        batch_engine.predict(batch_X)
+        for _ in range(repeats):
+            begin = time.perf_counter()
+            batch_engine.predict(batch_X)
+            batch.append(time.perf_counter() - begin)
+    finally:
+        gc.enable()
+    return {
+        "single_p50_ms": round(_milliseconds(single, 50), 4),
+        "single_p99_ms": round(_milliseconds(single), 4),
+        "batch_rows": batch_rows,
+        "batch_p50_ms": round(_milliseconds(batch, 50), 3),
+        "batch_p99_ms": round(_milliseconds(batch), 3),
+    }
+
+
+def _directory_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def measure_artifact(model, directory, repeats=3):
+    """Size and load time of the artifact the app would serve ``model`` from.
+
+    Forests are served from the exported arrays (memory-mapped on load); other
+    models from their pickle.
+    """
+    pickle_path = os.path.join(directory, "ev_model.pkl")
+    joblib.dump(model, pickle_path)
+    if is_forest(model):
+        path = os.path.join(directory, "ev_model_forest")
+        ForestEngine.from_model(model).save(path)
+        load = lambda: ForestEngine.load(path)  # noqa: E731
+    else:
+        path = pickle_path
+        load = lambda: engine_for(joblib.load(path))  # noqa: E731
+    timings = []
+    for _ in range(repeats):
+        begin = time.perf_counter()
+        load()
+        timings.append(time.perf_counter() - begin)
+    return {
+        "artifact_bytes": _directory_bytes(path),
+        "pickle_bytes": os.path.getsize(pickle_path),
+        "load_ms": round(float(np.median(timings)) * 1000, 3),
+    }
+
+
+def pareto_front(rows):
+    """Mark rows no other candidate beats on both accuracy and single-row p99."""
+    for row in rows:
+        row["pareto"] = not any(
+            other["accuracy"] >= row["accuracy"] and other["single_p99_ms"] <= row["single_p99_ms"]
+            and (other["accuracy"] > row["accuracy"] or other["single_p99_ms"] < row["single_p99_ms"])
+            for other in rows
+        )
+    return rows
+
+
+def choose(rows, latency_budget_ms=None, batch_budget_ms=None, allow_boosting=False):
+    """Most accurate candidate within the budgets (the faster one on ties).
+
+    Only forests are promoted unless ``allow_boosting`` is set: other models
+    are served through sklearn, without explanations or incremental
+    retraining. Falls back to the fastest candidate when none fits.
+    """
+    rows = [row for row in rows if allow_boosting or row["promotable"]]
+    if not rows:
+        raise SystemExit("No forest candidate to promote; pass --allow-boosting to promote gradient boosting")
+    fits = [row for row in rows
+            if (latency_budget_ms is None or row["single_p99_ms"] <= latency_budget_ms)
+            and (batch_budget_ms is None or row["batch_p99_ms"] <= batch_budget_ms)]
+    if not fits:
+        return min(rows, key=lambda row: row["single_p99_ms"]), False
+    return max(fits, key=lambda row: (row["accuracy"], -row["single_p99_ms"])), True
+
+
+def print_report(rows, chosen):
+    print(f"\n{'candidate':14s} {'accuracy':>8s} {'fit s':>7s} {'1-row p99':>10s} "
+          f"{'batch p99':>10s} {'size KB':>9s} {'load ms':>8s}  pareto")
+    for row in sorted(rows, key=lambda row: row["single_p99_ms"]):
+        marker = "*" if row["pareto"] else ""
+        if not row["promotable"]:
+            marker += "  (report only)"
+        if row["name"] == chosen["name"]:
+            marker += "  <- selected"
+        print(f"{row['name']:14s} {row['accuracy']:8.4f} {row['fit_seconds']:7.2f} {row['single_p99_ms']:10.3f} "
+              f"{row['batch_p99_ms']:10.2f} {row['artifact_bytes'] / 1024:9.0f} {row['load_ms']:8.2f}  {marker}")
+
+
+def select_model(X_train, X_test, y_train, y_test, args):
+    """Fit every candidate, measure accuracy and serving cost, and pick one.
+
+    Latency is measured through the engine the app would use for the model
+    (the compiled forest for random forests, sklearn otherwise), one
+    candidate at a time so the measurements do not compete for cores.
+    """
+    wanted = set(args.candidates.split(",")) if args.candidates else None
+    rows, models = [], {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, model in candidate_models(list(X_train.columns), args.jobs):
+            if wanted is not None and name not in wanted:
+                continue
+            begin = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - begin
+            if is_forest(model):
+                model.set_params(n_jobs=None)
+            engine = engine_for(model)
+            directory = os.path.join(scratch, name)
+            os.makedirs(directory)
+            row = {
+                "name": name,
+                "estimator": type(model).__name__,
+                # Every serving path (explanations, sweeps, incremental
+                # retraining) supports forests; others are report-only
+                # without --allow-boosting
+                "promotable": is_forest(model),
+                "accuracy": round(float(accuracy_score(y_test, engine.predict(X_test.to_numpy()))), 4),
+                "fit_seconds": round(fit_seconds, 3),
+                **measure_latency(engine, X_test.to_numpy(), args.single_rows, args.batch_rows,
+                                  batch_engine=engine_for(model, args.batch_rows)),
+                **measure_artifact(model, directory),
+            }
+            print(f"  {name}: accuracy {row['accuracy']:.4f}, 1-row p99 {row['single_p99_ms']:.3f} ms")
+            rows.append(row)
+            models[name] = model
+    if not rows:
+        raise SystemExit(f"No candidates match --candidates {args.candidates!r}")
+
+    pareto_front(rows)
+    chosen, within_budget = choose(rows, args.latency_budget_ms, args.batch_budget_ms, args.allow_boosting)
+    print_report(rows, chosen)
+    if not within_budget:
+        print("\nNo candidate fits the latency budget; selected the fastest one.")
+    return models[chosen["name"]], {
+        "latency_budget_ms": args.latency_budget_ms,
+        "batch_budget_ms": args.batch_budget_ms,
+        "within_budget": within_budget,
+        "chosen": chosen["name"],
+        "candidates": rows,
+    }
+
+
+def read_manifest(models_dir):
+    path = os.path.join(models_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _replace(source, target):
+    """Copy ``source`` over ``target`` atomically."""
+    temporary = f"{target}.tmp"
+    shutil.copyfile(source, temporary)
+    os.replace(temporary, target)
+
+
+def save_version(model, encoders, manifest, models_dir):
+    """Write the versioned artifacts, then promote them to the serving paths."""
+    version_dir = os.path.join(models_dir, "versions", manifest["version"])
+    os.makedirs(version_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(version_dir, "ev_model.pkl"))
+    joblib.dump(encoders, os.path.join(version_dir, "label_encoders.pkl"))
+    with open(os.path.join(version_dir, "manifest.json"), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+
+    model_path = os.path.join(models_dir, "ev_model.pkl")
+    encoders_path = os.path.join(models_dir, "label_encoders.pkl")
+    _replace(os.path.join(version_dir, "label_encoders.pkl"), encoders_path)
+    _replace(os.path.join(version_dir, "ev_model.pkl"), model_path)
+    forest_dir = os.path.join(models_dir, "ev_model_forest")
+    if is_forest(model):
+        # Export the forest as flat arrays for the compiled inference engine
+        export_forest(model, forest_dir, source_path=model_path)
+    else:
+        shutil.rmtree(forest_dir, ignore_errors=True)
+    _replace(os.path.join(version_dir, "manifest.json"), os.path.join(models_dir, "manifest.json"))
+    return version_dir
 
-# Clean the data
-df = df.dropna()
-df = df.drop_duplicates()
 
-print(f"Dataset shape: {df.shape}")
+def train(args):
+    started = time.perf_counter()
+    frame, encoders, data = load_features(args.data, args.cache_dir, use_cache=not args.no_cache)
+    print(f"Dataset shape: {frame.shape}")
+    X_train, X_test, y_train, y_test = split(frame)
+    print(f"\nTraining set: {X_train.shape[0]} samples")
+    print(f"Test set: {X_test.shape[0]} samples")
 
-# Define features and target
-X = df.drop("Optimal Charging Duration Class", axis=1)
-y = df["Optimal Charging Duration Class"]
+    previous = read_manifest(args.models_dir)
+    mode = "search" if args.search else "full"
+    search = None
+    selection = None
+    model = None
 
-# Encode categorical variables
-label_encoders = {}
-categorical_cols = ['Charging Mode', 'Battery Type', 'EV Model']
+    if args.incremental:
+        reason = None
+        model_path = os.path.join(args.models_dir, "ev_model.pkl")
+        if previous is None or not os.path.exists(model_path):
+            reason = "no previous model"
+        elif previous["data"]["sha256"] == data["sha256"]:
+            print("\nData unchanged since the last version; nothing to do.")
+            return None
+        elif data["bytes"] <= previous["data"]["bytes"] or \
+                file_digest(args.data, previous["data"]["bytes"]) != previous["data"]["sha256"]:
+            reason = "the data was rewritten, not appended to"
+        else:
+            model = joblib.load(model_path)
+            old_encoders = joblib.load(os.path.join(args.models_dir, "label_encoders.pkl"))
+            if not isinstance(model, RandomForestClassifier):
+                reason, model = f"a {type(model).__name__} cannot grow trees incrementally", None
+            elif any(list(old_encoders[col].classes_) != list(encoders[col].classes_) for col in CATEGORICAL_COLUMNS):
+                reason, model = "the categories changed", None
+            elif model.n_estimators + args.add_trees > args.max_trees:
+                reason, model = f"the forest would exceed {args.max_trees} trees", None
+        if model is not None:
+            mode = "incremental"
+            # warm_start keeps the fitted trees and only grows the new ones, on
+            # the full training split including the appended rows.
+            model.set_params(warm_start=True, n_jobs=args.jobs,
+                             n_estimators=model.n_estimators + args.add_trees)
+            print(f"\nAdding {args.add_trees} trees to the current {len(model.estimators_)}")
+        else:
+            print(f"\nFull retrain: {reason}")
 
-for col in categorical_cols:
-    le = LabelEncoder()
-    X[col] = le.fit_transform(X[col])
-    label_encoders[col] = le
-    print(f"Encoded {col}: {dict(zip(le.classes_, range(len(le.classes_))))}")
+    if args.select:
+        mode = "select"
+        print(f"\nEvaluating candidates (latency budget: {args.latency_budget_ms or 'none'} ms)")
+        model, selection = select_model(X_train, X_test, y_train, y_test, args)
+        fit_seconds = next(row["fit_seconds"] for row in selection["candidates"]
+                           if row["name"] == selection["chosen"])
+    else:
+        if model is None:
+            params = dict(DEFAULT_PARAMS, n_estimators=args.n_estimators)
+            if args.search:
+                best, search = search_params(X_train, y_train, args.n_iter, args.cv, args.jobs)
+                params.update(best)
+            model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=args.jobs, **params)
 
-# Split into training and testing
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
+        fit_started = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - fit_started
+        model.set_params(warm_start=False, n_jobs=None)
 
-print(f"\nTraining set: {X_train.shape[0]} samples")
-print(f"Test set: {X_test.shape[0]} samples")
+    # Evaluate
+    predictions = model.predict(X_test)
+    accuracy = accuracy_score(y_test, predictions)
+    print("\n" + "=" * 60)
+    print("Model Evaluation")
+    print("=" * 60)
+    print(f"Accuracy: {accuracy:.4f}")
+    print("\nClassification Report:\n", classification_report(y_test, predictions))
 
-# Train model
-model = RandomForestClassifier(n_estimators=200, random_state=42)
-model.fit(X_train, y_train)
+    created = datetime.now(timezone.utc)
+    manifest = {
+        "version": f"{created:%Y%m%dT%H%M%S%f}-{data['sha256'][:8]}",
+        "created_at": created.isoformat(),
+        "mode": mode,
+        "parent": previous["version"] if previous and mode == "incremental" else None,
+        "data": {
+            "path": os.path.relpath(args.data, BASE_DIR),
+            "bytes": data["bytes"],
+            "sha256": data["sha256"],
+            "raw_rows": data["raw_rows"],
+            "clean_rows": len(frame),
+        },
+        "estimator": type(model).__name__,
+        "params": {key: value for key, value in model.get_params().items() if key in MANIFEST_PARAMS},
+        "search": search,
+        "selection": selection,
+        "metrics": {
+            "accuracy": float(accuracy),
+            "train_rows": int(len(X_train)),
+            "test_rows": int(len(X_test)),
+            "report": classification_report(y_test, predictions, output_dict=True),
+        },
+        "timings": {"fit_seconds": round(fit_seconds, 3),
+                    "total_seconds": round(time.perf_counter() - started, 3)},
+    }
+    version_dir = save_version(model, encoders, manifest, args.models_dir)
+    print(f"\nModel version {manifest['version']} saved to {version_dir}")
+    print(f"Promoted to {args.models_dir} (model, label encoders, "
+          f"{'compiled forest, ' if is_forest(model) else ''}manifest)")
+    return manifest
 
-# Evaluate
-predictions = model.predict(X_test)
-print("\n" + "="*60)
-print("Model Evaluation")
-print("="*60)
-print(f"Accuracy: {accuracy_score(y_test, predictions):.4f}")
-print("\nClassification Report:\n", classification_report(y_test, predictions))
 
-# Create models directory if it doesn't exist
-os.makedirs("models", exist_ok=True)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the EVBot charging-duration model.")
+    parser.add_argument("--data", default=DATA_PATH, help="training CSV")
+    parser.add_argument("--models-dir", default=MODELS_DIR, help="where artifacts are written")
+    parser.add_argument("--cache-dir", default=None,
+                        help="columnar store directory (default: next to the CSV, shared with the app)")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild the columnar store from the CSV")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel jobs (-1: all cores)")
+    parser.add_argument("--n-estimators", type=int, default=DEFAULT_PARAMS["n_estimators"])
+    parser.add_argument("--search", action="store_true", help="cross-validated hyperparameter search")
+    parser.add_argument("--n-iter", type=int, default=20, help="search candidates")
+    parser.add_argument("--cv", type=int, default=5, help="cross-validation folds")
+    parser.add_argument("--incremental", action="store_true",
+                        help="add trees for appended rows instead of refitting (falls back to a full fit)")
+    parser.add_argument("--add-trees", type=int, default=50)
+    parser.add_argument("--max-trees", type=int, default=400,
+                        help="refit from scratch rather than grow the forest beyond this")
+    parser.add_argument("--select", action="store_true",
+                        help="compare forest sizes/depths and gradient boosting; keep the most accurate "
+                             "candidate within the latency budget")
+    parser.add_argument("--latency-budget-ms", type=float, default=None, help="single-row p99 budget")
+    parser.add_argument("--batch-budget-ms", type=float, default=None, help="batch p99 budget")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows per batch latency sample")
+    parser.add_argument("--single-rows", type=int, default=1000, help="single-row latency samples")
+    parser.add_argument("--allow-boosting", action="store_true",
+                        help="let --select promote gradient boosting (served without explanations or "
+                             "incremental retraining)")
+    parser.add_argument("--candidates", default=None,
+                        help="comma-separated candidate names to evaluate (e.g. rf-50x12,hgb-100)")
+    args = parser.parse_args(argv)
+    if args.select and (args.search or args.incremental):
+        parser.error("--select cannot be combined with --search or --incremental")
+    return args
 
-# Save the model
-model_path = "models/ev_model.pkl"
-joblib.dump(model, model_path)
-print(f"\nModel saved as {model_path}")
 
-# Also save the label encoders for later use
-encoders_path = "models/label_encoders.pkl"
-joblib.dump(label_encoders, encoders_path)
-print(f"Label encoders saved as {encoders_path}")
+def main(argv=None):
+    manifest = train(parse_args(argv))
+    print("\n[OK] Training completed successfully!")
+    return manifest
 
-print("\n[OK] Training completed successfully!")
 
+if __name__ == "__main__":
+    main()